@@ -1,23 +1,61 @@
+import collections
+import io
 import os
 import shutil
 import subprocess
 import tempfile
+import threading
 import uuid
 from amu import utils
 from amu.config import ConfigurationError
-from mutagen import File
+from amu.progress import EncodeProgressReporter, parse_flac_progress, parse_lame_progress
 from mutagen.flac import FLAC, Picture
 from mutagen.id3 import APIC, COMM, ID3, ID3NoHeaderError, PictureType, TALB, TCON, TDRC, TIT2, TPE1, TPE2, TPOS, TRCK
 from PIL import Image
 
+DEFAULT_TAG_PADDING = 64 * 1024
+# The number of prepared covers the artwork cache holds on to. The tracks of a release are
+# tagged together, so only the covers for the few releases in flight need to be kept.
+MAX_CACHED_ARTWORK = 8
+# The number of locks the artwork cache shares between the cover paths. Covers that share a
+# lock are read one at a time, but the locks don't build up over a long batch.
+ARTWORK_LOCK_STRIPES = 16
+# The most processes to scale down covers with. A cover is only scaled down once for each
+# release, so a couple of processes keep up with the releases being tagged at once.
+ARTWORK_PROCESSES = 2
+
 class TaggerError(Exception):
     def __init__(self, message):
         super(TaggerError, self).__init__(message)
         self.message = message
 
+class EncoderError(Exception):
+    def __init__(self, message):
+        super(EncoderError, self).__init__(message)
+        self.message = message
+
+def get_padding_function(headroom, artwork_size=0):
+    """ Gets the function mutagen calls to decide how much padding to leave after a tag.
+
+    If the tag still fits in the space the file already has, that space is kept, so the
+    tag is written in place. When the tag has outgrown it the whole file has to be
+    rewritten anyway, so enough padding is reserved for the headroom plus another cover
+    the size of the one being added. Later edits, including replacing the cover, can then
+    be written in place.
+
+    :headroom: The number of bytes to reserve for later edits.
+    :artwork_size: The size of the cover being added, if there is one.
+    """
+    def get_padding(info):
+        if info.padding >= 0:
+            return info.padding
+        return headroom + artwork_size
+    return get_padding
+
 class LameEncoder(object):
-    def __init__(self, config_provider):
+    def __init__(self, config_provider, progress_reporter=None):
         self._config_provider = config_provider
+        self._progress_reporter = progress_reporter or EncodeProgressReporter()
 
     def encode(self, source, destination):
         if not source:
@@ -28,22 +66,42 @@ class LameEncoder(object):
             raise ConfigurationError('The source to encode does not exist')
         if os.path.isdir(source):
             raise ConfigurationError('The source should not be a directory')
-        subprocess_args = [
+        subprocess_args = self.get_encode_args(source, destination)
+        print u'[encode] Running lame with {0}'.format(subprocess_args)
+        # The progress updates end with a carriage return, which universal newlines splits on.
+        popen = subprocess.Popen(
+            subprocess_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        self.report_progress(popen.stdout, source, destination)
+        if popen.wait() != 0:
+            raise EncoderError(u'Encoding {0} to {1} failed.'.format(source, destination))
+
+    def report_progress(self, output, source, destination):
+        """ Reports the progress from the output of lame, until the output ends.
+
+        :output: The output of lame, opened with universal newlines.
+        """
+        _report_progress(self._progress_reporter, parse_lame_progress, output, source, destination)
+
+    def get_path(self):
+        return self._config_provider.get_lame_path()
+
+    def get_encoding_setting(self):
+        return self._config_provider.get_lame_encoding_setting()
+
+    def get_encode_args(self, source, destination):
+        """ Gets the arguments for running lame. Use '-' as the source to have lame read
+        the wav from stdin. """
+        return [
             self._config_provider.get_lame_path(),
             self._config_provider.get_lame_encoding_setting(),
             source,
             destination
         ]
-        print u'[encode] Running lame with {0}'.format(subprocess_args)
-        popen = subprocess.Popen(subprocess_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-        lines_iterator = iter(popen.stdout.readline, '')
-        for line in lines_iterator:
-            if line:
-                print u'[encode] {0}'.format(line.strip().decode('utf-8'))
 
 class FlacEncoder(object):
-    def __init__(self, config_provider):
+    def __init__(self, config_provider, progress_reporter=None):
         self._config_provider = config_provider
+        self._progress_reporter = progress_reporter or EncodeProgressReporter()
 
     def encode(self, source, destination):
         if not source:
@@ -54,18 +112,37 @@ class FlacEncoder(object):
             raise ConfigurationError('The source to encode does not exist')
         if os.path.isdir(source):
             raise ConfigurationError('The source should not be a directory')
-        subprocess_args = [
+        subprocess_args = self.get_encode_args(source, destination)
+        print u'[encode] Running flac with {0}'.format(subprocess_args)
+        # The progress updates end with a carriage return, which universal newlines splits on.
+        popen = subprocess.Popen(
+            subprocess_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        self.report_progress(popen.stdout, source, destination)
+        if popen.wait() != 0:
+            raise EncoderError(u'Encoding {0} to {1} failed.'.format(source, destination))
+
+    def report_progress(self, output, source, destination):
+        """ Reports the progress from the output of flac, until the output ends.
+
+        :output: The output of flac, opened with universal newlines.
+        """
+        _report_progress(self._progress_reporter, parse_flac_progress, output, source, destination)
+
+    def get_path(self):
+        return self._config_provider.get_flac_path()
+
+    def get_encoding_setting(self):
+        return self._config_provider.get_flac_encoding_setting()
+
+    def get_encode_args(self, source, destination):
+        """ Gets the arguments for running flac. Use '-' as the source to have flac read
+        the wav from stdin. """
+        return [
             self._config_provider.get_flac_path(),
             self._config_provider.get_flac_encoding_setting(),
             source,
             '--output-name={0}'.format(destination)
         ]
-        print u'[encode] Running flac with {0}'.format(subprocess_args)
-        popen = subprocess.Popen(subprocess_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-        lines_iterator = iter(popen.stdout.readline, '')
-        for line in lines_iterator:
-            if line:
-                print u'[encode] {0}'.format(line.strip().decode('utf-8'))
 
     def decode(self, source, destination):
         if not source:
@@ -76,18 +153,136 @@ class FlacEncoder(object):
             raise ConfigurationError('The source to decode does not exist')
         if os.path.isdir(source):
             raise ConfigurationError('The source should not be a directory')
-        subprocess_args = [
-            self._config_provider.get_flac_path(),
-            self._config_provider.get_flac_decode_setting(),
-            source,
-            '--output-name={0}'.format(destination)
-        ]
+        subprocess_args = self.get_decode_args(source, destination)
         print u'[decode] Running flac with {0}'.format(subprocess_args)
         popen = subprocess.Popen(subprocess_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
         lines_iterator = iter(popen.stdout.readline, '')
         for line in lines_iterator:
             if line:
                 print u'[decode] {0}'.format(line.strip().decode('utf-8'))
+        if popen.wait() != 0:
+            raise EncoderError(u'Decoding {0} to {1} failed.'.format(source, destination))
+
+    def get_decode_args(self, source, destination):
+        """ Gets the arguments for running flac to decode. Use '-' as the destination to
+        have flac write the wav to stdout. """
+        if destination == '-':
+            return [
+                self._config_provider.get_flac_path(),
+                self._config_provider.get_flac_decode_setting(),
+                '--stdout',
+                '--silent',
+                source
+            ]
+        return [
+            self._config_provider.get_flac_path(),
+            self._config_provider.get_flac_decode_setting(),
+            source,
+            '--output-name={0}'.format(destination)
+        ]
+
+def _report_progress(progress_reporter, parse_progress, output, source, destination):
+    progress = progress_reporter.start(source, destination)
+    for line in iter(output.readline, ''):
+        event = parse_progress(line)
+        if event:
+            progress.update(event)
+        elif line:
+            print u'[encode] {0}'.format(line.strip().decode('utf-8'))
+    progress.finish()
+
+class PipeTranscoder(object):
+    """ Transcodes a file by piping the output of a decoder straight into an encoder.
+
+    The decoded wav never touches the disk, so transcoding is bound by the CPU rather than
+    the disk, and doesn't need any scratch space.
+    """
+    def __init__(self, decoder, encoder):
+        self._decoder = decoder
+        self._encoder = encoder
+
+    def transcode(self, source, destination):
+        if not source:
+            raise ValueError('A value must be supplied for the source')
+        if not destination:
+            raise ValueError('A value must be supplied for the destination')
+        if not os.path.exists(source):
+            raise ConfigurationError('The source to transcode does not exist')
+        if os.path.isdir(source):
+            raise ConfigurationError('The source should not be a directory')
+        decode_args = self._decoder.get_decode_args(source, '-')
+        encode_args = self._encoder.get_encode_args('-', destination)
+        print u'[transcode] Running {0} | {1}'.format(decode_args, encode_args)
+        decode_process = subprocess.Popen(decode_args, stdout=subprocess.PIPE)
+        encode_process = subprocess.Popen(
+            encode_args, stdin=decode_process.stdout, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            universal_newlines=True)
+        # Only the encoder should hold the read end, so the decoder gets a SIGPIPE if the encoder exits.
+        decode_process.stdout.close()
+        self._encoder.report_progress(encode_process.stdout, source, destination)
+        encode_return_code = encode_process.wait()
+        decode_return_code = decode_process.wait()
+        if decode_return_code != 0 or encode_return_code != 0:
+            raise EncoderError(u'Transcoding {0} to {1} failed.'.format(source, destination))
+
+class MultiFormatEncoder(object):
+    """ Encodes a wav to several formats at the same time.
+
+    The wav is only read once; each chunk that's read is written to the stdin of every
+    encoder, so the encoders run side by side on the same data. The progress of each
+    encoder is reported in the same way as when it encodes on its own.
+    """
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, encoders):
+        self._encoders = encoders
+
+    def encode(self, source, destinations):
+        if not source:
+            raise ValueError('A value must be supplied for the source')
+        if len(destinations) != len(self._encoders):
+            raise ValueError('A destination must be supplied for each encoder')
+        if not os.path.exists(source):
+            raise ConfigurationError('The source to encode does not exist')
+        if os.path.isdir(source):
+            raise ConfigurationError('The source should not be a directory')
+        processes = []
+        progress_threads = []
+        for encoder, destination in zip(self._encoders, destinations):
+            subprocess_args = encoder.get_encode_args('-', destination)
+            print u'[encode] Running {0}'.format(subprocess_args)
+            # The progress updates end with a carriage return, which universal newlines splits on.
+            process = subprocess.Popen(
+                subprocess_args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                universal_newlines=True)
+            processes.append(process)
+            # Each encoder's output is read on its own thread, so none of them can block on a
+            # full pipe while the wav is being written to them.
+            progress_thread = threading.Thread(
+                target=encoder.report_progress, args=(process.stdout, source, destination))
+            progress_thread.daemon = True
+            progress_thread.start()
+            progress_threads.append(progress_thread)
+        try:
+            with open(source, 'rb') as wav:
+                for chunk in iter(lambda: wav.read(self.CHUNK_SIZE), ''):
+                    for process in processes:
+                        process.stdin.write(chunk)
+        except IOError:
+            # One of the encoders has exited early; the return codes will say which.
+            pass
+        finally:
+            for process in processes:
+                try:
+                    process.stdin.close()
+                except IOError:
+                    pass
+        return_codes = [process.wait() for process in processes]
+        for progress_thread in progress_threads:
+            progress_thread.join()
+        failed = [destination for destination, code in zip(destinations, return_codes) if code != 0]
+        if failed:
+            raise EncoderError(u'Encoding {0} failed for {1}.'.format(source, ', '.join(failed)))
 
 class RubyRipperCdRipper(object):
     def __init__(self, config_provider):
@@ -118,10 +313,172 @@ class RubyRipperCdRipper(object):
         shutil.rmtree(temp_path)
         os.remove(temp_config_path)
 
+class PreparedArtwork(object):
+    """ A cover that has been read and measured, ready to be added to any number of tags. """
+    def __init__(self, data, mime, width, height):
+        self._data = data
+        self._mime = mime
+        self._width = width
+        self._height = height
+        self._picture = None
+
+    @property
+    def data(self):
+        return self._data
+
+    @property
+    def mime(self):
+        return self._mime
+
+    @property
+    def width(self):
+        return self._width
+
+    @property
+    def height(self):
+        return self._height
+
+    def get_picture(self):
+        """ Gets the picture block for a flac. It's built once and shared by every flac,
+        since adding it to a tag doesn't change it. """
+        if self._picture is None:
+            picture = Picture()
+            picture.data = self._data
+            picture.type = PictureType.COVER_FRONT
+            picture.mime = self._mime
+            picture.width = self._width
+            picture.height = self._height
+            self._picture = picture
+        return self._picture
+
+    def get_apic_frame(self):
+        """ Gets a cover frame for an mp3. Each tag gets a frame of its own, so nothing done to
+        one tag can change the others, but the image data is shared rather than copied. """
+        return APIC(encoding=3, mime=self._mime, type=3, desc=u'cover', data=self._data)
+
+def normalise_artwork(path, max_size, quality):
+    """ Gets a cover that's no bigger than the maximum size, as a jpg, for embedding. The
+    cover itself is left as it is.
+
+    A jpg that's already small enough is used as it is, rather than being compressed again.
+    Anything else is scaled down to fit the maximum size and saved as a jpg. This runs in
+    the processes of the pool in ArtworkCache, so it only takes and returns plain values.
+
+    :path: The path of the jpg or png.
+    :max_size: The maximum width and height, in pixels.
+    :quality: The quality to save the jpg with, from 1 to 95.
+    :returns: A tuple of the jpg data, its mime type, width and height.
+    """
+    image = Image.open(path)
+    width, height = image.size
+    if image.format == 'JPEG' and max(width, height) <= max_size:
+        with open(path, 'rb') as image_file:
+            return (image_file.read(), 'image/jpeg', width, height)
+    # The cover is converted before it's scaled, since a palette image can only be scaled
+    # with the nearest pixel, rather than being resampled.
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+    elif image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    if max(width, height) > max_size:
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+    if image.mode == 'RGBA':
+        # A jpg has no transparency, so a transparent cover is put on a white background.
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[3])
+        image = background
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=quality, optimize=True)
+    return (output.getvalue(), 'image/jpeg', image.size[0], image.size[1])
+
+class ArtworkCache(object):
+    """ Holds the covers that have been prepared during a run, so a cover that's added to
+    every track of a release is only read and measured once.
+
+    The covers are keyed on their path, and a cover is prepared again if its modified time
+    has changed since it was last read. Only the most recently used covers are kept, so a
+    batch of many releases doesn't hold on to every cover until it finishes.
+
+    If the config has a maximum size for artwork, each cover is scaled down and compressed
+    before it's embedded. When a pool of processes is supplied that's done in the pool, so
+    the covers for several releases can be decoded at the same time without holding up the
+    other commands. The pool belongs to whoever created it, since it has to be created
+    before any threads are started and closed when the run ends. The cover files
+    themselves aren't changed, so the full size cover still sits next to the tracks.
+    """
+    def __init__(self, configuration_provider=None, pool=None):
+        self._configuration_provider = configuration_provider
+        self._pool = pool
+        self._artwork = collections.OrderedDict()
+        self._path_locks = [threading.Lock() for i in range(ARTWORK_LOCK_STRIPES)]
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """ Gets the prepared cover for a path, preparing it if it hasn't been already.
+
+        :path: The path of the jpg or png.
+        :returns: A PreparedArtwork.
+        """
+        try:
+            modified_time = os.path.getmtime(path)
+        except OSError:
+            raise TaggerError('The cover art source does not exist.')
+        # Tracks that are tagged at the same time wait for the one read of their cover,
+        # rather than all reading it themselves, while most other covers can be read alongside.
+        with self._get_path_lock(path):
+            with self._lock:
+                entry = self._artwork.get(path)
+            if entry is None or entry[0] != modified_time:
+                entry = (modified_time, self._prepare(path))
+            self._add(path, entry)
+            return entry[1]
+
+    def _add(self, path, entry):
+        """ Adds a cover as the most recently used one, dropping the least recently used
+        cover if the cache is full. """
+        with self._lock:
+            self._artwork.pop(path, None)
+            self._artwork[path] = entry
+            while len(self._artwork) > MAX_CACHED_ARTWORK:
+                self._artwork.popitem(last=False)
+
+    def _get_path_lock(self, path):
+        return self._path_locks[hash(path) % len(self._path_locks)]
+
+    def _prepare(self, path):
+        max_size = self._configuration_provider.get_artwork_max_size() if self._configuration_provider else 0
+        if max_size:
+            quality = self._configuration_provider.get_artwork_quality()
+            if self._pool:
+                data, mime, width, height = self._pool.apply(normalise_artwork, (path, max_size, quality))
+            else:
+                data, mime, width, height = normalise_artwork(path, max_size, quality)
+            return PreparedArtwork(data, mime, width, height)
+        with open(path, 'rb') as image_file:
+            data = image_file.read()
+        # Opening the image only reads the header, which is all that's needed for the size.
+        width, height = Image.open(io.BytesIO(data)).size
+        return PreparedArtwork(data, _get_mime_type(path), width, height)
+
 class Mp3Tagger(object):
+    def __init__(self, padding=DEFAULT_TAG_PADDING, artwork_cache=None):
+        """
+        :padding: The number of bytes to reserve for later edits when the tag outgrows the
+        space in the file.
+        :artwork_cache: The cache of prepared covers, which can be shared between taggers.
+        """
+        self._padding = padding
+        self._artwork_cache = artwork_cache if artwork_cache else ArtworkCache()
+
     def add_tags(self, source, artist='', album_artist='', album='',
                  title='', year='', genre='', comment='',
-                 track_number=0, track_total=0, disc_number=0, disc_total=0):
+                 track_number=0, track_total=0, disc_number=0, disc_total=0, artwork=''):
+        """ Adds tags to an mp3. If artwork is supplied it's added along with the tags, so
+        the file is only saved once.
+
+        :returns: True if the mp3 was written, or False if it already had these tags, in
+        which case it isn't saved.
+        """
         if source:
             if not os.path.exists(source):
                 raise TaggerError('The source {0} does not exist.'.format(source))
@@ -130,6 +487,7 @@ class Mp3Tagger(object):
         else:
             raise ValueError('A source must be set for tagging an mp3.')
         tag = self._get_tag(source)
+        original_frames = dict(tag)
         self._add_artist_frame(tag, artist)
         self._add_album_artist_frame(tag, album_artist)
         self._add_title_frame(tag, title)
@@ -139,7 +497,13 @@ class Mp3Tagger(object):
         self._add_comment_frame(tag, comment)
         self._add_track_number_frame(tag, track_number, track_total)
         self._add_disc_number_frame(tag, disc_number, disc_total)
-        tag.save()
+        artwork_size = 0
+        if artwork:
+            artwork_size = self._add_artwork_frame(tag, artwork)
+        if not self._has_changed(tag, original_frames):
+            return False
+        tag.save(source, padding=get_padding_function(self._padding, artwork_size))
+        return True
 
     def _add_artist_frame(self, tag, artist):
         if artist:
@@ -199,14 +563,25 @@ class Mp3Tagger(object):
         audio_type = os.path.splitext(destination)[1][1:]
         if audio_type != 'mp3':
             raise TaggerError('The destination must be an mp3.')
-        artwork_type = os.path.splitext(source)[1][1:]
-        if artwork_type == 'jpg' or artwork_type == 'jpeg':
-            mime_type = 'image/jpeg'
-        elif artwork_type == 'png':
-            mime_type = 'image/png'
         tag = self._get_tag(destination)
-        tag.add(APIC(encoding=3, mime=mime_type, type=3, desc=u'cover', data=open(source).read()))
-        tag.save()
+        original_frames = dict(tag)
+        artwork_size = self._add_artwork_frame(tag, source)
+        if not self._has_changed(tag, original_frames):
+            return False
+        tag.save(destination, padding=get_padding_function(self._padding, artwork_size))
+        return True
+
+    def _has_changed(self, tag, original_frames):
+        """ Adding a frame replaces the one with the same key, so the tag has only changed
+        if the keys are different or one of the frames has a different value. """
+        if sorted(tag.keys()) != sorted(original_frames.keys()):
+            return True
+        return any(not tag[key] == frame for key, frame in original_frames.iteritems())
+
+    def _add_artwork_frame(self, tag, artwork):
+        prepared_artwork = self._artwork_cache.get(artwork)
+        tag.add(prepared_artwork.get_apic_frame())
+        return len(prepared_artwork.data)
 
     def remove_tags(self, source):
         try:
@@ -216,56 +591,47 @@ class Mp3Tagger(object):
             pass # There already is no tag, in which case, do nothing.
 
     def _get_tag(self, source):
-        """
-        This exists to handle mp3s that have no tags. It's horrendous, but
-        I couldn't see a way to do a conversion between the EasyID3 type and
-        a normal ID3 type.
-
-        The steps are:
-            * Attempt to load ID3 tag
-            * Exception is thrown
-            * Get an EasyID3 tag (easy=True)
-            * Add a blank tag
-            * Add a placeholder artist
-            * Save the file
-            * Reload as an ID3 object
-
-        If you try and save without the placeholder, it doesn't write any tags (which makes sense),
-        hence the need for the placeholder.
-        """
+        """ Gets the ID3 tag on an mp3. An mp3 with no tag, which is what lame produces, gets
+        a new tag that's only held in memory. It's written to the file by the one save that
+        adds the frames, so it must be saved with the path given explicitly. """
         try:
-            tag = ID3(source)
-            return tag
+            return ID3(source)
         except ID3NoHeaderError:
-            tag = File(source, easy=True)
-            tag.add_tags()
-            tag['artist'] = 'placeholder'
-            tag.save()
-            tag = ID3(source)
-            return tag
+            return ID3()
 
 class FlacTagger(object):
+    def __init__(self, padding=DEFAULT_TAG_PADDING, artwork_cache=None):
+        """
+        :padding: The number of bytes to reserve for later edits when the metadata outgrows
+        the space in the file.
+        :artwork_cache: The cache of prepared covers, which can be shared between taggers.
+        """
+        self._padding = padding
+        self._artwork_cache = artwork_cache if artwork_cache else ArtworkCache()
+
     def apply_artwork(self, source, destination):
         if not source:
             raise ValueError('A cover art source must be supplied.')
         if not destination:
             raise ValueError('A destination must be supplied to apply cover art to.')
-        image_info = self._get_image_info(source)
-        picture = Picture()
-        with open(source, 'rb') as image:
-            picture.data = image.read()
-        artwork_type = os.path.splitext(source)[1][1:]
-        if artwork_type == 'jpg' or artwork_type == 'jpeg':
-            mime_type = 'image/jpeg'
-        elif artwork_type == 'png':
-            mime_type = 'image/png'
-        picture.type = PictureType.COVER_FRONT
-        picture.mime = mime_type
-        picture.width = image_info[0]
-        picture.height = image_info[1]
+        picture = self._get_picture(source)
         tag = FLAC(destination)
+        if self._has_picture(tag, picture):
+            return False
         tag.add_picture(picture)
-        tag.save()
+        tag.save(padding=get_padding_function(self._padding, len(picture.data)))
+        return True
+
+    def _get_picture(self, source):
+        return self._artwork_cache.get(source).get_picture()
+
+    def _has_picture(self, tag, picture):
+        return any(x.type == picture.type and x.data == picture.data for x in tag.pictures)
+
+    def _get_comments(self, tag):
+        """ Gets the comments in a form that can be compared. Setting a comment replaces any
+        with the same name, whatever its case, and adds it to the end. """
+        return sorted((key.upper(), value) for key, value in (tag.tags or []))
 
     def remove_tags(self, source):
         if not source:
@@ -273,22 +639,28 @@ class FlacTagger(object):
         tag = FLAC(source)
         tag.delete()
 
-    def _get_image_info(self, source):
-        image = Image.open(source)
-        width, height = image.size
-        bits = self._get_bits(image)
-        return (width, height, bits)
+    def get_tags(self, source):
+        """ Gets the tags on a flac, as the values that would be passed to add_tags.
 
-    def _get_bits(self, image):
-        try:
-            bits = image.bits
-            return bits
-        except AttributeError:
-            return None
+        :source: The path to the flac.
+        :returns: A dictionary keyed on the add_tags argument names. Anything that isn't on
+        the flac is left as an empty string, or 0 for the numbers.
+        """
+        if not source:
+            raise ValueError('A source must be supplied.')
+        if not os.path.exists(source):
+            raise TaggerError('The source {0} does not exist.'.format(source))
+        return get_flac_tag_values(FLAC(source).tags or {})
 
     def add_tags(self, source, artist='', album_artist='', album='',
                  title='', year='', genre='', comment='',
-                 track_number=0, track_total=0, disc_number=0, disc_total=0):
+                 track_number=0, track_total=0, disc_number=0, disc_total=0, artwork=''):
+        """ Adds tags to a flac. If artwork is supplied it's added along with the tags, so
+        the file is only saved once.
+
+        :returns: True if the flac was written, or False if it already had these tags, in
+        which case it isn't saved.
+        """
         if source:
             if not os.path.exists(source):
                 raise TaggerError('The source {0} does not exist.'.format(source))
@@ -296,7 +668,9 @@ class FlacTagger(object):
                 raise TaggerError('The source must not be a directory.')
         else:
             raise ValueError('A source must be set for tagging a flac.')
+        picture = self._get_picture(artwork) if artwork else None
         tag = FLAC(source)
+        original_comments = self._get_comments(tag)
         self._add_artist_frame(tag, artist)
         self._add_album_artist_frame(tag, album_artist)
         self._add_title_frame(tag, title)
@@ -306,7 +680,14 @@ class FlacTagger(object):
         self._add_comment_frame(tag, comment)
         self._add_track_number_frame(tag, track_number, track_total)
         self._add_disc_number_frame(tag, disc_number, disc_total)
-        tag.save()
+        artwork_size = 0
+        if picture and not self._has_picture(tag, picture):
+            tag.add_picture(picture)
+            artwork_size = len(picture.data)
+        if not artwork_size and self._get_comments(tag) == original_comments:
+            return False
+        tag.save(padding=get_padding_function(self._padding, artwork_size))
+        return True
 
     def _add_artist_frame(self, tag, artist):
         if artist:
@@ -353,3 +734,74 @@ class FlacTagger(object):
         if disc_total < 10:
             disc_total_string = '0{0}'.format(disc_total)
         tag['DISCNUMBER'] = '{0}/{1}'.format(disc_number_string, disc_total_string)
+
+def _get_mime_type(artwork):
+    artwork_type = os.path.splitext(artwork)[1][1:].lower()
+    if artwork_type == 'png':
+        return 'image/png'
+    return 'image/jpeg'
+
+def get_flac_tag_values(comments):
+    """ Gets the values from the comments on a flac, keyed on the add_tags argument names.
+    Anything that isn't on the flac is left as an empty string, or 0 for the numbers. """
+    def get_value(*keys):
+        for key in keys:
+            if key in comments:
+                return comments[key][0]
+        return ''
+    track_number, track_total = _get_number_and_total(
+        get_value('TRACKNUMBER'), get_value('TRACKTOTAL', 'TOTALTRACKS'))
+    disc_number, disc_total = _get_number_and_total(
+        get_value('DISCNUMBER'), get_value('DISCTOTAL', 'TOTALDISCS'))
+    return {
+        'artist': get_value('ARTIST'),
+        'album_artist': get_value('ALBUMARTIST', 'ALBUM ARTIST'),
+        'album': get_value('ALBUM'),
+        'title': get_value('TITLE'),
+        'year': get_value('DATE', 'YEAR'),
+        'genre': get_value('GENRE'),
+        'comment': get_value('DESCRIPTION', 'COMMENT'),
+        'track_number': track_number,
+        'track_total': track_total,
+        'disc_number': disc_number,
+        'disc_total': disc_total
+    }
+
+def get_mp3_tag_values(tag):
+    """ Gets the values from the ID3 tag on an mp3, in the same form as get_flac_tag_values. """
+    tag = tag or {}
+    def get_value(key):
+        frames = [tag[x] for x in tag.keys() if x == key or x.startswith(key + ':')]
+        if not frames or not frames[0].text:
+            return ''
+        return unicode(frames[0].text[0])
+    track_number, track_total = _get_number_and_total(get_value('TRCK'), '')
+    disc_number, disc_total = _get_number_and_total(get_value('TPOS'), '')
+    return {
+        'artist': get_value('TPE1'),
+        'album_artist': get_value('TPE2'),
+        'album': get_value('TALB'),
+        'title': get_value('TIT2'),
+        'year': get_value('TDRC'),
+        'genre': get_value('TCON'),
+        'comment': get_value('COMM'),
+        'track_number': track_number,
+        'track_total': track_total,
+        'disc_number': disc_number,
+        'disc_total': disc_total
+    }
+
+def _get_number_and_total(number, total):
+    """ The numbers are written as '01/10' by add_tags, but other taggers use a separate
+    field for the total. """
+    if '/' in number:
+        number, total = number.split('/', 1)
+    try:
+        number = int(number)
+    except ValueError:
+        number = 0
+    try:
+        total = int(total)
+    except ValueError:
+        total = 0
+    return (number, total)
@@ -0,0 +1,131 @@
+"""
+A persistent cache for the responses from the discogs API.
+"""
+import sqlite3
+import time
+import urllib
+import urlparse
+
+class CacheMissError(Exception):
+    def __init__(self, message):
+        super(CacheMissError, self).__init__(message)
+        self.message = message
+
+def get_resource_path(url):
+    """ Gets the path of the resource for a discogs API URL, e.g. releases/32662. """
+    return urlparse.urlparse(url).path.strip('/')
+
+def get_cache_key(url):
+    """ Gets the key for a discogs API URL, which is its path, e.g. releases/32662. Searches
+    and pages of results have the same path, so the parameters are part of the key, in a
+    fixed order, e.g. database/search?page=2&q=analord. """
+    query = urlparse.urlparse(url).query
+    if not query:
+        return get_resource_path(url)
+    parameters = sorted(urlparse.parse_qsl(query, keep_blank_values=True))
+    return '{0}?{1}'.format(get_resource_path(url), urllib.urlencode(parameters))
+
+def get_release_model_key(id, collapse_index_tracks, include_original_release):
+    """ Gets the key for a release model. A release converts to a different model depending
+    on the options it's converted with, so they're part of the key. """
+    return 'releases/{0}?collapse_index_tracks={1}&include_original_release={2}'.format(
+        id, int(bool(collapse_index_tracks)), int(bool(include_original_release)))
+
+class DiscogsResponseCache(object):
+    """ Stores the body of each discogs response in an SQLite database, keyed on the path of
+    the resource, e.g. releases/32662 or masters/1234. The release models that are built
+    from the responses are also stored, in their binary form, so they don't need to be
+    built again.
+
+    A connection is opened for each operation, since the cache can be used from the
+    threads that run the commands.
+    """
+    def __init__(self, path, ttl):
+        """
+        :path: The path of the SQLite database.
+        :ttl: The number of seconds a response stays fresh for.
+        """
+        self._path = path
+        self._ttl = ttl
+
+    def get(self, key, allow_expired=False):
+        """ Gets the body of a cached response.
+
+        :key: The key of the response.
+        :allow_expired: Return the response even if it's older than the TTL.
+        :returns: The body, or None if there's no response or it has expired.
+        """
+        return self._get('responses', key, allow_expired)
+
+    def put(self, key, body):
+        self._put('responses', key, body)
+
+    def get_release_model(self, key, allow_expired=False):
+        """ Gets the binary form of a cached release model.
+
+        :key: The key of the release model, from get_release_model_key.
+        :allow_expired: Return the release model even if it's older than the TTL.
+        :returns: The binary form, or None if there's no release model or it has expired.
+        """
+        body = self._get('release_models', key, allow_expired)
+        return str(body) if body is not None else None
+
+    def put_release_model(self, key, data):
+        self._put('release_models', key, sqlite3.Binary(data))
+
+    def _get(self, table, key, allow_expired):
+        connection = self._connect()
+        try:
+            row = connection.execute('SELECT body, fetched_at FROM {0} WHERE key = ?'.format(table), (key,)).fetchone()
+        finally:
+            connection.close()
+        if row is None:
+            return None
+        body, fetched_at = row
+        if not allow_expired and time.time() - fetched_at > self._ttl:
+            return None
+        return body
+
+    def _put(self, table, key, body):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO {0} (key, body, fetched_at) VALUES (?, ?, ?)'.format(table),
+                    (key, body, time.time()))
+        finally:
+            connection.close()
+
+    def _connect(self):
+        connection = sqlite3.connect(self._path, timeout=30)
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, body TEXT NOT NULL, fetched_at REAL NOT NULL)')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS release_models (key TEXT PRIMARY KEY, body BLOB NOT NULL, fetched_at REAL NOT NULL)')
+        return connection
+
+class CachingFetcher(object):
+    """ A fetcher for the discogs client that answers GET requests from the cache when it
+    can, and caches the successful responses it has to fetch.
+
+    In offline mode nothing is fetched. A response is returned from the cache no matter
+    how old it is, and anything that isn't cached is an error.
+    """
+    def __init__(self, fetcher, cache, offline=False):
+        self._fetcher = fetcher
+        self._cache = cache
+        self._offline = offline
+
+    def fetch(self, client, method, url, data=None, headers=None, json=True):
+        if method != 'GET':
+            return self._fetcher.fetch(client, method, url, data, headers, json)
+        key = get_cache_key(url)
+        body = self._cache.get(key, allow_expired=self._offline)
+        if body is not None:
+            return (body.encode('utf-8'), 200)
+        if self._offline:
+            raise CacheMissError('{0} is not in the discogs cache, and it cannot be fetched in offline mode.'.format(key))
+        content, status_code = self._fetcher.fetch(client, method, url, data, headers, json)
+        if status_code == 200:
+            self._cache.put(key, content.decode('utf-8'))
+        return (content, status_code)
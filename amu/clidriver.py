@@ -1,12 +1,25 @@
 #!/usr/bin/env python
 import argparse
+import multiprocessing
+import os
 import sys
 import traceback
-from amu.audio import LameEncoder, RubyRipperCdRipper
+from amu.audio import ARTWORK_PROCESSES, ArtworkCache, LameEncoder, RubyRipperCdRipper
 from amu.config import ConfigurationProvider
+from amu.execution import CommandExecutionError, CommandExecutor
+from amu.journal import CommandJournal, get_batch_argv, get_journal_path
 from amu.metadata import DiscogsMetadataService
 from amu.metadata import MaskReplacer
 from amu.parsing import CommandParser
+from amu.plan import PlanFile
+from amu.progress import EncodeProgressReporter
+from amu.serialization import CommandSerializer
+
+# The commands that only read, which don't need a journal since running them again does
+# the same job.
+UNJOURNALED_COMMANDS = ['fetch', 'query', 'search']
+# The commands that can embed covers, which may need covers scaling down.
+ARTWORK_COMMANDS = ['encode', 'tag', 'artwork', 'mix', 'run-plan']
 
 
 class CliDriver(object):
@@ -15,10 +28,57 @@ class CliDriver(object):
         be useful for unit testing the command parser. """
         parser = argparse.ArgumentParser()
         subparsers = parser.add_subparsers(dest='command')
-        fetch_parser = subparsers.add_parser('fetch', help='fetches and displays a release from discogs')
-        fetch_parser.add_argument('discogs_id', help='the ID of the release')
+        fetch_parser = subparsers.add_parser('fetch', help='fetches and displays releases from discogs')
+        fetch_parser.add_argument('discogs_id', nargs='*', help='the IDs of the releases')
+        fetch_parser.add_argument(
+            '--from-file', help='A file with a discogs ID on each line, to fetch along with any other IDs. Use - to read the IDs from stdin.')
+        fetch_parser.add_argument(
+            '--json', action='store_true', help='Print each release, including its original release, as a single line of JSON.')
+        self._add_offline_argument(fetch_parser)
+        self._add_jobs_argument(fetch_parser)
+        self._add_plan_out_argument(fetch_parser)
+        discogs_parser = subparsers.add_parser('discogs', help='manages the local store of discogs releases')
+        discogs_subparsers = discogs_parser.add_subparsers(dest='discogs_action')
+        import_dump_parser = discogs_subparsers.add_parser(
+            'import-dump',
+            help='Imports a discogs releases dump, so releases can be looked up without using the API. Set use_dump in the discogs section of the config file to use it.')
+        import_dump_parser.add_argument('dump', help='The path of the releases dump. This can be the gzipped file as it was downloaded.')
+        self._add_resume_argument(import_dump_parser)
+        index_parser = subparsers.add_parser('index', help='manages the index of the tracks in the library')
+        index_subparsers = index_parser.add_subparsers(dest='index_action')
+        build_index_parser = index_subparsers.add_parser(
+            'build',
+            help='Scans the mp3 and flac release directories into the library index. Only the directories that have changed since the last build are read again.')
+        build_index_parser.add_argument(
+            '--full', action='store_true', help='Read every track again, rather than just the ones in the directories that have changed.')
+        build_index_parser.add_argument(
+            '--workers', type=int, help='The number of processes to read the tracks with. Defaults to the number of cores.')
+        self._add_resume_argument(build_index_parser)
+        query_parser = subparsers.add_parser(
+            'query', help='finds tracks in the library index, printing their paths or a line of JSON for each one')
+        query_parser.add_argument('--artist', help='The artist of the tracks.')
+        query_parser.add_argument('--label', help='The label of the releases.')
+        query_parser.add_argument('--catno', help='The catalogue number of the releases.')
+        query_parser.add_argument('--year', help='The year of the releases.')
+        query_parser.add_argument('--genre', help='The genre of the releases.')
+        query_parser.add_argument('--discogs-id', type=int, help='The discogs ID of the releases.')
+        query_parser.add_argument('--format', choices=['mp3', 'flac'], help='The format of the tracks.')
+        query_parser.add_argument(
+            '--without-format',
+            choices=['mp3', 'flac'],
+            help='Leave out the releases that are also in this format. Use --format mp3 --without-format flac to find the releases that are only in mp3.')
+        query_parser.add_argument('--min-duration', type=float, help='The shortest track to find, in seconds.')
+        query_parser.add_argument('--max-duration', type=float, help='The longest track to find, in seconds.')
+        query_parser.add_argument('--title', help='Words to search for in the track titles.')
+        query_parser.add_argument(
+            '--releases', action='store_true', help='Print the directory of each release with matching tracks, rather than the tracks.')
+        query_parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print a line of JSON for each result. A path that is not valid UTF-8 is written as {"bytes": <the base64 of the path>}.')
         rip_parser = subparsers.add_parser('rip', help='rips the current CD to WAV')
         rip_parser.add_argument('--destination', help='optional destination for the CD rip')
+        self._add_resume_argument(rip_parser)
         search_parser = subparsers.add_parser(
             'search',
             prog='search',
@@ -29,7 +89,9 @@ class CliDriver(object):
         encode_parser.add_argument(
             'encoding_from', choices=['cd', 'wav'], help='The source to encode from.')
         encode_parser.add_argument(
-            'encoding_to', choices=['mp3', 'flac'], help='The destination to encode to.')
+            'encoding_to',
+            type=self._get_encoding_formats,
+            help='The destination to encode to: mp3, flac, or a comma separated list such as mp3,flac to encode to each of them in one pass.')
         encode_parser.add_argument(
             '--source', help='The destination of the source wav file. This can be a file or directory.')
         encode_parser.add_argument(
@@ -40,6 +102,17 @@ class CliDriver(object):
             '--collapse-index-tracks', action='store_true', help='If set this will collapse any subtracks to a single track.')
         encode_parser.add_argument(
             '--discogs-id', help='The discogs ID for the release. When this is used metadata from the discogs release will be applied to the encoded files.')
+        self._add_offline_argument(encode_parser)
+        encode_parser.add_argument(
+            '--metrics-file',
+            help='A file to append a JSON line to for each encoded track, with the wall time, the speed relative to realtime and the compression ratio.')
+        encode_parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only encode the wavs that have changed since they were last encoded with this option. A manifest of what was encoded is kept with the encoded files. This cannot be used with --discogs-id.')
+        self._add_jobs_argument(encode_parser)
+        self._add_resume_argument(encode_parser)
+        self._add_plan_out_argument(encode_parser)
         decode_parser = subparsers.add_parser('decode', help='Decodes a set of FLAC or MP3 files to WAV.')
         decode_parser.add_argument(
             'decode_from', choices=['flac', 'mp3'], help='The source to decode from.')
@@ -47,6 +120,22 @@ class CliDriver(object):
             '--source', help='The destination of the source file. This can be a file or directory.')
         decode_parser.add_argument(
             '--destination', help='The destination of the resulting wav. This can be a file or directory.')
+        self._add_jobs_argument(decode_parser)
+        self._add_resume_argument(decode_parser)
+        self._add_plan_out_argument(decode_parser)
+        transcode_parser = subparsers.add_parser(
+            'transcode', help='Transcodes a set of FLAC files to MP3, without writing any intermediate WAVs.')
+        transcode_parser.add_argument(
+            'transcode_from', choices=['flac'], help='The source to transcode from.')
+        transcode_parser.add_argument(
+            'transcode_to', choices=['mp3'], help='The destination to transcode to.')
+        transcode_parser.add_argument(
+            '--source', help='The destination of the source file. This can be a file or directory.')
+        transcode_parser.add_argument(
+            '--destination', help='The destination of the resulting mp3. This can be a file or directory.')
+        self._add_jobs_argument(transcode_parser)
+        self._add_resume_argument(transcode_parser)
+        self._add_plan_out_argument(transcode_parser)
         tag_parser = subparsers.add_parser('tag', help='Tags an audio file')
         tag_parser.add_argument(
             'action', choices=['add', 'remove'], help='The tagging action to be performed. A tag can be added or removed.')
@@ -58,6 +147,7 @@ class CliDriver(object):
             '--source',
             help='The source audio files to tag. This can be a file or a directory. If the source is omitted, the files in the current working directory will be used.')
         tag_parser.add_argument('--discogs-id', help='The discogs ID for the release. When this is used metadata from the discogs release will be applied to the tagged files.')
+        self._add_offline_argument(tag_parser)
         tag_parser.add_argument('--artist', help='The artist to use for the tag.')
         tag_parser.add_argument('--album-artist', help='The album artist to use for the tag.')
         tag_parser.add_argument('--album', help='The album to use for the tag.')
@@ -69,6 +159,9 @@ class CliDriver(object):
         tag_parser.add_argument('--disc-number', help='The disc number to use for the tag.')
         tag_parser.add_argument('--disc-total', help='The disc total to use for the tag.')
         tag_parser.add_argument('--comment', help='The comment for the tag.')
+        self._add_jobs_argument(tag_parser)
+        self._add_resume_argument(tag_parser)
+        self._add_plan_out_argument(tag_parser)
         artwork_parser = subparsers.add_parser('artwork', help='adds or removes artwork from a file')
         artwork_parser.add_argument(
             'action', choices=['add', 'remove'], help='The artwork action to be performed. The artwork can be added or removed.')
@@ -78,6 +171,15 @@ class CliDriver(object):
             '--source', help='The destination file or directory to apply the artwork to. If there is no source then any artwork in the current directory will be used.')
         artwork_parser.add_argument(
             '--destination', help='The destination file or directory to apply the artwork to. If there is no destination then the current directory will be used.')
+        self._add_jobs_argument(artwork_parser)
+        self._add_resume_argument(artwork_parser)
+        self._add_plan_out_argument(artwork_parser)
+        run_plan_parser = subparsers.add_parser(
+            'run-plan', help='Runs the commands in plan files that were written with --plan-out.')
+        run_plan_parser.add_argument(
+            'plans', nargs='+', help='The plan files to run. The commands from all of them are run as a single batch.')
+        self._add_jobs_argument(run_plan_parser)
+        self._add_resume_argument(run_plan_parser)
         mix_parser = subparsers.add_parser('mix', help='adds a mix')
         mix_parser.add_argument('source', help='the source of the mix')
         mix_parser.add_argument('--artist', help='The artist to use for the tag.')
@@ -85,31 +187,119 @@ class CliDriver(object):
         mix_parser.add_argument('--title', help='The title to use for the mix.')
         mix_parser.add_argument('--year', help='The year to use for the mix.')
         mix_parser.add_argument('--comment', help='The comment for the mix.')
+        self._add_resume_argument(mix_parser)
+        self._add_plan_out_argument(mix_parser)
         return parser
 
+    def _get_encoding_formats(self, value):
+        formats = value.split(',')
+        for format in formats:
+            if format not in ['mp3', 'flac']:
+                raise argparse.ArgumentTypeError("invalid format: '{0}' (choose from 'mp3', 'flac')".format(format))
+        if len(set(formats)) != len(formats):
+            raise argparse.ArgumentTypeError("each format can only be specified once: '{0}'".format(value))
+        return value
+
+    def _add_offline_argument(self, parser):
+        parser.add_argument(
+            '--offline', action='store_true', help='Only use discogs releases that have already been cached, rather than fetching them.')
+
+    def _add_jobs_argument(self, parser):
+        parser.add_argument(
+            '--jobs', type=int, help='The number of files to process at the same time. Defaults to the number of cores.')
+
+    def _add_resume_argument(self, parser):
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Continue a previous run of the same command that failed part way through, starting with the commands that did not complete.')
+
+    def _add_plan_out_argument(self, parser):
+        parser.add_argument(
+            '--plan-out',
+            help='Write the commands to a plan file rather than running them. The plan can be run later on with run-plan.')
+
+    def _get_commands(self, args, parser, serializer):
+        if args.command == 'run-plan':
+            commands = []
+            for plan in args.plans:
+                commands.extend(PlanFile(plan, serializer).read())
+            return commands
+        return parser.from_args(args)
+
+    def _get_argv(self):
+        """ Gets the arguments the journal is started with. --resume and --jobs are left
+        out, so the arguments match whether or not the batch is being resumed. """
+        return get_batch_argv(sys.argv[1:])
+
     def _get_arguments(self):
         parser = self.get_argument_parser()
         return parser.parse_args()
 
     def main(self):
         """ The main entry point for the CLI driver """
+        journal = None
+        stream = None
+        artwork_pool = None
         try:
             config_provider = ConfigurationProvider(MaskReplacer(), DirectorySelector())
-            parser = CommandParser(
-                config_provider,
-                RubyRipperCdRipper(config_provider),
-                DiscogsMetadataService(),
-                GenreSelector())
-            commands = parser.from_args(self._get_arguments())
-            for command in commands:
-                command.validate()
-                command.execute()
+            cd_ripper = RubyRipperCdRipper(config_provider)
+            args = self._get_arguments()
+            metadata_service = DiscogsMetadataService(config_provider, getattr(args, 'offline', False))
+            progress_reporter = EncodeProgressReporter(getattr(args, 'metrics_file', None))
+            artwork_pool = self._get_artwork_pool(args, config_provider)
+            artwork_cache = ArtworkCache(config_provider, artwork_pool)
+            parser = CommandParser(config_provider, cd_ripper, metadata_service, GenreSelector(), progress_reporter, artwork_cache)
+            serializer = CommandSerializer(config_provider, cd_ripper, metadata_service, progress_reporter, artwork_cache)
+            plan_out = getattr(args, 'plan_out', None)
+            if plan_out:
+                PlanFile(plan_out, serializer).write(self._get_argv(), parser.from_args(args))
+                print 'The plan was written to {0}.'.format(plan_out)
+                return 0
+            executor = CommandExecutor(getattr(args, 'jobs', None))
+            resume = getattr(args, 'resume', False)
+            stream = None if resume else parser.stream_from_args(args)
+            if stream is not None:
+                # Streamed commands aren't journaled, since they can't be planned up front.
+                # Each one is independent, so running the command again does the same job.
+                executor.execute_stream(stream)
+                return 0
+            if args.command in UNJOURNALED_COMMANDS:
+                executor.execute(self._get_commands(args, parser, serializer))
+                return 0
+            journal = CommandJournal(get_journal_path(os.getcwd(), self._get_argv()), serializer)
+            if resume:
+                commands = journal.resume(self._get_argv())
+            else:
+                commands = self._get_commands(args, parser, serializer)
+                journal.start(self._get_argv(), commands)
+            executor.execute(commands, journal.command_completed)
+            journal.remove()
             return 0
+        except CommandExecutionError as ex:
+            sys.stderr.write('{0}\n'.format(ex.message))
+            if journal is not None:
+                sys.stderr.write('Once the problem is fixed, run the same command with --resume to carry on from where it failed.\n')
+            return 255
         except Exception as ex:
             # This will be replaced with proper logging output.
             sys.stderr.write('{0}\n'.format(ex.message))
             sys.stderr.write('{0}\n'.format(traceback.format_exc()))
             return 255
+        finally:
+            if journal:
+                journal.close()
+            if artwork_pool:
+                artwork_pool.close()
+                artwork_pool.join()
+
+    def _get_artwork_pool(self, args, config_provider):
+        """ Gets the pool of processes for scaling down covers, if the config says they should
+        be. The processes are forked here, before the threads that run the commands are
+        started. """
+        if args.command not in ARTWORK_COMMANDS or not config_provider.get_artwork_max_size():
+            return None
+        return multiprocessing.Pool(min(ARTWORK_PROCESSES, multiprocessing.cpu_count()))
 
 class DirectorySelector(object):
     def select_directory(self, directories):
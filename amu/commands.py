@@ -1,19 +1,50 @@
 """
 Houses all the commands in the application.
 """
+import base64
+import json
 import os
 import shutil
+import threading
 from amu.audio import LameEncoder, RubyRipperCdRipper
+from amu.library import LibraryQuery
 
 class CommandValidationError(Exception):
     def __init__(self, message):
         super(CommandValidationError, self).__init__(message)
         self.message = message
 
+_output_lock = threading.Lock()
+
+def _create_directory(path):
+    """ Creates the directory if it doesn't exist. Commands that run concurrently can
+    race to create the same directory, so losing that race is not an error. """
+    if not os.path.exists(path):
+        try:
+            os.makedirs(path)
+        except OSError:
+            if not os.path.isdir(path):
+                raise
+
 class Command(object):
     """ Base command that provides functionality common to all commands. """
     def __init__(self, config_provider):
         self._config_provider = config_provider
+        self._dependencies = None
+
+    @property
+    def dependencies(self):
+        """ The commands that must have finished before this command can run.
+
+        When this is None, the command depends on every command before it in the
+        list it belongs to, so it runs in the same order it would if the list was
+        executed sequentially. An empty list means the command can run at any time.
+        """
+        return self._dependencies
+
+    @dependencies.setter
+    def dependencies(self, value):
+        self._dependencies = value
 
     def validate(self):
         """ Validates the command before execution. """
@@ -32,6 +63,7 @@ class EncodeWavCommand(Command):
         self._source = ''
         self._destination = ''
         self._keep_source = False
+        self._manifest = None
 
     @property
     def source(self):
@@ -57,6 +89,23 @@ class EncodeWavCommand(Command):
     def keep_source(self, value):
         self._keep_source = value
 
+    @property
+    def manifest(self):
+        """ The manifest to record the encode in. When this is None, nothing is recorded. """
+        return self._manifest
+
+    @manifest.setter
+    def manifest(self, value):
+        self._manifest = value
+
+    def is_up_to_date(self):
+        """ Determines if the destination was already encoded from the same source, with the
+        same encoder and setting. This is always False when there's no manifest. """
+        if not self.manifest:
+            return False
+        return self.manifest.is_up_to_date(
+            self.source, self.destination, self._encoder.get_path(), self._encoder.get_encoding_setting())
+
     def validate(self):
         if self.source:
             if not os.path.exists(self.source):
@@ -69,10 +118,64 @@ class EncodeWavCommand(Command):
             raise CommandValidationError('A destination must be specified for encoding a wav')
 
     def execute(self):
-        directory_path = os.path.dirname(self.destination)
-        if not os.path.exists(directory_path):
-            os.makedirs(directory_path)
+        _create_directory(os.path.dirname(self.destination))
         self._encoder.encode(self.source, self.destination)
+        # The encoder raises when it fails, so only a complete output is recorded. A
+        # truncated one would look up to date to every incremental encode after it.
+        if self.manifest:
+            self.manifest.record(
+                self.source, self.destination, self._encoder.get_path(), self._encoder.get_encoding_setting())
+        if not self.keep_source:
+            os.remove(self.source)
+
+class MultiFormatEncodeWavCommand(Command):
+    """ Encodes a wav to several formats, reading the wav only once. """
+    def __init__(self, config_provider, encoder):
+        super(MultiFormatEncodeWavCommand, self).__init__(config_provider)
+        self._encoder = encoder
+        self._source = ''
+        self._destinations = []
+        self._keep_source = False
+
+    @property
+    def source(self):
+        return self._source
+
+    @source.setter
+    def source(self, value):
+        self._source = value
+
+    @property
+    def destinations(self):
+        return self._destinations
+
+    @destinations.setter
+    def destinations(self, value):
+        self._destinations = value
+
+    @property
+    def keep_source(self):
+        return self._keep_source
+
+    @keep_source.setter
+    def keep_source(self, value):
+        self._keep_source = value
+
+    def validate(self):
+        if self.source:
+            if not os.path.exists(self.source):
+                raise CommandValidationError('The specified source does not exist.')
+            if os.path.isdir(self.source):
+                raise CommandValidationError('The source cannot be a directory.')
+        else:
+            raise CommandValidationError('A source must be specified for encoding a wav')
+        if not self.destinations:
+            raise CommandValidationError('At least one destination must be specified for encoding a wav')
+
+    def execute(self):
+        for destination in self.destinations:
+            _create_directory(os.path.dirname(destination))
+        self._encoder.encode(self.source, self.destinations)
         if not self.keep_source:
             os.remove(self.source)
 
@@ -110,11 +213,46 @@ class DecodeAudioCommand(Command):
             raise CommandValidationError('The source cannot be a directory.')
 
     def execute(self):
-        directory_path = os.path.dirname(self.destination)
-        if not os.path.exists(directory_path):
-            os.makedirs(directory_path)
+        _create_directory(os.path.dirname(self.destination))
         self._encoder.decode(self.source, self.destination)
 
+class TranscodeAudioCommand(Command):
+    def __init__(self, config_provider, transcoder):
+        super(TranscodeAudioCommand, self).__init__(config_provider)
+        self._transcoder = transcoder
+        self._source = ''
+        self._destination = ''
+
+    @property
+    def source(self):
+        return self._source
+
+    @source.setter
+    def source(self, value):
+        self._source = value
+
+    @property
+    def destination(self):
+        return self._destination
+
+    @destination.setter
+    def destination(self, value):
+        self._destination = value
+
+    def validate(self):
+        if not self.source:
+            raise ValueError('A source must be specified for transcoding an audio file')
+        if not self.destination:
+            raise ValueError('A destination must be specified for transcoding an audio file')
+        if not os.path.exists(self.source):
+            raise CommandValidationError('The specified source does not exist.')
+        if os.path.isdir(self.source):
+            raise CommandValidationError('The source cannot be a directory.')
+
+    def execute(self):
+        _create_directory(os.path.dirname(self.destination))
+        self._transcoder.transcode(self.source, self.destination)
+
 class RipCdCommand(Command):
     def __init__(self, config_provider, cd_ripper):
         super(RipCdCommand, self).__init__(config_provider)
@@ -153,6 +291,7 @@ class AddTagCommand(Command):
         self._track_total = 0
         self._disc_number = 0
         self._disc_total = 0
+        self._artwork = ''
         self._tagger = tagger
 
     @property
@@ -251,6 +390,15 @@ class AddTagCommand(Command):
     def comment(self, value):
         self._comment = value
 
+    @property
+    def artwork(self):
+        """ The cover to add along with the tags, so the file is only written once. """
+        return self._artwork
+
+    @artwork.setter
+    def artwork(self, value):
+        self._artwork = value
+
     def validate(self):
         if not os.path.exists(self._source):
             raise CommandValidationError('The specified mp3 source does not exist.')
@@ -260,14 +408,18 @@ class AddTagCommand(Command):
             raise CommandValidationError('The track number must be at least 1.')
         if self._track_number > self._track_total:
             raise CommandValidationError('The track number cannot be greater than the track total.')
+        if self._artwork and not os.path.exists(self._artwork):
+            raise CommandValidationError('The artwork {0} does not exist.'.format(self._artwork))
 
     def execute(self):
         print u'[tag] Tagging {0} with {1}, {2}, {3}, {4}, {5}.'.format(
             self.source, self.artist, self.album, self.title, str(self.year), self.genre)
-        self._tagger.add_tags(
+        written = self._tagger.add_tags(
             self.source, self.artist, self.album_artist, self.album,
             self.title, self.year, self.genre, self.comment,
-            self.track_number, self.track_total, self.disc_number, self.disc_total)
+            self.track_number, self.track_total, self.disc_number, self.disc_total, self.artwork)
+        if not written:
+            print u'[tag] Skipped {0}, it already has these tags.'.format(self.source)
 
 class RemoveTagCommand(Command):
     def __init__(self, config_provider, tagger):
@@ -298,6 +450,7 @@ class MoveAudioFileCommand(Command):
         super(MoveAudioFileCommand, self).__init__(config_provider)
         self._source = ''
         self._destination = ''
+        self._copy = False
 
     @property
     def source(self):
@@ -315,6 +468,16 @@ class MoveAudioFileCommand(Command):
     def destination(self, value):
         self._destination = value
 
+    @property
+    def copy(self):
+        """ If set, the file is copied rather than moved, for when another command
+        still needs the file in its original location. """
+        return self._copy
+
+    @copy.setter
+    def copy(self, value):
+        self._copy = value
+
     def validate(self):
         if not self._source:
             raise CommandValidationError('A source must be supplied for the move audio file command.')
@@ -332,10 +495,12 @@ class MoveAudioFileCommand(Command):
                     source_extension, destination_extension))
 
     def execute(self):
+        _create_directory(os.path.dirname(self._destination))
+        if self.copy:
+            print u'[move] Copying file {0} to {1}'.format(self.source, self.destination)
+            shutil.copy2(self.source, self.destination)
+            return
         print u'[move] Moving file {0} to {1}'.format(self.source, self.destination)
-        directory = os.path.dirname(self._destination)
-        if not os.path.exists(directory):
-            os.makedirs(directory)
         shutil.move(self.source, self.destination)
 
 class FetchReleaseCommand(Command):
@@ -343,6 +508,7 @@ class FetchReleaseCommand(Command):
         super(FetchReleaseCommand, self).__init__(config_provider)
         self._metadata_service = metadata_service
         self._discogs_id = 0
+        self._output_json = False
 
     @property
     def discogs_id(self):
@@ -352,6 +518,15 @@ class FetchReleaseCommand(Command):
     def discogs_id(self, value):
         self._discogs_id = value
 
+    @property
+    def output_json(self):
+        """ Print the release as a single line of JSON, rather than as text. """
+        return self._output_json
+
+    @output_json.setter
+    def output_json(self, value):
+        self._output_json = value
+
     def validate(self):
         try:
             int(self.discogs_id)
@@ -359,8 +534,275 @@ class FetchReleaseCommand(Command):
             raise CommandValidationError('The fetch command must use a valid integer for the discogs ID.')
 
     def execute(self):
+        # The original release is always fetched, even though the text doesn't display it,
+        # so fetching releases ahead of time caches them the way encode and tag look them up.
         release_model = self._metadata_service.get_release_by_id(self.discogs_id)
-        print unicode(release_model)
+        if self.output_json:
+            output = json.dumps(release_model.to_dict(), sort_keys=True)
+        else:
+            output = unicode(release_model)
+        # Releases can be fetched at the same time, so each one is printed in a single write.
+        with _output_lock:
+            print output
+
+class ImportDiscogsDumpCommand(Command):
+    def __init__(self, config_provider, dump_store):
+        super(ImportDiscogsDumpCommand, self).__init__(config_provider)
+        self._dump_store = dump_store
+        self._source = ''
+
+    @property
+    def source(self):
+        return self._source
+
+    @source.setter
+    def source(self, value):
+        self._source = value
+
+    def validate(self):
+        if not self.source:
+            raise CommandValidationError('A source must be specified for importing a discogs dump.')
+        if not os.path.exists(self.source):
+            raise CommandValidationError('The source for the discogs dump must exist.')
+
+    def execute(self):
+        print u'[import] Importing {0} to {1}'.format(self.source, self._dump_store.path)
+        count = self._dump_store.import_dump(self.source)
+        print u'[import] Imported {0} releases'.format(count)
+
+class BuildLibraryIndexCommand(Command):
+    def __init__(self, config_provider, scanner):
+        super(BuildLibraryIndexCommand, self).__init__(config_provider)
+        self._scanner = scanner
+        self._roots = []
+        self._full = False
+        self._workers = None
+
+    @property
+    def roots(self):
+        """ The release directories to index. """
+        return self._roots
+
+    @roots.setter
+    def roots(self, value):
+        self._roots = value
+
+    @property
+    def full(self):
+        """ Whether to read every track again, rather than just the ones in the directories
+        that have changed. """
+        return self._full
+
+    @full.setter
+    def full(self, value):
+        self._full = value
+
+    @property
+    def workers(self):
+        return self._workers
+
+    @workers.setter
+    def workers(self, value):
+        self._workers = value
+
+    def validate(self):
+        if not self.roots:
+            raise CommandValidationError('At least one release directory must be specified for building the library index.')
+        for root in self.roots:
+            if not os.path.isdir(root):
+                raise CommandValidationError('The release directory {0} does not exist.'.format(root))
+        if self.workers is not None and self.workers < 1:
+            raise CommandValidationError('At least 1 worker must be used for building the library index.')
+
+    def execute(self):
+        print u'[index] Indexing {0}'.format(', '.join(self.roots))
+        result = self._scanner.scan(self.roots, self.full, self.workers)
+        print u'[index] Scanned {0} directories and skipped {1} that were unchanged. Removed {2} directories that no longer exist.'.format(
+            result.directories_scanned, result.directories_skipped, result.directories_removed)
+        print u'[index] Indexed {0} tracks.'.format(result.tracks_indexed)
+        if result.unreadable_tracks:
+            print u'[index] {0} tracks could not be read.'.format(result.unreadable_tracks)
+
+class QueryLibraryCommand(Command):
+    def __init__(self, config_provider, index):
+        super(QueryLibraryCommand, self).__init__(config_provider)
+        self._index = index
+        self._artist = None
+        self._label = None
+        self._catno = None
+        self._year = None
+        self._genre = None
+        self._discogs_id = None
+        self._format = None
+        self._without_format = None
+        self._min_duration = None
+        self._max_duration = None
+        self._title = None
+        self._releases = False
+        self._output_json = False
+
+    @property
+    def artist(self):
+        return self._artist
+
+    @artist.setter
+    def artist(self, value):
+        self._artist = value
+
+    @property
+    def label(self):
+        return self._label
+
+    @label.setter
+    def label(self, value):
+        self._label = value
+
+    @property
+    def catno(self):
+        """ The catalogue number. """
+        return self._catno
+
+    @catno.setter
+    def catno(self, value):
+        self._catno = value
+
+    @property
+    def year(self):
+        return self._year
+
+    @year.setter
+    def year(self, value):
+        self._year = value
+
+    @property
+    def genre(self):
+        return self._genre
+
+    @genre.setter
+    def genre(self, value):
+        self._genre = value
+
+    @property
+    def discogs_id(self):
+        return self._discogs_id
+
+    @discogs_id.setter
+    def discogs_id(self, value):
+        self._discogs_id = value
+
+    @property
+    def format(self):
+        """ The format of the tracks, mp3 or flac. """
+        return self._format
+
+    @format.setter
+    def format(self, value):
+        self._format = value
+
+    @property
+    def without_format(self):
+        """ Leave out the tracks from releases that are also in this format. """
+        return self._without_format
+
+    @without_format.setter
+    def without_format(self, value):
+        self._without_format = value
+
+    @property
+    def min_duration(self):
+        """ The shortest track to find, in seconds. """
+        return self._min_duration
+
+    @min_duration.setter
+    def min_duration(self, value):
+        self._min_duration = value
+
+    @property
+    def max_duration(self):
+        """ The longest track to find, in seconds. """
+        return self._max_duration
+
+    @max_duration.setter
+    def max_duration(self, value):
+        self._max_duration = value
+
+    @property
+    def title(self):
+        """ A full text search of the track titles. """
+        return self._title
+
+    @title.setter
+    def title(self, value):
+        self._title = value
+
+    @property
+    def releases(self):
+        """ Find the releases with matching tracks, rather than the tracks. """
+        return self._releases
+
+    @releases.setter
+    def releases(self, value):
+        self._releases = value
+
+    @property
+    def output_json(self):
+        return self._output_json
+
+    @output_json.setter
+    def output_json(self, value):
+        self._output_json = value
+
+    def validate(self):
+        if not os.path.exists(self._index.path):
+            raise CommandValidationError(
+                'The library index {0} does not exist. It can be built with amu index build.'.format(self._index.path))
+        if self.year is not None:
+            try:
+                int(self.year)
+            except ValueError:
+                raise CommandValidationError('The query must use a valid integer for the year.')
+        if self.format is not None and self.format == self.without_format:
+            raise CommandValidationError('The query cannot be for tracks in {0} without {0}.'.format(self.format))
+        for duration in [self.min_duration, self.max_duration]:
+            if duration is not None and duration < 0:
+                raise CommandValidationError('The query must use a positive number of seconds for the durations.')
+        if self.min_duration is not None and self.max_duration is not None and self.min_duration > self.max_duration:
+            raise CommandValidationError('The minimum duration cannot be longer than the maximum duration.')
+
+    def execute(self):
+        query = self._get_query()
+        if self.releases:
+            results = self._index.find_releases(query)
+            lines = [_get_json_line(x) if self.output_json else x['directory'] for x in results]
+        elif self.output_json:
+            lines = [_get_json_line(x) for x in self._index.find_tracks(query)]
+        else:
+            lines = self._index.find_track_paths(query)
+        # The paths are written as the bytes they're encoded as on disk, so whatever the
+        # output is piped to can open them.
+        with _output_lock:
+            for line in lines:
+                print line
+
+    def _get_query(self):
+        query = LibraryQuery()
+        for name in [
+                'artist', 'label', 'catno', 'year', 'genre', 'discogs_id', 'format',
+                'without_format', 'min_duration', 'max_duration', 'title']:
+            setattr(query, name, getattr(self, name))
+        return query
+
+def _get_json_line(result):
+    """ JSON can only hold text, so a path that isn't valid UTF-8 is written as the base64 of
+    its bytes, in the same form the command serializer uses. """
+    result = dict(result)
+    for name in ['path', 'directory']:
+        if name in result:
+            try:
+                result[name] = result[name].decode('utf-8')
+            except UnicodeDecodeError:
+                result[name] = {'bytes': base64.b64encode(result[name])}
+    return json.dumps(result, sort_keys=True)
 
 class AddArtworkCommand(Command):
     def __init__(self, config_provider, tagger):
@@ -397,4 +839,5 @@ class AddArtworkCommand(Command):
 
     def execute(self):
         print u'[artwork] Adding {0} to {1}'.format(self.source, self.destination)
-        self._tagger.apply_artwork(self.source, self.destination)
+        if not self._tagger.apply_artwork(self.source, self.destination):
+            print u'[artwork] Skipped {0}, it already has this cover.'.format(self.destination)
@@ -3,6 +3,7 @@ import os
 import re
 import subprocess
 import tempfile
+import threading
 import uuid
 
 
@@ -12,25 +13,25 @@ class ConfigurationError(Exception):
         self.message = message
 
 class ConfigurationProvider(object):
+    """ Provides the settings from the .amu_config file in the home directory.
+
+    The parsed config file and the resolved tool paths are held on to, since the getters
+    are called for every track. They're thrown away if the modified time of the config
+    file changes, so anything that runs for a long time will still see any edits.
+    """
     def __init__(self, mask_replacer, directory_selector):
         self._mask_replacer = mask_replacer
         self._directory_selector = directory_selector
+        self._lock = threading.RLock()
+        self._config = None
+        self._config_modified_time = None
+        self._tool_paths = {}
 
     def get_lame_path(self):
-        if not subprocess.call(['which', 'lame']):
-            return 'lame'
-        path_from_env_variable = os.environ.get('LAME_PATH')
-        if path_from_env_variable:
-            return self._get_verified_path_from_environment_variable(path_from_env_variable, 'LAME_PATH', 'lame')
-        return self._get_verified_path_from_config_file('encoding', 'lame_path', 'lame')
+        return self._get_tool_path('lame', self._resolve_lame_path)
 
     def get_flac_path(self):
-        if not subprocess.call(['which', 'flac']):
-            return 'flac'
-        path_from_env_variable = os.environ.get('FLAC_PATH')
-        if path_from_env_variable:
-            return self._get_verified_path_from_environment_variable(path_from_env_variable, 'FLAC_PATH', 'flac')
-        return self._get_verified_path_from_config_file('encoding', 'flac_path', 'flac')
+        return self._get_tool_path('flac', self._resolve_flac_path)
 
     def get_lame_encoding_setting(self):
         config = self._get_config_parser()
@@ -54,6 +55,25 @@ class ConfigurationProvider(object):
         return decode_setting
 
     def get_ruby_ripper_path(self):
+        return self._get_tool_path('rubyripper_cli', self._resolve_ruby_ripper_path)
+
+    def _resolve_lame_path(self):
+        if not subprocess.call(['which', 'lame']):
+            return 'lame'
+        path_from_env_variable = os.environ.get('LAME_PATH')
+        if path_from_env_variable:
+            return self._get_verified_path_from_environment_variable(path_from_env_variable, 'LAME_PATH', 'lame')
+        return self._get_verified_path_from_config_file('encoding', 'lame_path', 'lame')
+
+    def _resolve_flac_path(self):
+        if not subprocess.call(['which', 'flac']):
+            return 'flac'
+        path_from_env_variable = os.environ.get('FLAC_PATH')
+        if path_from_env_variable:
+            return self._get_verified_path_from_environment_variable(path_from_env_variable, 'FLAC_PATH', 'flac')
+        return self._get_verified_path_from_config_file('encoding', 'flac_path', 'flac')
+
+    def _resolve_ruby_ripper_path(self):
         if not subprocess.call(['which', 'rubyripper_cli']):
             return 'rubyripper_cli'
         path_from_env_variable = os.environ.get('RUBYRIPPER_CLI_PATH')
@@ -92,6 +112,13 @@ class ConfigurationProvider(object):
         releases_base_directory = os.path.expanduser(config.get('directories', '{0}_releases_base_directory'.format(format)))
         return os.path.join(releases_base_directory, release_directories[index], replaced_mask)
 
+    def get_releases_base_directory(self, format):
+        config = self._get_config_parser()
+        return os.path.expanduser(config.get('directories', '{0}_releases_base_directory'.format(format)))
+
+    def get_library_index_path(self):
+        return os.path.expanduser(self._get_optional_setting('library', 'index_path', '~/.amu_library_index'))
+
     def use_genre(self):
         config_parser = self._get_config_parser()
         use_genre = config_parser.get('tagging', 'use_genre').lower()
@@ -101,6 +128,76 @@ class ConfigurationProvider(object):
             return False
         raise ConfigurationError('A true/false or yes/no value must be used for the use_genre setting.')
 
+    def get_tag_padding(self):
+        """ Gets the number of bytes to reserve after a tag when a file has to be rewritten,
+        so later edits can be made in place. The setting itself is in kilobytes. """
+        padding_kb = self._get_optional_setting('tagging', 'padding_kb', '64')
+        try:
+            padding_kb = int(padding_kb)
+        except ValueError:
+            padding_kb = -1
+        if padding_kb < 0:
+            raise ConfigurationError('A whole number of kilobytes must be used for the padding_kb setting.')
+        return padding_kb * 1024
+
+    def get_artwork_max_size(self):
+        """ Gets the largest width or height, in pixels, of the covers that are embedded in the
+        tracks. Larger covers are scaled down. 0, the default, embeds the covers as they are. """
+        max_size = self._get_optional_setting('tagging', 'artwork_max_size', '0')
+        try:
+            max_size = int(max_size)
+        except ValueError:
+            max_size = -1
+        if max_size < 0:
+            raise ConfigurationError('A whole number of pixels must be used for the artwork_max_size setting.')
+        return max_size
+
+    def get_artwork_quality(self):
+        quality = self._get_optional_setting('tagging', 'artwork_quality', '85')
+        try:
+            quality = int(quality)
+        except ValueError:
+            quality = 0
+        if quality < 1 or quality > 95:
+            raise ConfigurationError('A number from 1 to 95 must be used for the artwork_quality setting.')
+        return quality
+
+    def get_discogs_cache_path(self):
+        return os.path.expanduser(self._get_optional_setting('discogs', 'cache_path', '~/.amu_discogs_cache'))
+
+    def get_discogs_cache_ttl(self):
+        """ Gets the number of seconds a cached discogs response stays fresh for. The setting
+        itself is in days. """
+        ttl_days = self._get_optional_setting('discogs', 'cache_ttl_days', '30')
+        try:
+            return float(ttl_days) * 24 * 60 * 60
+        except ValueError:
+            raise ConfigurationError('A number of days must be used for the cache_ttl_days setting.')
+
+    def get_discogs_rate_limit_path(self):
+        return os.path.expanduser(self._get_optional_setting('discogs', 'rate_limit_path', '~/.amu_discogs_rate_limit'))
+
+    def get_discogs_requests_per_minute(self):
+        requests_per_minute = self._get_optional_setting('discogs', 'requests_per_minute', '60')
+        try:
+            requests_per_minute = int(requests_per_minute)
+        except ValueError:
+            requests_per_minute = 0
+        if requests_per_minute <= 0:
+            raise ConfigurationError('A positive whole number must be used for the requests_per_minute setting.')
+        return requests_per_minute
+
+    def use_discogs_offline_mode(self):
+        return self._get_optional_boolean_setting('discogs', 'offline')
+
+    def get_discogs_dump_path(self):
+        return os.path.expanduser(self._get_optional_setting('discogs', 'dump_path', '~/.amu_discogs_dump'))
+
+    def use_discogs_dump(self):
+        """ Whether the releases should be looked up in the imported discogs dump, rather
+        than using the API. """
+        return self._get_optional_boolean_setting('discogs', 'use_dump')
+
     def get_mixes_destination(self):
         return os.path.expanduser(self._get_verified_path_from_config_file('directories', 'mixes_directory', 'mixes_directory'))
 
@@ -116,6 +213,22 @@ class ConfigurationProvider(object):
             raise ConfigurationError('The masks releases setting in the amu_config file must have a value.')
         return release_masks.split('@')
 
+    def _get_optional_setting(self, config_section, config_value, default):
+        """ Gets a setting that can be left out of the config file, so config files that
+        were written before the setting existed still work. """
+        config = self._get_config_parser()
+        if not config.has_option(config_section, config_value):
+            return default
+        return config.get(config_section, config_value)
+
+    def _get_optional_boolean_setting(self, config_section, config_value):
+        value = self._get_optional_setting(config_section, config_value, 'false').lower()
+        if value in ['true', 'yes']:
+            return True
+        elif value in ['false', 'no']:
+            return False
+        raise ConfigurationError('A true/false or yes/no value must be used for the {0} setting.'.format(config_value))
+
     def _get_verified_path_from_environment_variable(self, path_from_env_variable, env_variable_name, program):
         if not os.path.exists(path_from_env_variable):
             raise ConfigurationError(
@@ -130,10 +243,38 @@ class ConfigurationProvider(object):
                 'The path specified for {0} in the .amu_config file is incorrect. Please provide a valid path for {0}.'.format(resource))
         return path_from_config
 
+    def _get_tool_path(self, tool, resolve_path):
+        with self._lock:
+            self._refresh_if_config_modified(self._get_config_path())
+            if tool not in self._tool_paths:
+                self._tool_paths[tool] = resolve_path()
+            return self._tool_paths[tool]
+
+    def _refresh_if_config_modified(self, config_path):
+        """ Throws away everything that's being held on to if the config file has changed
+        since it was read. A tool path can come from the config file, so those go too. """
+        try:
+            modified_time = os.path.getmtime(config_path)
+        except OSError:
+            modified_time = None
+        # A config file that doesn't exist has no modified time, so it's unchanged for as
+        # long as it stays missing.
+        if modified_time != self._config_modified_time:
+            self._config = None
+            self._tool_paths = {}
+            self._config_modified_time = modified_time
+
+    def _get_config_path(self):
+        return os.path.join(os.path.expanduser('~'), '.amu_config')
+
     def _get_config_parser(self):
-        config = ConfigParser.ConfigParser()
-        config_path = os.path.join(os.path.expanduser('~'), '.amu_config')
-        if not os.path.exists(config_path):
-            raise ConfigurationError('The .amu_config file does not exist in your home directory.')
-        config.read(config_path)
-        return config
+        with self._lock:
+            config_path = self._get_config_path()
+            self._refresh_if_config_modified(config_path)
+            if self._config is None:
+                if not os.path.exists(config_path):
+                    raise ConfigurationError('The .amu_config file does not exist in your home directory.')
+                config = ConfigParser.ConfigParser()
+                config.read(config_path)
+                self._config = config
+            return self._config
@@ -0,0 +1,220 @@
+"""
+A local store of discogs releases, imported from the monthly discogs data dump, so
+releases can be looked up without using the API.
+"""
+import gzip
+import json
+import sqlite3
+import xml.etree.cElementTree as ElementTree
+from amu.cache import get_resource_path
+
+IMPORT_BATCH_SIZE = 1000
+
+class DumpError(Exception):
+    def __init__(self, message):
+        super(DumpError, self).__init__(message)
+        self.message = message
+
+def iter_dump_releases(dump_path):
+    """ Reads the releases from a discogs releases dump, one at a time.
+
+    Each release element is cleared once it has been read, so the memory used stays the
+    same however large the dump is.
+
+    :dump_path: The path of the dump. It can be gzipped, as it is when it's downloaded.
+    :returns: A generator of releases, in the same form as the releases from the API.
+    """
+    dump_file = gzip.open(dump_path, 'rb') if dump_path.endswith('.gz') else open(dump_path, 'rb')
+    try:
+        root = None
+        depth = 0
+        for event, element in ElementTree.iterparse(dump_file, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = element
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 1 and element.tag == 'release':
+                yield get_release_from_element(element)
+                root.clear()
+    except SyntaxError, ex:
+        raise DumpError('The dump at {0} could not be read: {1}'.format(dump_path, ex))
+    finally:
+        dump_file.close()
+
+def get_release_from_element(element):
+    """ Converts a release element from the dump to the form of a release from the API,
+    so it can be used with the discogs client. """
+    released = _get_text(element, 'released')
+    release = {
+        'id': int(element.get('id')),
+        'title': _get_text(element, 'title'),
+        'country': _get_text(element, 'country'),
+        'released': released,
+        'year': _get_year(released),
+        'artists': [_get_artist(x) for x in element.findall('artists/artist')],
+        'labels': [_get_label(x) for x in element.findall('labels/label')],
+        'formats': [_get_format(x) for x in element.findall('formats/format')],
+        'genres': [x.text for x in element.findall('genres/genre')],
+        'styles': [x.text for x in element.findall('styles/style')],
+        'tracklist': [_get_track(x) for x in element.findall('tracklist/track')]
+    }
+    master = element.find('master_id')
+    if master is not None and master.text:
+        release['master_id'] = int(master.text)
+        release['is_main_release'] = master.get('is_main_release') == 'true'
+    return release
+
+def _get_text(element, path):
+    text = element.findtext(path)
+    return text if text else ''
+
+def _get_year(released):
+    try:
+        return int(released[:4])
+    except ValueError:
+        return 0
+
+def _get_artist(element):
+    return {
+        'id': int(_get_text(element, 'id') or 0),
+        'name': _get_text(element, 'name'),
+        'anv': _get_text(element, 'anv'),
+        'join': _get_text(element, 'join'),
+        'role': _get_text(element, 'role'),
+        'tracks': _get_text(element, 'tracks')
+    }
+
+def _get_label(element):
+    return {
+        'id': int(element.get('id') or 0),
+        'name': element.get('name', ''),
+        'catno': element.get('catno', '')
+    }
+
+def _get_format(element):
+    return {
+        'name': element.get('name', ''),
+        'qty': element.get('qty', '1'),
+        'text': element.get('text', ''),
+        'descriptions': [x.text for x in element.findall('descriptions/description')]
+    }
+
+def _get_track(element):
+    """ The dump has no track types, so they're worked out the way the API does: a track
+    with sub tracks is an index track, and one without a position is a heading. """
+    sub_tracks = [_get_track(x) for x in element.findall('sub_tracks/track')]
+    position = _get_text(element, 'position')
+    if sub_tracks:
+        track_type = 'index'
+    elif not position:
+        track_type = 'heading'
+    else:
+        track_type = 'track'
+    track = {
+        'position': position,
+        'type_': track_type,
+        'title': _get_text(element, 'title'),
+        'duration': _get_text(element, 'duration'),
+        'artists': [_get_artist(x) for x in element.findall('artists/artist')],
+        'extraartists': [_get_artist(x) for x in element.findall('extraartists/artist')]
+    }
+    if sub_tracks:
+        track['sub_tracks'] = sub_tracks
+    return track
+
+class DiscogsDumpStore(object):
+    """ Stores the releases from a dump in an SQLite database, keyed on the release ID and
+    indexed on the master, so the main release of a master can be found. """
+    def __init__(self, path):
+        self._path = path
+
+    @property
+    def path(self):
+        return self._path
+
+    def import_dump(self, dump_path):
+        """ Imports every release in a dump. Releases that are already in the store are
+        replaced.
+
+        :returns: The number of releases that were imported.
+        """
+        connection = self._connect()
+        count = 0
+        try:
+            batch = []
+            for release in iter_dump_releases(dump_path):
+                batch.append((
+                    release['id'],
+                    release.get('master_id'),
+                    1 if release.get('is_main_release') else 0,
+                    json.dumps(release)))
+                if len(batch) == IMPORT_BATCH_SIZE:
+                    count += self._insert(connection, batch)
+                    batch = []
+            count += self._insert(connection, batch)
+        finally:
+            connection.close()
+        return count
+
+    def get_release(self, id):
+        """ :returns: The release in the same form as the API, or None if it isn't stored. """
+        row = self._query_one('SELECT body FROM releases WHERE id = ?', (id,))
+        return json.loads(row[0]) if row else None
+
+    def get_main_release_id(self, master_id):
+        row = self._query_one(
+            'SELECT id FROM releases WHERE master_id = ? AND is_main_release = 1', (master_id,))
+        return row[0] if row else None
+
+    def _insert(self, connection, batch):
+        with connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO releases (id, master_id, is_main_release, body) VALUES (?, ?, ?, ?)',
+                batch)
+        return len(batch)
+
+    def _query_one(self, sql, parameters):
+        connection = self._connect()
+        try:
+            return connection.execute(sql, parameters).fetchone()
+        finally:
+            connection.close()
+
+    def _connect(self):
+        connection = sqlite3.connect(self._path, timeout=30)
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS releases (id INTEGER PRIMARY KEY, master_id INTEGER, is_main_release INTEGER NOT NULL, body TEXT NOT NULL)')
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS releases_master ON releases (master_id, is_main_release)')
+        return connection
+
+class DumpFetcher(object):
+    """ A fetcher for the discogs client that answers requests for releases and masters
+    from the dump store, rather than the API. A master only has its ID and main release,
+    since that's all the dump of releases has for it. """
+    def __init__(self, store):
+        self._store = store
+
+    def fetch(self, client, method, url, data=None, headers=None, json=True):
+        body = self._get_body(url) if method == 'GET' else None
+        if body is None:
+            return self._get_response({'message': 'The resource is not in the discogs dump.'}, 404)
+        return self._get_response(body, 200)
+
+    def _get_body(self, url):
+        resource = get_resource_path(url).split('/')
+        if len(resource) != 2 or not resource[1].isdigit():
+            return None
+        id = int(resource[1])
+        if resource[0] == 'releases':
+            return self._store.get_release(id)
+        if resource[0] == 'masters':
+            main_release_id = self._store.get_main_release_id(id)
+            if main_release_id is not None:
+                return {'id': id, 'main_release': main_release_id}
+        return None
+
+    def _get_response(self, body, status_code):
+        return (json.dumps(body), status_code)
@@ -0,0 +1,273 @@
+"""
+Responsible for running the commands produced by the command parser.
+"""
+import multiprocessing
+import Queue
+import sys
+import traceback
+from multiprocessing.pool import ThreadPool
+
+PENDING = 'pending'
+READY = 'ready'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+# The number of commands taken from a stream for each job, so a job always has its next
+# command ready when it finishes one.
+STREAM_WINDOW_PER_JOB = 2
+
+class CommandExecutionError(Exception):
+    def __init__(self, message, failures):
+        super(CommandExecutionError, self).__init__(message)
+        self.message = message
+        self.failures = failures
+
+class CommandGraph(object):
+    """ The dependency graph for a list of commands.
+
+    The edges come from the dependencies property on each command. A command with no
+    declared dependencies depends on every command before it in the list, so a list
+    where none of the commands declare dependencies behaves exactly like it did when
+    the commands were run one after the other.
+
+    Dependencies on commands that aren't in the list are treated as being satisfied.
+    """
+    def __init__(self, commands):
+        self._commands = list(commands)
+        positions = dict((id(command), i) for i, command in enumerate(self._commands))
+        self._dependencies = []
+        for command in self._commands:
+            if command.dependencies is None:
+                self._dependencies.append(None)
+            else:
+                self._dependencies.append(
+                    [positions[id(d)] for d in command.dependencies if id(d) in positions])
+        self._states = [PENDING] * len(self._commands)
+        self._pending = range(len(self._commands))
+        self._first_unsucceeded = 0
+        self._first_unsuccessful = len(self._commands)
+
+    def get_command(self, position):
+        return self._commands[position]
+
+    def has_pending(self):
+        return len(self._pending) > 0
+
+    def get_state(self, position):
+        return self._states[position]
+
+    def get_ready(self):
+        """ Gets the positions of the pending commands that are ready to run.
+
+        Any pending command that depends on a failed or skipped command is marked as
+        skipped. The ready commands are ordered so that commands continuing the work on
+        a track come before commands starting a new one, which lets each track get all
+        the way through the graph as early as possible.
+
+        :returns: A tuple of the ready positions and the newly skipped positions.
+        """
+        ready = []
+        skipped = []
+        still_pending = []
+        for position in self._pending:
+            state = self._get_state_from_dependencies(position)
+            if state == SKIPPED:
+                self._set_state(position, SKIPPED)
+                skipped.append(position)
+                continue
+            if state == READY:
+                ready.append(position)
+            still_pending.append(position)
+        self._pending = still_pending
+        ready.sort(key=lambda position: (0 if self._dependencies[position] else 1, position))
+        return (ready, skipped)
+
+    def mark_running(self, position):
+        self._pending.remove(position)
+        self._set_state(position, RUNNING)
+
+    def mark_finished(self, position, succeeded):
+        self._set_state(position, SUCCEEDED if succeeded else FAILED)
+
+    def _get_state_from_dependencies(self, position):
+        dependencies = self._dependencies[position]
+        if dependencies is None:
+            if self._first_unsuccessful < position:
+                return SKIPPED
+            if self._first_unsucceeded >= position:
+                return READY
+            return PENDING
+        states = [self._states[d] for d in dependencies]
+        if FAILED in states or SKIPPED in states:
+            return SKIPPED
+        if all(state == SUCCEEDED for state in states):
+            return READY
+        return PENDING
+
+    def _set_state(self, position, state):
+        self._states[position] = state
+        if state in [FAILED, SKIPPED]:
+            self._first_unsuccessful = min(self._first_unsuccessful, position)
+        while self._first_unsucceeded < len(self._states) and self._states[self._first_unsucceeded] == SUCCEEDED:
+            self._first_unsucceeded += 1
+
+class CommandExecutor(object):
+    """ Runs a list of commands on a pool of workers, starting each command as soon
+    as the commands it depends on have finished.
+
+    A failure doesn't stop the commands that don't depend on the failed command from
+    running, but anything that does depend on it is skipped.
+    """
+    def __init__(self, jobs=None):
+        if jobs is None:
+            jobs = multiprocessing.cpu_count()
+        if jobs < 1:
+            raise ValueError('At least 1 job must be used to execute the commands.')
+        self._jobs = jobs
+
+    @property
+    def jobs(self):
+        return self._jobs
+
+    def execute(self, commands, command_completed=None):
+        """ Executes the commands.
+
+        :commands: The commands to execute.
+        :command_completed: An optional function that's called with each command that
+        completes successfully, as soon as it completes.
+        """
+        graph = CommandGraph(commands)
+        failures = []
+        skipped_count = 0
+        results = Queue.Queue()
+        running = 0
+        pool = ThreadPool(self._jobs)
+        try:
+            while True:
+                ready, skipped = graph.get_ready()
+                for position in skipped:
+                    self._report_skipped(graph.get_command(position))
+                skipped_count += len(skipped)
+                for position in ready[:self._jobs - running]:
+                    graph.mark_running(position)
+                    pool.apply_async(self._run_command, (position, graph.get_command(position)), callback=results.put)
+                    running += 1
+                if running == 0:
+                    if graph.has_pending():
+                        raise CommandExecutionError(
+                            'The remaining commands can never run, as they have circular dependencies.',
+                            _get_ordered_failures(graph, failures))
+                    break
+                position, error = self._wait_for_result(results)
+                running -= 1
+                graph.mark_finished(position, error is None)
+                if error is not None:
+                    failures.append((position, error))
+                elif command_completed:
+                    command_completed(graph.get_command(position))
+        finally:
+            pool.close()
+            pool.join()
+        if failures:
+            raise CommandExecutionError(
+                '{0} command(s) failed to execute and {1} were skipped.'.format(len(failures), skipped_count),
+                _get_ordered_failures(graph, failures))
+
+    def execute_stream(self, commands, command_completed=None):
+        """ Executes commands as they're taken from an iterable, such as a generator.
+
+        The commands must be independent of each other. Only a few commands for each job
+        are taken ahead of the ones that are running, so the commands can be generated as
+        they're needed rather than all up front.
+
+        :commands: The commands to execute.
+        :command_completed: An optional function that's called with each command that
+        completes successfully, as soon as it completes.
+        """
+        commands = iter(commands)
+        window = self._jobs * STREAM_WINDOW_PER_JOB
+        failures = []
+        results = Queue.Queue()
+        running = 0
+        exhausted = False
+        pool = ThreadPool(self._jobs)
+        try:
+            while True:
+                while not exhausted and running < window:
+                    command = next(commands, None)
+                    if command is None:
+                        exhausted = True
+                        break
+                    # There are no positions in a stream, so the command stands in for one.
+                    pool.apply_async(self._run_command, (command, command), callback=results.put)
+                    running += 1
+                if running == 0:
+                    break
+                command, error = self._wait_for_result(results)
+                running -= 1
+                if error is not None:
+                    failures.append((command, error))
+                elif command_completed:
+                    command_completed(command)
+        finally:
+            pool.close()
+            pool.join()
+        if failures:
+            raise CommandExecutionError('{0} command(s) failed to execute.'.format(len(failures)), failures)
+
+    def _wait_for_result(self, results):
+        # A get without a timeout can't be interrupted with Ctrl-C.
+        while True:
+            try:
+                return results.get(True, 1)
+            except Queue.Empty:
+                pass
+
+    def _run_command(self, position, command):
+        try:
+            command.validate()
+            command.execute()
+        except Exception as ex:
+            try:
+                _write_error(u'[error] {0} failed: {1}\n'.format(_describe_command(command), _to_text(ex)))
+                _write_error('{0}\n'.format(traceback.format_exc()))
+            except Exception:
+                # The result has to be returned whatever happens, otherwise the executor
+                # waits for it forever.
+                pass
+            return (position, ex)
+        return (position, None)
+
+    def _report_skipped(self, command):
+        _write_error(u'[skip] {0} was skipped because a command it depends on failed.\n'.format(
+            _describe_command(command)))
+
+def _get_ordered_failures(graph, failures):
+    """ Gets the failed commands and their errors in the order the commands were given, rather than the order
+    they happened to finish in.
+    """
+    return [(graph.get_command(position), error) for position, error in sorted(failures, key=lambda f: f[0])]
+
+def _describe_command(command):
+    source = getattr(command, 'source', '')
+    if source:
+        return u'{0} for {1}'.format(type(command).__name__, _to_text(source))
+    return type(command).__name__
+
+def _to_text(value):
+    """ Paths and the messages of the exceptions about them can be byte strings that
+    aren't ASCII, which can't be formatted into a unicode string without decoding them. """
+    if isinstance(value, unicode):
+        return value
+    try:
+        value = str(value)
+    except UnicodeEncodeError:
+        return unicode(value)
+    return value.decode('utf-8', 'replace')
+
+def _write_error(message):
+    if isinstance(message, unicode):
+        message = message.encode('utf-8')
+    sys.stderr.write(message)
@@ -0,0 +1,165 @@
+"""
+A write-ahead journal of the commands in a batch, so a batch that fails part way through
+can be resumed.
+"""
+import errno
+import fcntl
+import hashlib
+import json
+import os
+from amu.serialization import deserialize_value, serialize_value
+
+PLANNED = 'planned'
+COMPLETED = 'completed'
+
+class JournalError(Exception):
+    def __init__(self, message):
+        super(JournalError, self).__init__(message)
+        self.message = message
+
+def get_batch_argv(argv):
+    """ Gets the arguments that identify a batch, leaving out --resume and --jobs. They
+    only change how the batch is run, so a batch can be resumed with a different number of
+    jobs to the one it was started with.
+    """
+    batch_argv = []
+    skip_value = False
+    for arg in argv:
+        if skip_value:
+            skip_value = False
+        elif arg == '--jobs':
+            skip_value = True
+        elif arg != '--resume' and not arg.startswith('--jobs='):
+            batch_argv.append(arg)
+    return batch_argv
+
+def get_journal_path(cwd, argv):
+    """ Gets the path of the journal for an invocation. Each directory and set of arguments
+    has its own journal, so amu can run in several places at once, and a batch can only be
+    resumed from the directory it was started in.
+    """
+    key = '\0'.join(x.encode('utf-8') if isinstance(x, unicode) else x for x in [cwd] + list(argv))
+    return os.path.join(os.path.expanduser('~'), '.amu_journals', hashlib.sha1(key).hexdigest())
+
+class CommandJournal(object):
+    """ An append only journal with one JSON entry per line.
+
+    The first entry holds the arguments the batch was run with and every command that was
+    planned for it. An entry is then added for each command as it completes. Every entry
+    is flushed to disk before carrying on, so the journal is accurate even if the process
+    is killed.
+
+    Resuming rebuilds the planned commands and leaves out the ones that completed. It can't
+    re-parse the original arguments, since the commands that already ran will have removed
+    or moved the files the parsing is based on.
+
+    The journal is locked while a batch is running, so the same command can't be started
+    or resumed in the same place while it's already running.
+    """
+    def __init__(self, path, serializer):
+        self._path = path
+        self._serializer = serializer
+        self._positions = {}
+        self._journal_file = None
+
+    @property
+    def path(self):
+        return self._path
+
+    def start(self, argv, commands):
+        """ Starts a new journal for a batch, replacing any previous one.
+
+        :argv: The command line arguments for the batch.
+        :commands: The commands planned for the batch.
+        """
+        self.close()
+        self._positions = dict((id(command), i) for i, command in enumerate(commands))
+        self._open()
+        self._journal_file.truncate(0)
+        self._write_entry({
+            'entry': PLANNED,
+            'argv': serialize_value(argv),
+            'commands': self._serializer.serialize(commands)
+        })
+
+    def resume(self, argv):
+        """ Gets the commands that still need to run from the journal of a previous batch.
+
+        :argv: The command line arguments for the batch being resumed. These must be the same
+        as the ones the journal was started with.
+        :returns: The planned commands that didn't complete, in their original order.
+        """
+        if not os.path.exists(self._path):
+            raise JournalError('There is no journal to resume from at {0}.'.format(self._path))
+        self.close()
+        self._open()
+        plan, completed_positions = self._read()
+        if deserialize_value(plan['argv']) != argv:
+            raise JournalError(u"The journal is for 'amu {0}', so it can't be used to resume this command.".format(
+                ' '.join(_to_text(x) for x in deserialize_value(plan['argv']))))
+        commands = self._serializer.deserialize(plan['commands'])
+        self._positions = dict((id(command), i) for i, command in enumerate(commands))
+        return [command for i, command in enumerate(commands) if i not in completed_positions]
+
+    def command_completed(self, command):
+        self._write_entry({'entry': COMPLETED, 'position': self._positions[id(command)]})
+
+    def close(self):
+        """ Closes the journal, which releases the lock on it. """
+        if self._journal_file:
+            self._journal_file.close()
+            self._journal_file = None
+
+    def remove(self):
+        """ Removes the journal, once every command in the batch has completed. It's removed
+        before the lock is released, so it can't belong to another process by then. """
+        if self._journal_file and os.path.exists(self._path):
+            os.remove(self._path)
+        self.close()
+
+    def _open(self):
+        directory = os.path.dirname(self._path)
+        if directory and not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+        # The file is opened for appending so a journal that's in use isn't truncated
+        # before finding out it's locked.
+        journal_file = open(self._path, 'a+')
+        try:
+            fcntl.flock(journal_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError as ex:
+            journal_file.close()
+            if ex.errno in [errno.EAGAIN, errno.EACCES]:
+                raise JournalError('The journal at {0} is being used by another amu process running the same command.'.format(self._path))
+            raise
+        self._journal_file = journal_file
+
+    def _write_entry(self, entry):
+        self._journal_file.write(json.dumps(entry) + '\n')
+        self._journal_file.flush()
+        os.fsync(self._journal_file.fileno())
+
+    def _read(self):
+        plan = None
+        completed_positions = set()
+        self._journal_file.seek(0)
+        for line in self._journal_file.readlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # The last line can be cut short if the process died while writing it.
+                continue
+            if entry['entry'] == PLANNED:
+                plan = entry
+            elif entry['entry'] == COMPLETED:
+                completed_positions.add(entry['position'])
+        self._journal_file.seek(0, os.SEEK_END)
+        if plan is None:
+            raise JournalError('The journal at {0} has no planned commands.'.format(self._path))
+        return (plan, completed_positions)
+
+def _to_text(value):
+    return value.decode('utf-8', 'replace') if isinstance(value, str) else value
@@ -0,0 +1,441 @@
+"""
+An index of the tracks in the library, so what's in the library can be found out without
+walking the disk.
+"""
+import multiprocessing
+import os
+import re
+import sqlite3
+from amu.audio import get_flac_tag_values, get_mp3_tag_values
+from mutagen.flac import FLAC
+from mutagen.mp3 import MP3
+
+AUDIO_FORMATS = ['mp3', 'flac']
+TRACK_COLUMNS = [
+    'path', 'directory', 'format', 'size', 'modified_time',
+    'artist', 'album_artist', 'album', 'title', 'year', 'genre', 'comment',
+    'label', 'catno', 'discogs_id', 'track_number', 'track_total', 'disc_number', 'disc_total',
+    'duration', 'bitrate', 'sample_rate', 'md5'
+]
+SCAN_CHUNK_SIZE = 16
+# The version of the tables in the index. An index from an older version is emptied when
+# it's opened, and the next build fills it again.
+SCHEMA_VERSION = 3
+# The columns that can be queried have an index that also holds the format, directory and
+# path, so a query that only needs those never has to read the tracks table.
+INDEXED_COLUMNS = ['artist', 'album_artist', 'label', 'catno', 'year', 'genre', 'discogs_id', 'duration']
+# The columns that identify the same release in another format, most reliable first. The
+# tracks are only counted as the same release on columns that have a value, so releases
+# without a label and catalogue number, say, don't all count as one.
+RELEASE_KEYS = [['discogs_id'], ['label', 'catno'], ['album', 'album_artist']]
+# The comment amu writes when it tags a release from discogs is 'Label (Catno)'.
+LABEL_COMMENT_PATTERN = re.compile(r'^(.+) \(([^()]+)\)$')
+
+class LibraryError(Exception):
+    def __init__(self, message):
+        super(LibraryError, self).__init__(message)
+        self.message = message
+
+def read_track(path):
+    """ Reads the tags, stream information and file information for a track.
+
+    This runs in the processes of the scanner's pool, so it only takes and returns plain
+    values.
+
+    :path: The path of the mp3 or flac, as it's encoded on disk. It's indexed as those
+    bytes, so a path that isn't valid UTF-8 can still be opened from the index.
+    :returns: A dictionary keyed on the track columns, or None if the file couldn't be read.
+    """
+    format = os.path.splitext(path)[1][1:].lower()
+    try:
+        stat = os.stat(path)
+        if format == 'flac':
+            audio = FLAC(path)
+            values = get_flac_tag_values(audio.tags or {})
+            values.update(_get_flac_release_values(audio.tags or {}, values['comment']))
+            md5 = '{0:032x}'.format(audio.info.md5_signature)
+        else:
+            audio = MP3(path)
+            values = get_mp3_tag_values(audio.tags)
+            values.update(_get_mp3_release_values(audio.tags or {}, values['comment']))
+            md5 = None
+    except Exception:
+        # A file that's corrupt can fail in all sorts of ways inside mutagen, and one bad
+        # file shouldn't stop the rest of the library being scanned.
+        return None
+    values.update({
+        'path': path,
+        'directory': os.path.dirname(path),
+        'format': format,
+        'size': stat.st_size,
+        'modified_time': stat.st_mtime,
+        'duration': audio.info.length,
+        'bitrate': getattr(audio.info, 'bitrate', None),
+        'sample_rate': audio.info.sample_rate,
+        'md5': md5
+    })
+    return values
+
+def _get_flac_release_values(comments, comment):
+    def get_value(key):
+        return comments[key][0] if key in comments else ''
+    return _get_release_values(
+        get_value('LABEL') or get_value('ORGANIZATION'), get_value('CATALOGNUMBER'), get_value('DISCOGS_RELEASE_ID'), comment)
+
+def _get_mp3_release_values(tag, comment):
+    def get_value(key):
+        frames = tag.getall(key) if tag else []
+        return unicode(frames[0].text[0]) if frames and frames[0].text else ''
+    return _get_release_values(
+        get_value('TPUB'), get_value('TXXX:CATALOGNUMBER'), get_value('TXXX:DISCOGS_RELEASE_ID'), comment)
+
+def _get_release_values(label, catno, discogs_id, comment):
+    """ Other taggers have fields for the label and catalogue number, but amu puts them in
+    the comment, so they're taken from there when the fields aren't set. """
+    match = LABEL_COMMENT_PATTERN.match(comment)
+    if match:
+        label = label or match.group(1)
+        catno = catno or match.group(2)
+    return {
+        'label': label,
+        'catno': catno,
+        'discogs_id': int(discogs_id) if discogs_id.strip().isdigit() else None
+    }
+
+class LibraryQuery(object):
+    """ The filters for finding tracks in the library index. A filter that's None isn't
+    applied.
+
+    The text filters match the whole value, ignoring case, apart from the title, which is
+    a full text search of the track titles. The year matches any date in that year.
+    Without format leaves out the tracks from releases that are also in that format, so
+    format mp3 without format flac finds the releases that are only in mp3. The same
+    release is the same discogs ID, label and catalogue number, or album and album artist.
+    """
+    def __init__(self):
+        self.artist = None
+        self.label = None
+        self.catno = None
+        self.year = None
+        self.genre = None
+        self.discogs_id = None
+        self.format = None
+        self.without_format = None
+        self.min_duration = None
+        self.max_duration = None
+        self.title = None
+
+class LibraryIndex(object):
+    """ An SQLite index of the tracks in the library.
+
+    Along with the tracks, the modified time and inode of each directory are recorded when
+    it's scanned. A directory whose modified time and inode are the same the next time
+    round hasn't had any files added, removed or renamed, though its files can still have
+    been retagged in place, which only shows in their own modified times and sizes.
+
+    The paths of the tracks and directories are stored as the bytes they're encoded as on
+    disk, rather than as text, so every path can be opened again and two names that only
+    differ in bytes that aren't valid UTF-8 are kept apart. They're returned as byte strings.
+    """
+    def __init__(self, path):
+        self._path = path
+
+    @property
+    def path(self):
+        return self._path
+
+    def get_directories(self):
+        """ Gets the directories that have been scanned.
+
+        :returns: A dictionary of the modified time and inode of each directory, keyed on
+        its path.
+        """
+        connection = self._connect()
+        try:
+            rows = connection.execute('SELECT path, modified_time, inode FROM directories').fetchall()
+        finally:
+            connection.close()
+        return dict((str(path), (modified_time, inode)) for path, modified_time, inode in rows)
+
+    def get_files(self):
+        """ Gets the files of the tracks in each directory.
+
+        :returns: A dictionary keyed on the directory path, of dictionaries of the modified
+        time and size of each track, keyed on its path.
+        """
+        connection = self._connect()
+        try:
+            rows = connection.execute('SELECT directory, path, modified_time, size FROM tracks').fetchall()
+        finally:
+            connection.close()
+        files = {}
+        for directory, path, modified_time, size in rows:
+            files.setdefault(str(directory), {})[str(path)] = (modified_time, size)
+        return files
+
+    def replace_directory(self, directory, modified_time, inode, tracks):
+        """ Replaces the tracks in a directory with the ones from a new scan of it. """
+        connection = self._connect()
+        try:
+            with connection:
+                _delete_tracks(connection, directory)
+                connection.executemany(
+                    'INSERT OR REPLACE INTO tracks ({0}) VALUES ({1})'.format(
+                        ', '.join(TRACK_COLUMNS), ', '.join('?' * len(TRACK_COLUMNS))),
+                    [_get_track_row(track) for track in tracks])
+                connection.execute(
+                    'INSERT INTO track_titles (docid, title) SELECT rowid, title FROM tracks WHERE directory = ?',
+                    (_to_blob(directory),))
+                connection.execute(
+                    'INSERT OR REPLACE INTO directories (path, modified_time, inode) VALUES (?, ?, ?)',
+                    (_to_blob(directory), modified_time, inode))
+        finally:
+            connection.close()
+
+    def remove_directories(self, directories):
+        """ Removes directories that no longer exist, along with their tracks. """
+        connection = self._connect()
+        try:
+            with connection:
+                for directory in directories:
+                    _delete_tracks(connection, directory)
+                    connection.execute('DELETE FROM directories WHERE path = ?', (_to_blob(directory),))
+        finally:
+            connection.close()
+
+    def find_tracks(self, query):
+        """ Finds the tracks that match a query.
+
+        :query: A LibraryQuery.
+        :returns: A dictionary for each track, keyed on the track columns, in path order.
+        """
+        where, parameters = _get_where_clause(query)
+        sql = 'SELECT {0} FROM tracks t{1} ORDER BY t.path'.format(', '.join('t.' + x for x in TRACK_COLUMNS), where)
+        return [_get_track(row) for row in self._execute_query(sql, parameters, query)]
+
+    def find_track_paths(self, query):
+        """ Finds the paths of the tracks that match a query. The common queries are
+        answered from the indexes alone. """
+        where, parameters = _get_where_clause(query)
+        sql = 'SELECT t.path FROM tracks t{0} ORDER BY t.path'.format(where)
+        return [str(row[0]) for row in self._execute_query(sql, parameters, query)]
+
+    def find_releases(self, query):
+        """ Finds the releases with tracks that match a query, where a release is a
+        directory of tracks.
+
+        :returns: A dictionary for each release, with its directory, album artist, album,
+        label, catalogue number, year, discogs ID and format, in directory order.
+        """
+        where, parameters = _get_where_clause(query)
+        columns = ['directory', 'album_artist', 'album', 'label', 'catno', 'year', 'discogs_id', 'format']
+        sql = 'SELECT {0} FROM tracks t{1} GROUP BY t.directory ORDER BY t.directory'.format(
+            ', '.join('t.' + x for x in columns), where)
+        releases = [dict(zip(columns, row)) for row in self._execute_query(sql, parameters, query)]
+        for release in releases:
+            release['directory'] = str(release['directory'])
+        return releases
+
+    def _execute_query(self, sql, parameters, query):
+        connection = self._connect()
+        try:
+            return connection.execute(sql, parameters).fetchall()
+        except sqlite3.OperationalError:
+            # The title is a full text search, which has its own syntax.
+            if query.title is None:
+                raise
+            raise LibraryError(u'The title search {0} is not valid.'.format(query.title))
+        finally:
+            connection.close()
+
+    def get_track_count(self):
+        connection = self._connect()
+        try:
+            return connection.execute('SELECT COUNT(*) FROM tracks').fetchone()[0]
+        finally:
+            connection.close()
+
+    def _connect(self):
+        connection = sqlite3.connect(self._path, timeout=30)
+        if connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            with connection:
+                for table in ['directories', 'tracks', 'track_titles']:
+                    connection.execute('DROP TABLE IF EXISTS {0}'.format(table))
+                _create_tables(connection)
+                connection.execute('PRAGMA user_version = {0}'.format(SCHEMA_VERSION))
+        return connection
+
+def _create_tables(connection):
+    connection.execute(
+        'CREATE TABLE directories (path BLOB PRIMARY KEY, modified_time REAL NOT NULL, inode INTEGER NOT NULL)')
+    # The text columns that are queried ignore case, so their indexes can be used without
+    # lowering the values in the query.
+    connection.execute(
+        'CREATE TABLE tracks ('
+        'path BLOB PRIMARY KEY, directory BLOB NOT NULL, format TEXT NOT NULL COLLATE NOCASE, size INTEGER, modified_time REAL, '
+        'artist TEXT COLLATE NOCASE, album_artist TEXT COLLATE NOCASE, album TEXT COLLATE NOCASE, title TEXT, '
+        'year TEXT, genre TEXT COLLATE NOCASE, comment TEXT, '
+        'label TEXT COLLATE NOCASE, catno TEXT COLLATE NOCASE, discogs_id INTEGER, '
+        'track_number INTEGER, track_total INTEGER, disc_number INTEGER, disc_total INTEGER, '
+        'duration REAL, bitrate INTEGER, sample_rate INTEGER, md5 TEXT)')
+    connection.execute('CREATE INDEX tracks_by_directory ON tracks (directory)')
+    connection.execute('CREATE INDEX tracks_by_format ON tracks (format, directory, path)')
+    connection.execute('CREATE INDEX tracks_by_release ON tracks (album, album_artist, format)')
+    for column in INDEXED_COLUMNS:
+        connection.execute('CREATE INDEX tracks_by_{0} ON tracks ({0}, format, directory, path)'.format(column))
+    connection.execute('CREATE VIRTUAL TABLE track_titles USING fts4 (title)')
+
+def _delete_tracks(connection, directory):
+    connection.execute(
+        'DELETE FROM track_titles WHERE docid IN (SELECT rowid FROM tracks WHERE directory = ?)', (_to_blob(directory),))
+    connection.execute('DELETE FROM tracks WHERE directory = ?', (_to_blob(directory),))
+
+def _get_track_row(track):
+    return [_to_blob(track[x]) if x in ['path', 'directory'] else track[x] for x in TRACK_COLUMNS]
+
+def _get_track(row):
+    track = dict(zip(TRACK_COLUMNS, row))
+    track['path'] = str(track['path'])
+    track['directory'] = str(track['directory'])
+    return track
+
+def _to_blob(path):
+    """ Paths are stored as the bytes they're encoded as on disk. A path that's given as
+    text is stored as its UTF-8, which is how the directories are walked. """
+    return sqlite3.Binary(path.encode('utf-8') if isinstance(path, unicode) else path)
+
+def _get_where_clause(query):
+    """ Gets the where clause for a query, and its parameters. The values are always
+    parameters, so each shape of query is only prepared once by the connection. """
+    conditions = []
+    parameters = []
+    for column in ['artist', 'label', 'catno', 'genre', 'discogs_id', 'format']:
+        value = getattr(query, column)
+        if value is not None:
+            conditions.append('t.{0} = ?'.format(column))
+            parameters.append(value)
+    if query.year is not None:
+        # The year can be a full date, e.g. 1999-03-01.
+        conditions.append('t.year >= ? AND t.year < ?')
+        parameters.extend([str(query.year), str(int(query.year) + 1)])
+    if query.min_duration is not None:
+        conditions.append('t.duration >= ?')
+        parameters.append(query.min_duration)
+    if query.max_duration is not None:
+        conditions.append('t.duration <= ?')
+        parameters.append(query.max_duration)
+    if query.without_format is not None:
+        conditions.append('NOT EXISTS (SELECT 1 FROM tracks other WHERE other.format = ? AND ({0}))'.format(
+            ' OR '.join('({0})'.format(' AND '.join(
+                "t.{0} <> '' AND other.{0} = t.{0}".format(x) for x in columns)) for columns in RELEASE_KEYS)))
+        parameters.append(query.without_format)
+    if query.title is not None:
+        conditions.append('t.rowid IN (SELECT docid FROM track_titles WHERE track_titles MATCH ?)')
+        parameters.append(query.title)
+    if not conditions:
+        return ('', parameters)
+    return (' WHERE ' + ' AND '.join(conditions), parameters)
+
+class LibraryScanResult(object):
+    def __init__(self):
+        self.directories_scanned = 0
+        self.directories_skipped = 0
+        self.directories_removed = 0
+        self.tracks_indexed = 0
+        self.unreadable_tracks = 0
+
+class LibraryScanner(object):
+    """ Scans the release directories into the library index.
+
+    Every directory is listed, but only the ones that have changed since they were last
+    scanned have their tracks read. A directory that hasn't changed still has its indexed
+    tracks checked against their modified times and sizes, and is read again if any of them
+    differ. The tracks are read by a pool of processes, since
+    reading the tags and stream information is mostly parsing. Directories are written to
+    the index as soon as all of their tracks have been read, so a scan that's stopped part
+    way through keeps the directories it has done.
+    """
+    def __init__(self, index):
+        self._index = index
+
+    def scan(self, roots, full=False, workers=None):
+        """
+        :roots: The release directories to scan.
+        :full: Read the tracks in every directory, whether or not it has changed.
+        :workers: The number of processes to read the tracks with. Defaults to the number
+        of cores.
+        :returns: A LibraryScanResult.
+        """
+        result = LibraryScanResult()
+        indexed_directories = self._index.get_directories()
+        indexed_files = self._index.get_files()
+        seen_directories = set()
+        changed_directories = []
+        # The directories are walked with the paths as they're encoded on disk, so a name
+        # that isn't valid UTF-8 can't stop the walk, and they're indexed as they are.
+        roots = [x.encode('utf-8') if isinstance(x, unicode) else x for x in roots]
+        for root in roots:
+            if not os.path.isdir(root):
+                raise LibraryError('The release directory {0} does not exist.'.format(root))
+            for directory, _, files in os.walk(root):
+                seen_directories.add(directory)
+                stat = os.stat(directory)
+                state = (stat.st_mtime, stat.st_ino)
+                paths = sorted(
+                    os.path.join(directory, f) for f in files
+                    if os.path.splitext(f)[1][1:].lower() in AUDIO_FORMATS)
+                if (not full and indexed_directories.get(directory) == state and
+                        not _have_files_changed(paths, indexed_files.get(directory, {}))):
+                    result.directories_skipped += 1
+                    continue
+                changed_directories.append((directory, state, paths))
+        if changed_directories:
+            self._read_directories(changed_directories, workers, result)
+        removed_directories = [
+            x for x in indexed_directories
+            if x not in seen_directories and any(_is_in_directory(x, root) for root in roots)]
+        self._index.remove_directories(removed_directories)
+        result.directories_removed = len(removed_directories)
+        return result
+
+    def _read_directories(self, changed_directories, workers, result):
+        pool = multiprocessing.Pool(workers)
+        try:
+            all_paths = [path for _, _, paths in changed_directories for path in paths]
+            tracks = pool.imap(read_track, all_paths, SCAN_CHUNK_SIZE)
+            for directory, state, paths in changed_directories:
+                directory_tracks = [next(tracks) for _ in paths]
+                readable_tracks = [x for x in directory_tracks if x is not None]
+                self._index.replace_directory(directory, state[0], state[1], readable_tracks)
+                result.directories_scanned += 1
+                result.tracks_indexed += len(readable_tracks)
+                result.unreadable_tracks += len(directory_tracks) - len(readable_tracks)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+def _have_files_changed(paths, indexed_files):
+    """ Checks whether the indexed tracks in a directory have been changed since they were
+    read. The files that aren't in the index are the ones that couldn't be read, since a
+    new file would have changed the directory, so they don't count.
+
+    :paths: The paths of the tracks in the directory.
+    :indexed_files: The modified time and size of the indexed tracks, keyed on their path.
+    """
+    remaining_files = set(indexed_files)
+    for path in paths:
+        if path not in indexed_files:
+            continue
+        remaining_files.discard(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return True
+        if indexed_files[path] != (stat.st_mtime, stat.st_size):
+            return True
+    return bool(remaining_files)
+
+def _is_in_directory(path, directory):
+    directory = directory.rstrip(os.sep)
+    return path == directory or path.startswith(directory + os.sep)
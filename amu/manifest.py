@@ -0,0 +1,72 @@
+"""
+Keeps track of what has already been encoded, so an encode can be re-run without redoing
+the tracks that haven't changed.
+"""
+import hashlib
+import json
+import os
+import threading
+
+MANIFEST_FILE_NAME = '.amu_manifest'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Tracks that are encoded at the same time can share a manifest.
+_manifest_lock = threading.Lock()
+
+def get_file_hash(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), ''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+class EncodeManifest(object):
+    """ A manifest that sits next to the encoded files in a destination directory.
+
+    For each encoded file it records the hash of the source, the encoder and the setting
+    used, along with the hash of the output. An encode is up to date when all of those
+    still match. If the output has been changed since it was encoded, tagged for example,
+    it no longer matches and it will be encoded again.
+    """
+    def __init__(self, directory):
+        self._directory = directory
+
+    @property
+    def path(self):
+        return os.path.join(self._directory, MANIFEST_FILE_NAME)
+
+    def is_up_to_date(self, source, destination, encoder, encoding_setting):
+        entry = self._read_entries().get(os.path.basename(destination))
+        if not entry:
+            return False
+        if not os.path.exists(source) or not os.path.exists(destination):
+            return False
+        if entry['encoder'] != encoder or entry['encoding_setting'] != encoding_setting:
+            return False
+        return entry['source_hash'] == get_file_hash(source) and entry['output_hash'] == get_file_hash(destination)
+
+    def record(self, source, destination, encoder, encoding_setting):
+        entry = {
+            'source': source,
+            'source_hash': get_file_hash(source),
+            'encoder': encoder,
+            'encoding_setting': encoding_setting,
+            'output_hash': get_file_hash(destination)
+        }
+        with _manifest_lock:
+            entries = self._read_entries()
+            entries[os.path.basename(destination)] = entry
+            temp_path = '{0}.tmp'.format(self.path)
+            with open(temp_path, 'w') as manifest_file:
+                json.dump(entries, manifest_file, indent=4, sort_keys=True)
+            os.rename(temp_path, self.path)
+
+    def _read_entries(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as manifest_file:
+                return json.load(manifest_file)
+        except ValueError:
+            # A corrupt manifest just means everything gets encoded again.
+            return {}
@@ -1,9 +1,20 @@
 """
 A module for classes that are concerned with music metadata.
 """
+import threading
 import discogs_client
 from discogs_client.exceptions import HTTPError
+from amu.cache import CachingFetcher
+from amu.cache import DiscogsResponseCache
+from amu.cache import get_release_model_key
+from amu.dump import DiscogsDumpStore
+from amu.dump import DumpFetcher
 from amu.models import ReleaseModel
+from amu.ratelimit import RateLimitedFetcher
+from amu.ratelimit import SharedTokenBucket
+
+# Discogs counts requests over a moving minute, so only a small burst is allowed.
+BURST_SIZE = 5
 
 
 class ReleaseNotFoundError(Exception):
@@ -17,15 +28,66 @@ class InvalidMaskError(Exception):
         self.message = message
 
 class DiscogsMetadataService(object):
-    def get_release_by_id(self, id, collapse_index_tracks=False):
+    """ Gets releases from discogs.
+
+    When a configuration provider is supplied, the responses from discogs and the release
+    models built from them are cached on disk, using the cache settings from the config
+    file, and the requests are paced with every other amu process on the host. If the
+    config file says to use the imported discogs dump, the releases are looked up in it
+    and the API isn't used at all.
+    """
+    def __init__(self, configuration_provider=None, offline=False):
+        self._configuration_provider = configuration_provider
+        self._offline = offline
+
+    def get_release_by_id(self, id, collapse_index_tracks=False, include_original_release=True):
+        """ Gets a release from discogs.
+
+        If the release is part of a master, the main release of the master is fetched as the
+        original release, while the release itself is being converted. That requires two
+        more requests, so it can be left out when the original release isn't needed.
+
+        When responses are being cached, the release model is also cached, so the next
+        time the release is needed it doesn't have to be converted again.
+
+        :id: The discogs ID of the release.
+        :collapse_index_tracks: Treat the sub tracks of an index track as a single track.
+        :include_original_release: Populate the original release on the release model.
+        :returns: The release model.
+        """
+        cache = self._get_cache()
+        key = get_release_model_key(id, collapse_index_tracks, include_original_release)
+        if cache:
+            release_model = self._get_cached_release_model(cache, key)
+            if release_model:
+                return release_model
+        release_model = self._get_release_model(id, collapse_index_tracks, include_original_release, cache)
+        if cache:
+            cache.put_release_model(key, release_model.to_bytes())
+        return release_model
+
+    def _get_cached_release_model(self, cache, key):
+        data = cache.get_release_model(key, allow_expired=self._is_offline())
+        if data is None:
+            return None
         try:
-            client = discogs_client.Client('amu/0.1')
+            return ReleaseModel.from_bytes(data)
+        except ValueError:
+            # A model cached by a different version just gets converted again.
+            return None
+
+    def _get_release_model(self, id, collapse_index_tracks, include_original_release, cache):
+        try:
+            client = self._get_client(cache)
             release = client.release(id)
             release.refresh()
+            original_release_fetch = None
+            if include_original_release and release.master != None:
+                original_release_fetch = OriginalReleaseFetch(client, release)
+                original_release_fetch.start()
             release_model = ReleaseModel.from_discogs_release(release, collapse_index_tracks)
-            if release.master != None:
-                original_release = client.release(release.master.main_release.id)
-                original_release.refresh()
+            if original_release_fetch:
+                original_release = original_release_fetch.get_original_release()
                 release_model.original_release = ReleaseModel.from_discogs_release(original_release, collapse_index_tracks)
             return release_model
         except HTTPError, ex:
@@ -33,6 +95,70 @@ class DiscogsMetadataService(object):
                 raise ReleaseNotFoundError('There is no release with ID {0}.'.format(id))
             raise ex
 
+    def _get_client(self, cache):
+        client = discogs_client.Client('amu/0.1')
+        if self._configuration_provider and self._configuration_provider.use_discogs_dump():
+            client._fetcher = DumpFetcher(DiscogsDumpStore(self._configuration_provider.get_discogs_dump_path()))
+        elif cache:
+            requests_per_minute = self._configuration_provider.get_discogs_requests_per_minute()
+            bucket = SharedTokenBucket(
+                self._configuration_provider.get_discogs_rate_limit_path(),
+                requests_per_minute / 60.0,
+                min(BURST_SIZE, requests_per_minute))
+            # The client has no public way of setting its fetcher.
+            client._fetcher = CachingFetcher(RateLimitedFetcher(bucket), cache, self._is_offline())
+        return client
+
+    def _get_cache(self):
+        """ :returns: The cache, or None if nothing is cached. Releases from the dump are
+        already local, so they aren't cached. """
+        if not self._configuration_provider or self._configuration_provider.use_discogs_dump():
+            return None
+        return DiscogsResponseCache(
+            self._configuration_provider.get_discogs_cache_path(),
+            self._configuration_provider.get_discogs_cache_ttl())
+
+    def _is_offline(self):
+        return self._offline or self._configuration_provider.use_discogs_offline_mode()
+
+class OriginalReleaseFetch(object):
+    """ Fetches the main release of the master a release belongs to, on a separate thread.
+
+    When the release is the main release there's no need to fetch it again.
+    """
+    def __init__(self, client, release):
+        self._client = client
+        self._release = release
+        self._original_release = None
+        self._error = None
+        self._thread = threading.Thread(target=self._fetch)
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+    def get_original_release(self):
+        """ Waits for the fetch to finish.
+
+        :returns: The discogs release for the main release of the master.
+        """
+        self._thread.join()
+        if self._error:
+            raise self._error
+        return self._original_release
+
+    def _fetch(self):
+        try:
+            main_release_id = self._release.master.fetch('main_release')
+            if main_release_id == self._release.id:
+                self._original_release = self._release
+                return
+            original_release = self._client.release(main_release_id)
+            original_release.refresh()
+            self._original_release = original_release
+        except Exception, ex:
+            self._error = ex
+
 class MaskReplacer(object):
     def replace_directory_mask(self, masked_directory, release_model):
         mask_options = {
@@ -1,5 +1,13 @@
+import marshal
+import zlib
 from amu.utils import remove_number_from_duplicate_entry
 
+# The version of the binary form of a release model. This changes whenever the fields do.
+RELEASE_MODEL_FORMAT_VERSION = 1
+TRACK_MODEL_FIELDS = ('artist', 'title', 'track_number', 'track_total', 'disc_number', 'disc_total')
+RELEASE_MODEL_FIELDS = (
+    'discogs_id', 'artist', 'title', 'label', 'catno', 'format', 'format_quantity', 'country', 'year', 'genre', 'style')
+
 
 class TrackModel(object):
     def __init__(self):
@@ -19,6 +27,26 @@ class TrackModel(object):
             self._get_padded_number_string(self.track_number), self._get_padded_number_string(self.track_total),
             self.title, self._get_padded_number_string(self.disc_number), self._get_padded_number_string(self.disc_total))
 
+    def to_tuple(self):
+        return tuple(getattr(self, name) for name in TRACK_MODEL_FIELDS)
+
+    @staticmethod
+    def from_tuple(values):
+        track_model = TrackModel()
+        for name, value in zip(TRACK_MODEL_FIELDS, values):
+            setattr(track_model, name, value)
+        return track_model
+
+    def to_dict(self):
+        return {
+            'artist': self.artist,
+            'title': self.title,
+            'track_number': self.track_number,
+            'track_total': self.track_total,
+            'disc_number': self.disc_number,
+            'disc_total': self.disc_total
+        }
+
     def _get_padded_number_string(self, number):
         if number < 10:
             return u'0{0}'.format(number)
@@ -126,6 +154,70 @@ Tracklist:
             self.catno, self.format, self.country, self.year,
             self.genre, self.style, self._get_string_based_tracklist())
 
+    def to_dict(self):
+        """ Converts the release to a dictionary, which can be written out as JSON.
+
+        :returns: The fields of the release, with the tracks and the original release as
+        nested dictionaries.
+        """
+        return {
+            'discogs_id': self.discogs_id,
+            'artist': self.artist,
+            'title': self.title,
+            'label': self.label,
+            'catno': self.catno,
+            'format': self.format,
+            'format_quantity': self.format_quantity,
+            'country': self.country,
+            'year': self.year,
+            'genre': self.genre,
+            'style': self.style,
+            'tracks': [track.to_dict() for track in self.get_tracks()],
+            'original_release': self.original_release.to_dict() if self.original_release != None else None
+        }
+
+    def to_tuple(self):
+        """ Converts the release to nested tuples, with the fields in a fixed order rather
+        than named, which is what the binary form is made from. """
+        return (
+            tuple(getattr(self, name) for name in RELEASE_MODEL_FIELDS),
+            tuple(track.to_tuple() for track in self.get_tracks()),
+            self.original_release.to_tuple() if self.original_release != None else None)
+
+    @staticmethod
+    def from_tuple(values):
+        fields, tracks, original_release = values
+        release_model = ReleaseModel()
+        for name, value in zip(RELEASE_MODEL_FIELDS, fields):
+            setattr(release_model, name, value)
+        for track in tracks:
+            release_model.add_track(TrackModel.from_tuple(track))
+        if original_release != None:
+            release_model.original_release = ReleaseModel.from_tuple(original_release)
+        return release_model
+
+    def to_bytes(self):
+        """ Converts the release to a compact binary form, so it can be stored without
+        having to convert it from the discogs model again when it's loaded.
+
+        :returns: A version byte followed by the compressed release.
+        """
+        return chr(RELEASE_MODEL_FORMAT_VERSION) + zlib.compress(marshal.dumps(self.to_tuple()))
+
+    @staticmethod
+    def from_bytes(data):
+        """ Loads a release from the binary form created by to_bytes.
+
+        :data: The binary form of the release.
+        :returns: The release model.
+        """
+        if not data or ord(data[0]) != RELEASE_MODEL_FORMAT_VERSION:
+            raise ValueError('The release model is not in version {0} of the binary form.'.format(RELEASE_MODEL_FORMAT_VERSION))
+        try:
+            return ReleaseModel.from_tuple(marshal.loads(zlib.decompress(data[1:])))
+        except (zlib.error, EOFError, TypeError) as ex:
+            raise ValueError('The release model could not be loaded: {0}'.format(ex))
+
     def _get_string_based_tracklist(self):
         tracklist = ''
         for track in self.get_tracks():
@@ -1,21 +1,36 @@
 import os
+import sys
 import tempfile
 import uuid
 from amu import utils
+from amu.audio import ArtworkCache
 from amu.audio import FlacTagger
 from amu.audio import Mp3Tagger
 from amu.audio import LameEncoder
 from amu.audio import FlacEncoder
+from amu.audio import MultiFormatEncoder
+from amu.audio import PipeTranscoder
 from amu.commands import AddArtworkCommand
 from amu.commands import AddTagCommand
+from amu.commands import BuildLibraryIndexCommand
 from amu.commands import DecodeAudioCommand
 from amu.commands import EncodeWavCommand
 from amu.commands import FetchReleaseCommand
+from amu.commands import ImportDiscogsDumpCommand
 from amu.commands import MoveAudioFileCommand
+from amu.commands import MultiFormatEncodeWavCommand
+from amu.commands import QueryLibraryCommand
 from amu.commands import RemoveTagCommand
 from amu.commands import RipCdCommand
+from amu.commands import TranscodeAudioCommand
+from amu.dump import DiscogsDumpStore
+from amu.library import AUDIO_FORMATS
+from amu.library import LibraryIndex
+from amu.library import LibraryScanner
+from amu.manifest import EncodeManifest
 from amu.metadata import MaskReplacer
 from amu.metadata import replace_forbidden_characters
+from amu.snapshot import FileSystemSnapshot
 
 
 class CommandParsingError(Exception):
@@ -27,63 +42,174 @@ class CommandParser(object):
     """ Responsible for parsing the string based command from the command line
         into a command object that can be executed.
     """
-    def __init__(self, configuration_provider, cd_ripper, metadata_service, genre_selector):
+    def __init__(self, configuration_provider, cd_ripper, metadata_service, genre_selector, progress_reporter=None, artwork_cache=None):
         self._configuration_provider = configuration_provider
         self._cd_ripper = cd_ripper
         self._metadata_service = metadata_service
         self._mask_replacer = MaskReplacer()
         self._genre_selector = genre_selector
+        self._progress_reporter = progress_reporter
+        self._snapshot = FileSystemSnapshot()
+        # Every tagger shares the covers, so a cover is only read once for a release.
+        self._artwork_cache = artwork_cache if artwork_cache else ArtworkCache(configuration_provider)
 
     def get_tagger_based_on_format(self, format):
         if not format:
             raise ValueError('A value must be supplied for the format.')
         if format == 'mp3':
-            return Mp3Tagger()
+            return Mp3Tagger(self._configuration_provider.get_tag_padding(), self._artwork_cache)
         if format == 'flac':
-            return FlacTagger()
+            return FlacTagger(self._configuration_provider.get_tag_padding(), self._artwork_cache)
         raise CommandParsingError('The {0} format is unsupported.'.format(format))
 
     def from_args(self, args):
+        # All the parsers for this invocation share a single snapshot of the source tree.
+        self._snapshot = FileSystemSnapshot()
         commands = {
             'rip': self._get_rip_command,
             'encode': self._get_encode_command,
             'decode': self._get_decode_command,
+            'transcode': self._get_transcode_command,
             'tag': self._get_tag_command,
             'fetch': self._get_fetch_command,
+            'discogs': self._get_discogs_command,
+            'index': self._get_index_command,
+            'query': self._get_query_command,
             'artwork': self._get_artwork_command,
             'mix': self._get_mix_command
         }
         return commands[args.command](args)
 
+    def stream_from_args(self, args):
+        """ Gets the commands as a generator, for the commands that can be streamed to the
+        executor. Those are the ones that produce an independent command for each file,
+        which can be run as soon as they're parsed.
+
+        :returns: A generator of commands, or None if the command can't be streamed.
+        """
+        self._snapshot = FileSystemSnapshot()
+        if args.command == 'tag' and args.action == 'remove' and not args.discogs_id:
+            source = args.source if args.source else os.getcwd()
+            tag_command_parser = TagCommandParser(
+                self._configuration_provider, self.get_tagger_based_on_format(args.format), args.format, self._snapshot)
+            return tag_command_parser.iter_remove_tag_commands(source)
+        if args.command == 'artwork' and args.action == 'add':
+            source, destination = self._get_artwork_paths(args)
+            parser = ArtworkCommandParser(self._configuration_provider, self.get_tagger_based_on_format(args.type), self._snapshot)
+            return parser.iter_add_artwork_commands(source, destination, args.type)
+        return None
+
     def _get_mix_command(self, args):
         mix_args = AddTagCommandArgs.from_mix_command(args)
-        parser = MixCommandParser(self._configuration_provider, Mp3Tagger())
+        parser = MixCommandParser(self._configuration_provider, self.get_tagger_based_on_format('mp3'), self._snapshot)
         return parser.parse_mix_command(mix_args)
 
     def _get_artwork_command(self, args):
         if args.action == 'add':
-            if args.source:
-                source = args.source
-            else:
-                source = os.getcwd().decode('utf-8')
-            if args.destination:
-                destination = args.destination
-            else:
-                destination = os.getcwd().decode('utf-8')
-            parser = ArtworkCommandParser(self._configuration_provider, self.get_tagger_based_on_format(args.type))
+            source, destination = self._get_artwork_paths(args)
+            parser = ArtworkCommandParser(self._configuration_provider, self.get_tagger_based_on_format(args.type), self._snapshot)
             return parser.parse_add_artwork_command(source, destination, args.type)
 
+    def _get_artwork_paths(self, args):
+        if args.source:
+            source = args.source
+        else:
+            source = os.getcwd().decode('utf-8')
+        if args.destination:
+            destination = args.destination
+        else:
+            destination = os.getcwd().decode('utf-8')
+        return (source, destination)
+
     def _get_decode_command(self, args):
         source = args.source if args.source else os.getcwd()
         destination = args.destination if args.destination else os.getcwd()
-        parser = DecodeCommandParser(self._configuration_provider, FlacEncoder(self._configuration_provider))
+        parser = DecodeCommandParser(self._configuration_provider, FlacEncoder(self._configuration_provider), self._snapshot)
         return parser.parse_decode_command(source, destination)
 
+    def _get_transcode_command(self, args):
+        source = args.source if args.source else os.getcwd()
+        destination = args.destination if args.destination else os.getcwd()
+        transcoder = PipeTranscoder(
+            FlacEncoder(self._configuration_provider), LameEncoder(self._configuration_provider))
+        parser = TranscodeCommandParser(
+            self._configuration_provider, transcoder, FlacTagger(), self.get_tagger_based_on_format('mp3'), self._snapshot)
+        return parser.parse_transcode_command(source, destination)
+
     def _get_fetch_command(self, args):
-        command = FetchReleaseCommand(self._configuration_provider, self._metadata_service)
-        command.discogs_id = int(args.discogs_id)
+        """ Gets a fetch command for each of the IDs, from the arguments and the file of IDs
+        if there is one. The commands don't depend on each other, so the releases can be
+        fetched at the same time. """
+        discogs_ids = list(args.discogs_id)
+        if args.from_file:
+            discogs_ids.extend(self._read_discogs_ids(args.from_file))
+        if not discogs_ids:
+            raise CommandParsingError('At least one discogs ID must be specified for the fetch command.')
+        commands = []
+        for discogs_id in discogs_ids:
+            command = FetchReleaseCommand(self._configuration_provider, self._metadata_service)
+            try:
+                command.discogs_id = int(discogs_id)
+            except ValueError:
+                raise CommandParsingError('The discogs ID {0} is not a valid integer.'.format(discogs_id))
+            command.output_json = args.json
+            command.dependencies = []
+            commands.append(command)
+        return commands
+
+    def _read_discogs_ids(self, path):
+        """ Reads a file with a discogs ID on each line. Blank lines and lines starting with
+        a # are ignored. A path of - reads the IDs from stdin. """
+        if path == '-':
+            lines = sys.stdin.readlines()
+        else:
+            with open(path, 'r') as ids_file:
+                lines = ids_file.readlines()
+        return [x.strip() for x in lines if x.strip() and not x.strip().startswith('#')]
+
+    def _get_discogs_command(self, args):
+        if args.discogs_action == 'import-dump':
+            dump_store = DiscogsDumpStore(self._configuration_provider.get_discogs_dump_path())
+            command = ImportDiscogsDumpCommand(self._configuration_provider, dump_store)
+            command.source = args.dump
+            return [command]
+
+    def _get_index_command(self, args):
+        if args.index_action == 'build':
+            scanner = LibraryScanner(LibraryIndex(self._configuration_provider.get_library_index_path()))
+            command = BuildLibraryIndexCommand(self._configuration_provider, scanner)
+            command.roots = self._get_library_roots()
+            command.full = True if args.full else False
+            command.workers = args.workers
+            return [command]
+
+    def _get_query_command(self, args):
+        command = QueryLibraryCommand(self._configuration_provider, LibraryIndex(self._configuration_provider.get_library_index_path()))
+        command.artist = args.artist
+        command.label = args.label
+        command.catno = args.catno
+        command.year = args.year
+        command.genre = args.genre
+        command.discogs_id = args.discogs_id
+        command.format = args.format
+        command.without_format = args.without_format
+        command.min_duration = args.min_duration
+        command.max_duration = args.max_duration
+        command.title = args.title
+        command.releases = True if args.releases else False
+        command.output_json = True if args.json else False
         return [command]
 
+    def _get_library_roots(self):
+        """ Gets the base directory for the releases of each format. A format can share its
+        base directory with another, in which case it's only scanned once. """
+        roots = []
+        for format in AUDIO_FORMATS:
+            root = self._configuration_provider.get_releases_base_directory(format)
+            if root not in roots:
+                roots.append(root)
+        return roots
+
     def _get_rip_command(self, args):
         command = RipCdCommand(self._configuration_provider, self._cd_ripper)
         if args.destination:
@@ -94,19 +220,91 @@ class CommandParser(object):
 
     def _get_encode_command(self, args):
         release_model = None
+        formats = args.encoding_to.split(',')
         if args.destination:
             destination = args.destination
         else:
             destination = os.getcwd()
+        if args.incremental and (args.encoding_from != 'wav' or len(formats) > 1):
+            raise CommandParsingError('An incremental encode can only be used for encoding wavs to a single format.')
+        if args.incremental and args.discogs_id:
+            # The tracks are tagged and renamed after they're encoded, so they would never
+            # match the hashes in the manifest and everything would be encoded again.
+            raise CommandParsingError('An incremental encode cannot be used with a discogs ID.')
         if args.discogs_id:
             collapse_index_tracks = True if args.collapse_index_tracks else False
             release_model = self._metadata_service.get_release_by_id(int(args.discogs_id), collapse_index_tracks)
             if self._configuration_provider.use_genre():
                 release_model.genre = self._genre_selector.select_genre([x.strip() for x in release_model.genre.split(',')])
-            if not args.destination:
-                destination = self._configuration_provider.get_releases_destination_with_mask_replaced(release_model, args.encoding_to)
+        if len(formats) > 1:
+            return self._get_multi_format_encode_commands(args, formats, destination, release_model)
+        if release_model and not args.destination:
+            destination = self._configuration_provider.get_releases_destination_with_mask_replaced(release_model, args.encoding_to)
         return self._get_encode_commands(args, destination, release_model)
 
+    def _get_multi_format_encode_commands(self, args, formats, destination, release_model):
+        """ Gets the commands for encoding a set of wavs to several formats at once.
+
+        Each wav is read a single time and streamed to the encoder for every format. The tag
+        and move commands are then generated for each format in turn, all using the same
+        release model. The cover is copied for every format but the last, which moves it,
+        after all the tracks have been tagged.
+        """
+        if args.encoding_from != 'wav':
+            raise CommandParsingError('Only wavs can be encoded to multiple formats at once.')
+        if args.source:
+            source = args.source
+        else:
+            source = os.getcwd().decode('utf-8')
+        destinations = self._get_destinations_for_formats(args, formats, destination, release_model)
+        encode_commands_for_formats = []
+        for format in formats:
+            encoder = self._get_encoder_based_on_destination_encoding(format)
+            encode_command_parser = EncodeCommandParser(self._configuration_provider, self._cd_ripper, encoder, format, snapshot=self._snapshot)
+            encode_commands_for_formats.append(encode_command_parser.parse_wav(source, destinations[format]))
+        if len(encode_commands_for_formats[0]) == 0:
+            raise CommandParsingError('The source directory has no wavs to encode')
+        encoder = MultiFormatEncoder([self._get_encoder_based_on_destination_encoding(format) for format in formats])
+        commands = []
+        for track_encode_commands in zip(*encode_commands_for_formats):
+            command = MultiFormatEncodeWavCommand(self._configuration_provider, encoder)
+            command.source = track_encode_commands[0].source
+            command.destinations = [x.destination for x in track_encode_commands]
+            command.keep_source = True if args.keep_source else False
+            command.dependencies = []
+            commands.append(command)
+        if not release_model:
+            return commands
+        track_command_lists = [list(commands)]
+        move_cover_commands = []
+        for i, format in enumerate(formats):
+            encode_commands = encode_commands_for_formats[i]
+            tag_commands = self._get_release_tag_commands(args, format, encode_commands, destinations[format], release_model)
+            self._add_artwork_to_tag_commands(encode_commands, tag_commands, format)
+            move_file_parser = MoveAudioFileCommandParser(self._configuration_provider, format, self._snapshot)
+            move_commands = move_file_parser.parse_from_encode_commands(encode_commands, release_model)
+            if i < len(formats) - 1:
+                for move_cover_command in move_commands[len(encode_commands):]:
+                    move_cover_command.copy = True
+            move_track_commands = move_commands[:len(encode_commands)]
+            track_command_lists.extend([tag_commands, move_track_commands])
+            commands.extend(tag_commands)
+            commands.extend(move_track_commands)
+            move_cover_commands.extend(move_commands[len(encode_commands):])
+        self._chain_track_commands(*track_command_lists)
+        # The tag commands for every format read the cover, so it's only copied and moved
+        # once all of them have finished. The cover commands keep their default of depending
+        # on every command before them, rather than being chained on the cover's path.
+        commands.extend(move_cover_commands)
+        return commands
+
+    def _get_destinations_for_formats(self, args, formats, destination, release_model):
+        if args.destination or not release_model:
+            return dict((format, destination) for format in formats)
+        return dict(
+            (format, self._configuration_provider.get_releases_destination_with_mask_replaced(release_model, format))
+            for format in formats)
+
     def _get_encode_commands(self, args, destination, release_model):
         if args.encoding_from == 'cd':
             commands = self._get_encode_cd_commands(args, destination, release_model)
@@ -120,19 +318,22 @@ class CommandParser(object):
     def _get_tag_command(self, args):
         source = args.source if args.source else os.getcwd()
         tagger = self.get_tagger_based_on_format(args.format)
-        tag_command_parser = TagCommandParser(self._configuration_provider, tagger, args.format)
+        tag_command_parser = TagCommandParser(self._configuration_provider, tagger, args.format, self._snapshot)
         if args.discogs_id:
             commands = []
             collapse_index_tracks = True if args.collapse_index_tracks else False
             release_model = self._metadata_service.get_release_by_id(int(args.discogs_id), collapse_index_tracks)
             if self._configuration_provider.use_genre():
                 release_model.genre = self._genre_selector.select_genre([x.strip() for x in release_model.genre.split(',')])
-            commands.extend(tag_command_parser.parse_from_release_model(source, release_model))
-            move_file_parser = MoveAudioFileCommandParser(self._configuration_provider, args.format)
-            commands.extend(move_file_parser.parse_from_release_model(
+            tag_commands = tag_command_parser.parse_from_release_model(source, release_model)
+            move_file_parser = MoveAudioFileCommandParser(self._configuration_provider, args.format, self._snapshot)
+            move_commands = move_file_parser.parse_from_release_model(
                 source,
                 self._configuration_provider.get_releases_destination_with_mask_replaced(release_model, args.format),
-                release_model))
+                release_model)
+            self._chain_track_commands(tag_commands, move_commands)
+            commands.extend(tag_commands)
+            commands.extend(move_commands)
             return commands
         if args.action == 'remove':
             return tag_command_parser.parse_remove_tag_command(source)
@@ -143,15 +344,18 @@ class CommandParser(object):
     def _get_encode_cd_commands(self, args, destination, release_model):
         commands = []
         encoder = self._get_encoder_based_on_destination_encoding(args.encoding_to)
-        encode_command_parser = EncodeCommandParser(self._configuration_provider, self._cd_ripper, encoder, args.encoding_to)
+        encode_command_parser = EncodeCommandParser(self._configuration_provider, self._cd_ripper, encoder, args.encoding_to, snapshot=self._snapshot)
         source = os.path.join(tempfile.gettempdir(), str(uuid.uuid4()))
         encode_commands = encode_command_parser.parse_cd_rip(source, destination)
         commands.extend(encode_commands)
         if release_model:
             # The first command is a rip cd command, which we don't need.
-            commands.extend(self._get_release_tag_commands(args, encode_commands[1:], destination, release_model))
-            move_file_parser = MoveAudioFileCommandParser(self._configuration_provider, args.encoding_to)
-            commands.extend(move_file_parser.parse_from_encode_commands(encode_commands[1:], release_model))
+            tag_commands = self._get_release_tag_commands(args, args.encoding_to, encode_commands[1:], destination, release_model)
+            move_file_parser = MoveAudioFileCommandParser(self._configuration_provider, args.encoding_to, self._snapshot)
+            move_commands = move_file_parser.parse_from_encode_commands(encode_commands[1:], release_model)
+            self._chain_track_commands(encode_commands[1:], tag_commands, move_commands)
+            commands.extend(tag_commands)
+            commands.extend(move_commands)
         return commands
 
     def _get_encode_wav_commands(self, args, destination, release_model):
@@ -161,49 +365,86 @@ class CommandParser(object):
             source = os.getcwd().decode('utf-8')
         commands = []
         encoder = self._get_encoder_based_on_destination_encoding(args.encoding_to)
-        encode_command_parser = EncodeCommandParser(self._configuration_provider, self._cd_ripper, encoder, args.encoding_to)
+        encode_command_parser = EncodeCommandParser(
+            self._configuration_provider, self._cd_ripper, encoder, args.encoding_to, args.incremental, self._snapshot)
         encode_commands = encode_command_parser.parse_wav(source, destination)
-        commands.extend(encode_commands)
         track_count = len(encode_commands)
         if track_count == 0:
             raise CommandParsingError('The source directory has no wavs to encode')
+        # Only --incremental leaves up to date encodes out, and it is rejected together
+        # with a release, so the tag and move commands below always follow every encode.
+        commands.extend(encode_command_parser.get_out_of_date_commands(encode_commands))
         if release_model:
-            commands.extend(self._get_release_tag_commands(args, encode_commands, destination, release_model))
-            commands.extend(self._get_add_artwork_commands(encode_commands, args.encoding_to))
-            move_file_parser = MoveAudioFileCommandParser(self._configuration_provider, args.encoding_to)
-            commands.extend(move_file_parser.parse_from_encode_commands(encode_commands, release_model))
+            tag_commands = self._get_release_tag_commands(args, args.encoding_to, encode_commands, destination, release_model)
+            self._add_artwork_to_tag_commands(encode_commands, tag_commands, args.encoding_to)
+            move_file_parser = MoveAudioFileCommandParser(self._configuration_provider, args.encoding_to, self._snapshot)
+            move_commands = move_file_parser.parse_from_encode_commands(encode_commands, release_model)
+            self._chain_track_commands(encode_commands, tag_commands, move_commands)
+            commands.extend(tag_commands)
+            commands.extend(move_commands)
         return commands
 
     def _get_encoder_based_on_destination_encoding(self, encoding_destination):
         if encoding_destination == 'mp3':
-            return LameEncoder(self._configuration_provider)
+            return LameEncoder(self._configuration_provider, self._progress_reporter)
         elif encoding_destination == 'flac':
-            return FlacEncoder(self._configuration_provider)
+            return FlacEncoder(self._configuration_provider, self._progress_reporter)
 
-    def _get_release_tag_commands(self, args, commands, destination, release_model):
+    def _get_release_tag_commands(self, args, format, commands, destination, release_model):
         release_track_count = len(release_model.get_tracks())
         track_count = len(commands)
         if track_count != release_track_count:
             raise CommandParsingError(
                 'The source has {0} tracks and the discogs release has {1}. The number of tracks on both must be the same.'.format(track_count, release_track_count))
-        tagger = self.get_tagger_based_on_format(args.encoding_to)
-        tag_command_parser = TagCommandParser(self._configuration_provider, tagger, args.encoding_to)
+        tagger = self.get_tagger_based_on_format(format)
+        tag_command_parser = TagCommandParser(self._configuration_provider, tagger, format, self._snapshot)
         if args.encoding_from == 'cd':
             return tag_command_parser.parse_from_release_model_with_empty_source(destination, release_model)
         return tag_command_parser.parse_from_release_model_with_sources(
             release_model, [x.destination for x in commands])
 
 
-    def _get_add_artwork_commands(self, encode_commands, target_encoding):
-        artwork_command_parser = ArtworkCommandParser(self._configuration_provider, self.get_tagger_based_on_format(target_encoding))
-        return artwork_command_parser.parse_from_encode_commands(encode_commands)
+    def _add_artwork_to_tag_commands(self, encode_commands, tag_commands, target_encoding):
+        """ Sets the cover from the source directory on the tag commands, rather than
+        generating separate add artwork commands, so each file is only written once. """
+        artwork_command_parser = ArtworkCommandParser(self._configuration_provider, self.get_tagger_based_on_format(target_encoding), self._snapshot)
+        cover = artwork_command_parser.get_cover_from_encode_commands(encode_commands)
+        for tag_command in tag_commands:
+            tag_command.artwork = cover
+
+    def _chain_track_commands(self, *command_lists):
+        """ Builds the dependency graph for the commands that operate on each track.
+
+        The lists are given in the order they need to run, e.g. encode, tag, artwork, move.
+        Each command is made to depend on the previous command that operated on the same
+        file, rather than on every command before it, so a track can be tagged and moved as
+        soon as it has been encoded, while the other tracks are still encoding.
+
+        Commands that don't operate on a track, like moving the cover, keep their default
+        of depending on every command before them.
+        """
+        previous_commands = {}
+        for commands in command_lists:
+            for command in commands:
+                paths = _get_track_paths(command)
+                dependencies = []
+                for path in paths:
+                    previous_command = previous_commands.get(path)
+                    if previous_command is not None and previous_command not in dependencies:
+                        dependencies.append(previous_command)
+                if dependencies:
+                    command.dependencies = dependencies
+                for path in paths:
+                    previous_commands[path] = command
 
 class EncodeCommandParser(object):
-    def __init__(self, configuration_provider, cd_ripper, encoder, encoding_destination):
+    def __init__(self, configuration_provider, cd_ripper, encoder, encoding_destination, incremental=False, snapshot=None):
         self._configuration_provider = configuration_provider
         self._cd_ripper = cd_ripper
         self._encoder = encoder
         self._encoding_destination = encoding_destination
+        self._incremental = incremental
+        self._snapshot = snapshot if snapshot else FileSystemSnapshot()
 
     def parse_cd_rip(self, rip_destination, destination):
         if not rip_destination:
@@ -217,17 +458,18 @@ class EncodeCommandParser(object):
         commands.append(rip_cd_command)
         for i in range(1, track_count + 1):
             command = EncodeWavCommand(self._configuration_provider, self._encoder)
+            command.dependencies = [rip_cd_command]
             command.source = os.path.join(rip_destination, utils.get_track_name(i, "wav"))
             command.destination = os.path.join(destination, utils.get_track_name(i, self._encoding_destination))
             commands.append(command)
         return commands
 
     def parse_wav(self, source, destination):
-        if not os.path.exists(source):
+        if not self._snapshot.exists(source):
             raise CommandParsingError('The source directory or wav file must exist')
         if not destination:
             raise CommandParsingError('The destination cannot be empty')
-        if os.path.isfile(source):
+        if self._snapshot.isfile(source):
             return self._get_single_file_command(source, destination)
         return self._get_directory_command(source, destination)
 
@@ -238,16 +480,18 @@ class EncodeCommandParser(object):
         command = EncodeWavCommand(self._configuration_provider, self._encoder)
         command.source = source
         command.destination = destination
+        command.dependencies = []
+        self._set_manifest(command)
         return [command]
 
     def _get_directory_command(self, source, destination):
         commands = []
-        for root, directories, files in os.walk(source):
+        for root, directories, files in self._snapshot.scan(source):
             if len(directories) > 0:
                 for directory in sorted(directories):
                     full_source_directory = os.path.join(root, directory)
                     full_destination_directory = os.path.join(destination, directory)
-                    for source_wav in [f for f in sorted(os.listdir(full_source_directory)) if f.endswith('.wav')]:
+                    for source_wav in [f for f in sorted(self._snapshot.listdir(full_source_directory)) if f.endswith('.wav')]:
                         commands.append(self._get_encode_wav_command(full_source_directory, full_destination_directory, source_wav))
             else:
                 for source_wav in [f for f in sorted(files) if f.endswith('.wav')]:
@@ -259,46 +503,138 @@ class EncodeCommandParser(object):
         command = EncodeWavCommand(self._configuration_provider, self._encoder)
         command.source = os.path.join(source_directory, source_wav)
         command.destination = os.path.join(destination_directory, os.path.splitext(source_wav)[0] + '.{0}'.format(self._encoding_destination))
+        command.dependencies = []
+        self._set_manifest(command)
         return command
 
+    def get_out_of_date_commands(self, commands):
+        """ Filters out the encodes that were already done by a previous incremental encode.
+
+        :commands: The encode wav commands produced by parse_wav.
+        :returns: The commands whose destination needs to be encoded.
+        """
+        out_of_date_commands = []
+        for command in commands:
+            if command.is_up_to_date():
+                print u'[encode] Skipping {0}, as {1} is up to date.'.format(command.source, command.destination)
+            else:
+                out_of_date_commands.append(command)
+        return out_of_date_commands
+
+    def _set_manifest(self, command):
+        if self._incremental:
+            command.manifest = EncodeManifest(os.path.dirname(command.destination))
+
 class DecodeCommandParser(object):
-    def __init__(self, configuration_provider, encoder):
+    def __init__(self, configuration_provider, encoder, snapshot=None):
         self._configuration_provider = configuration_provider
         self._encoder = encoder
+        self._snapshot = snapshot if snapshot else FileSystemSnapshot()
 
     def parse_decode_command(self, source, destination):
-        if not os.path.exists(source):
+        if not self._snapshot.exists(source):
             raise CommandParsingError('The source directory or file must exist')
-        if os.path.isfile(source):
+        if self._snapshot.isfile(source):
             command = DecodeAudioCommand(self._configuration_provider, self._encoder)
             command.source = source
             command.destination = destination
+            command.dependencies = []
             return [command]
         commands = []
-        for root, directories, files in os.walk(source):
+        for root, directories, files in self._snapshot.scan(source):
             if len(directories) > 0:
                 for directory in sorted(directories):
                     full_source_directory = os.path.join(root, directory)
                     full_destination_directory = os.path.join(destination, directory)
-                    for source_audio in [f for f in sorted(os.listdir(full_source_directory)) if f.endswith('.flac')]:
+                    for source_audio in [f for f in sorted(self._snapshot.listdir(full_source_directory)) if f.endswith('.flac')]:
                         command = DecodeAudioCommand(self._configuration_provider, self._encoder)
                         command.source = os.path.join(full_source_directory, source_audio)
                         command.destination = os.path.join(full_destination_directory, os.path.splitext(source_audio)[0] + '.wav')
+                        command.dependencies = []
                         commands.append(command)
             else:
                 for source_audio in [f for f in sorted(files) if f.endswith('.flac')]:
                     command = DecodeAudioCommand(self._configuration_provider, self._encoder)
                     command.source = os.path.join(root, source_audio)
                     command.destination = os.path.join(destination, os.path.splitext(source_audio)[0] + '.wav')
+                    command.dependencies = []
                     commands.append(command)
             break
         return commands
 
+class TranscodeCommandParser(object):
+    """ Parses the commands for transcoding a set of flacs to mp3s.
+
+    Each flac gets a transcode command, followed by a tag command that copies the tags
+    from the flac on to the new mp3.
+    """
+    def __init__(self, configuration_provider, transcoder, source_tagger, destination_tagger, snapshot=None):
+        self._configuration_provider = configuration_provider
+        self._transcoder = transcoder
+        self._source_tagger = source_tagger
+        self._destination_tagger = destination_tagger
+        self._snapshot = snapshot if snapshot else FileSystemSnapshot()
+
+    def parse_transcode_command(self, source, destination):
+        if not self._snapshot.exists(source):
+            raise CommandParsingError('The source directory or file must exist')
+        if self._snapshot.isfile(source):
+            return self._get_commands(source, destination)
+        commands = []
+        for root, directories, files in self._snapshot.scan(source):
+            if len(directories) > 0:
+                for directory in sorted(directories):
+                    full_source_directory = os.path.join(root, directory)
+                    full_destination_directory = os.path.join(destination, directory)
+                    for source_audio in [f for f in sorted(self._snapshot.listdir(full_source_directory)) if f.endswith('.flac')]:
+                        commands.extend(self._get_commands(
+                            os.path.join(full_source_directory, source_audio),
+                            os.path.join(full_destination_directory, os.path.splitext(source_audio)[0] + '.mp3')))
+            else:
+                for source_audio in [f for f in sorted(files) if f.endswith('.flac')]:
+                    commands.extend(self._get_commands(
+                        os.path.join(root, source_audio),
+                        os.path.join(destination, os.path.splitext(source_audio)[0] + '.mp3')))
+            break
+        return commands
+
+    def _get_commands(self, source, destination):
+        transcode_command = TranscodeAudioCommand(self._configuration_provider, self._transcoder)
+        transcode_command.source = source
+        transcode_command.destination = destination
+        transcode_command.dependencies = []
+        tag_command = self._get_add_tag_command(source, destination)
+        tag_command.dependencies = [transcode_command]
+        return [transcode_command, tag_command]
+
+    def _get_add_tag_command(self, source, destination):
+        tags = self._source_tagger.get_tags(source)
+        command = AddTagCommand(self._configuration_provider, self._destination_tagger)
+        command.source = destination
+        command.artist = tags['artist']
+        command.album_artist = tags['album_artist']
+        command.album = tags['album']
+        command.title = tags['title']
+        command.year = tags['year']
+        command.genre = tags['genre']
+        command.comment = tags['comment']
+        command.track_number, command.track_total = self._get_number_and_total(
+            tags['track_number'], tags['track_total'])
+        command.disc_number, command.disc_total = self._get_number_and_total(
+            tags['disc_number'], tags['disc_total'])
+        return command
+
+    def _get_number_and_total(self, number, total):
+        if number == 0:
+            return (1, 1)
+        return (number, max(number, total))
+
 class TagCommandParser(object):
-    def __init__(self, configuration_provider, tagger, source_format):
+    def __init__(self, configuration_provider, tagger, source_format, snapshot=None):
         self._configuration_provider = configuration_provider
         self._tagger = tagger
         self._source_format = source_format
+        self._snapshot = snapshot if snapshot else FileSystemSnapshot()
 
     def parse_from_release_model_with_sources(self, release_model, sources):
         commands = []
@@ -338,11 +674,11 @@ class TagCommandParser(object):
         i = 0
         commands = []
         tracks = release_model.get_tracks()
-        for root, directories, files in os.walk(source_path):
+        for root, directories, files in self._snapshot.scan(source_path):
             if len(directories) > 0:
                 for directory in sorted(directories):
                     full_source_directory = os.path.join(root, directory)
-                    for source_file in [f for f in sorted(os.listdir(full_source_directory)) if f.endswith('.{0}'.format(self._source_format))]:
+                    for source_file in [f for f in sorted(self._snapshot.listdir(full_source_directory)) if f.endswith('.{0}'.format(self._source_format))]:
                         full_source_path = os.path.join(full_source_directory, source_file)
                         command = self._get_add_tag_command_from_release_model(full_source_path, release_model, tracks[i])
                         commands.append(command)
@@ -357,25 +693,35 @@ class TagCommandParser(object):
         return commands
 
     def parse_add_tag_command(self, command_args):
-        if os.path.isfile(command_args.source):
+        if self._snapshot.isfile(command_args.source):
             return self._get_single_file_command(command_args)
         if command_args.track_total != 0:
             raise CommandParsingError('With a directory source, a track number and total override cannot be specified.')
         return self._get_directory_command(command_args)
 
     def parse_remove_tag_command(self, source):
-        if os.path.isfile(source):
-            command = RemoveTagCommand(self._configuration_provider, self._tagger)
-            command.source = source
-            return [command]
-        commands = []
+        return list(self.iter_remove_tag_commands(source))
+
+    def iter_remove_tag_commands(self, source):
+        """ Gets the remove tag commands for a file, or every file under a directory.
+
+        The directory is walked as the commands are taken, so a whole library can be
+        processed without first walking all of it or holding a command for every file.
+
+        :returns: A generator of independent remove tag commands.
+        """
+        if self._snapshot.isfile(source):
+            yield self._get_remove_tag_command(source)
+            return
         for root, _, files in os.walk(source):
-            audio_files = [f for f in files if f.endswith('.{0}'.format(self._source_format))]
-            for audio_file in audio_files:
-                command = RemoveTagCommand(self._configuration_provider, self._tagger)
-                command.source = os.path.join(root, audio_file)
-                commands.append(command)
-        return commands
+            for audio_file in [f for f in files if f.endswith('.{0}'.format(self._source_format))]:
+                yield self._get_remove_tag_command(os.path.join(root, audio_file))
+
+    def _get_remove_tag_command(self, source):
+        command = RemoveTagCommand(self._configuration_provider, self._tagger)
+        command.source = source
+        command.dependencies = []
+        return command
 
     def _get_single_file_command(self, command_args):
         command = self._get_add_tag_command(command_args.source, command_args)
@@ -383,14 +729,14 @@ class TagCommandParser(object):
 
     def _get_directory_command(self, command_args):
         commands = []
-        for root, directories, files in os.walk(command_args.source):
+        for root, directories, files in self._snapshot.scan(command_args.source):
             directory_len = len(directories)
             if directory_len > 0:
                 disc_number = 1
                 disc_total = directory_len
                 for directory in sorted(directories):
                     full_source_directory = os.path.join(root, directory)
-                    source_files = [f for f in sorted(os.listdir(full_source_directory)) if f.endswith('.{0}'.format(self._source_format))]
+                    source_files = [f for f in sorted(self._snapshot.listdir(full_source_directory)) if f.endswith('.{0}'.format(self._source_format))]
                     track_total = len(source_files)
                     track_number = 1
                     for source_file in source_files:
@@ -438,6 +784,7 @@ class TagCommandParser(object):
     def _get_add_tag_command(self, source, command_args):
         command = AddTagCommand(self._configuration_provider, self._tagger)
         command.source = source
+        command.dependencies = []
         command.artist = command_args.artist
         command.album_artist = command_args.album_artist
         command.album = command_args.album
@@ -470,9 +817,10 @@ class TagCommandParser(object):
             command.disc_total = command_args.disc_total
 
 class MoveAudioFileCommandParser(object):
-    def __init__(self, configuration_provider, source_format):
+    def __init__(self, configuration_provider, source_format, snapshot=None):
         self._configuration_provider = configuration_provider
         self._source_format = source_format
+        self._snapshot = snapshot if snapshot else FileSystemSnapshot()
 
     def parse_from_encode_commands(self, encode_commands, release_model):
         i = 0
@@ -492,12 +840,12 @@ class MoveAudioFileCommandParser(object):
         return commands
 
     def parse_from_release_model(self, source, destination, release_model):
-        if not os.path.isdir(source):
+        if not self._snapshot.isdir(source):
             raise CommandParsingError('The source must be a directory.')
-        if not os.path.isdir(destination):
+        if not self._snapshot.isdir(destination):
             os.makedirs(destination)
         commands = []
-        for root, directories, files in os.walk(source):
+        for root, directories, files in self._snapshot.scan(source):
             directory_len = len(directories)
             if directory_len > 0:
                 commands.extend(self._get_multi_cd_parse_from_release_model_commands(release_model, root, directories, destination))
@@ -507,11 +855,7 @@ class MoveAudioFileCommandParser(object):
         return commands
 
     def _get_move_cover_command(self, source, destination):
-        images = [
-            f for f in [
-                image for image in os.listdir(source) if image.endswith('.jpg') or image.endswith('.png')
-            ] if f.startswith('cover')
-        ]
+        images = self._snapshot.get_covers(source)
         if len(images) > 0:
             command = MoveAudioFileCommand(self._configuration_provider)
             command.source = os.path.join(source, images[0])
@@ -526,7 +870,7 @@ class MoveAudioFileCommandParser(object):
         commands.extend(self._get_move_cover_command(source_path, destination))
         for directory in sorted(directories):
             full_source_directory = os.path.join(source_path, directory)
-            source_files = [f for f in sorted(os.listdir(full_source_directory)) if f.endswith('.{0}'.format(self._source_format))]
+            source_files = [f for f in sorted(self._snapshot.listdir(full_source_directory)) if f.endswith('.{0}'.format(self._source_format))]
             for source_file in source_files:
                 command = MoveAudioFileCommand(self._configuration_provider)
                 command.source = os.path.join(source_path, directory, source_file)
@@ -569,50 +913,56 @@ class MoveAudioFileCommandParser(object):
         return os.path.join(destination, '{0} - {1}.{2}'.format(track_number, replace_forbidden_characters(track.title), self._source_format))
 
 class ArtworkCommandParser(object):
-    def __init__(self, configuration_provider, tagger):
+    def __init__(self, configuration_provider, tagger, snapshot=None):
         self._configuration_provider = configuration_provider
         self._tagger = tagger
+        self._snapshot = snapshot if snapshot else FileSystemSnapshot()
 
     def parse_add_artwork_command(self, source, destination, format):
+        return list(self.iter_add_artwork_commands(source, destination, format))
+
+    def iter_add_artwork_commands(self, source, destination, format):
+        """ Gets the add artwork commands for a file, or the files in a directory.
+
+        The cover is found straight away, so a missing cover is reported before any
+        commands are taken. Each disc directory is only listed once the commands for the
+        previous one have been taken.
+
+        :returns: A generator of independent add artwork commands.
+        """
         cover = self._get_cover_path(source)
-        if os.path.isdir(destination):
-            commands = []
-            for root, directories, files in os.walk(destination):
-                directory_len = len(directories)
-                if directory_len > 0:
-                    commands.extend(self._get_multi_cd_commands(root, directories, cover, format))
-                else:
-                    commands.extend(self._get_single_cd_commands(files, cover, destination, format))
-                break
-            return commands
-        return [self._get_add_artwork_command(source, destination)]
+        if self._snapshot.isdir(destination):
+            return self._iter_directory_commands(cover, destination, format)
+        return iter([self._get_add_artwork_command(source, destination)])
 
-    def parse_from_encode_commands(self, encode_commands):
-        commands = []
+    def _iter_directory_commands(self, cover, destination, format):
+        for root, directories, files in self._snapshot.scan(destination):
+            directory_len = len(directories)
+            if directory_len > 0:
+                for command in self._iter_multi_cd_commands(root, directories, cover, format):
+                    yield command
+            else:
+                for command in self._get_single_cd_commands(files, cover, destination, format):
+                    yield command
+            break
+
+    def get_cover_from_encode_commands(self, encode_commands):
+        """ Gets the cover in the directory the encode commands are reading from.
+
+        :returns: The path of the cover, or an empty string if the directory has no cover.
+        """
         source = os.path.dirname(encode_commands[0].source)
-        images = [
-            f for f in [
-                image for image in os.listdir(source) if image.endswith('.jpg') or image.endswith('.png')
-            ] if f.startswith('cover')
-        ]
+        images = self._snapshot.get_covers(source)
         if len(images) == 0:
-            return commands
-        cover = os.path.join(source, images[0])
-        for encode_command in encode_commands:
-            command = AddArtworkCommand(self._configuration_provider, self._tagger)
-            command.source = cover
-            command.destination = encode_command.destination
-            commands.append(command)
-        return commands
+            return ''
+        return os.path.join(source, images[0])
 
-    def _get_multi_cd_commands(self, root, directories, cover, format):
-        commands = []
+    def _iter_multi_cd_commands(self, root, directories, cover, format):
         for directory in directories:
             full_destination_directory = os.path.join(root, directory)
-            audio_files = [f for f in os.listdir(full_destination_directory) if f.endswith('.{0}'.format(format))]
+            audio_files = [f for f in self._snapshot.listdir(full_destination_directory) if f.endswith('.{0}'.format(format))]
             for audio_file in audio_files:
-                commands.append(self._get_add_artwork_command(cover, os.path.join(full_destination_directory, audio_file)))
-        return commands
+                yield self._get_add_artwork_command(cover, os.path.join(full_destination_directory, audio_file))
 
     def _get_single_cd_commands(self, files, cover, destination, format):
         commands = []
@@ -622,8 +972,8 @@ class ArtworkCommandParser(object):
         return commands
 
     def _get_cover_path(self, source):
-        if os.path.isdir(source):
-            images = [f for f in [image for image in os.listdir(source) if image.endswith('.jpg') or image.endswith('.png')] if f.startswith('cover')]
+        if self._snapshot.isdir(source):
+            images = self._snapshot.get_covers(source)
             if len(images) == 0:
                 raise CommandParsingError('The source directory contains no cover jpg or png.')
             return os.path.join(source, images[0])
@@ -633,23 +983,25 @@ class ArtworkCommandParser(object):
         command = AddArtworkCommand(self._configuration_provider, self._tagger)
         command.source = source
         command.destination = destination
+        command.dependencies = []
         return command
 
 class MixCommandParser(object):
-    def __init__(self, configuration_provider, tagger):
+    def __init__(self, configuration_provider, tagger, snapshot=None):
         self._configuration_provider = configuration_provider
         self._tagger = tagger
+        self._snapshot = snapshot if snapshot else FileSystemSnapshot()
 
     def parse_mix_command(self, add_tag_args):
         if not add_tag_args.source:
             raise ValueError('A value must be supplied for the source.')
-        if os.path.isfile(add_tag_args.source):
+        if self._snapshot.isfile(add_tag_args.source):
             add_tag_command = self._get_add_tag_command(add_tag_args, add_tag_args.source, add_tag_args.title, 1, 1)
             move_file_command = self._get_move_file_command(add_tag_args.source, os.path.basename(add_tag_args.source))
             return [add_tag_command, move_file_command]
         part = 1
         commands = []
-        mix_files = [x for x in sorted(os.listdir(add_tag_args.source)) if x.endswith('.mp3')]
+        mix_files = [x for x in sorted(self._snapshot.listdir(add_tag_args.source)) if x.endswith('.mp3')]
         for mix_file in mix_files:
             source_path = os.path.join(add_tag_args.source, mix_file)
             commands.append(self._get_add_tag_command(
@@ -684,6 +1036,14 @@ class MixCommandParser(object):
         command.destination = os.path.join(self._configuration_provider.get_mixes_destination(), destination_file)
         return command
 
+def _get_track_paths(command):
+    """ Gets the paths of the audio files a command operates on. """
+    if isinstance(command, MultiFormatEncodeWavCommand):
+        return command.destinations
+    if isinstance(command, (EncodeWavCommand, TranscodeAudioCommand, AddArtworkCommand)):
+        return [command.destination]
+    return [command.source]
+
 class AddTagCommandArgs(object):
     def __init__(self):
         self._source = ''
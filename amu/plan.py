@@ -0,0 +1,54 @@
+"""
+Plan files, which hold the commands for an invocation so they can be run later on, or on
+another machine.
+"""
+import json
+from amu.serialization import serialize_value
+
+PLAN_VERSION = 1
+
+class PlanError(Exception):
+    def __init__(self, message):
+        super(PlanError, self).__init__(message)
+        self.message = message
+
+class PlanFile(object):
+    """ A JSON file with the arguments the plan was made with and the commands it's made up
+    of, in the form the command serializer writes them.
+
+    The commands are written out after the parsing is done, so the discogs lookups and the
+    interactive prompts are already dealt with. Their paths are made absolute, so the plan
+    can be run from any directory. The encoders and taggers are created again
+    when the plan is read, which means the tool paths come from the config on the machine
+    that runs the plan.
+    """
+    def __init__(self, path, serializer):
+        self._path = path
+        self._serializer = serializer
+
+    @property
+    def path(self):
+        return self._path
+
+    def write(self, argv, commands):
+        plan = {
+            'version': PLAN_VERSION,
+            'argv': serialize_value(argv),
+            'commands': self._serializer.serialize(commands, absolute_paths=True)
+        }
+        with open(self._path, 'w') as plan_file:
+            json.dump(plan, plan_file, indent=4, sort_keys=True)
+            plan_file.write('\n')
+
+    def read(self):
+        """ :returns: The commands in the plan. """
+        try:
+            with open(self._path, 'r') as plan_file:
+                plan = json.load(plan_file)
+        except IOError as ex:
+            raise PlanError(u'The plan at {0} could not be read: {1}'.format(self._path, ex.strerror))
+        except ValueError:
+            raise PlanError(u'The plan at {0} is not valid JSON.'.format(self._path))
+        if plan.get('version') != PLAN_VERSION:
+            raise PlanError(u'The plan at {0} is not a version {1} plan.'.format(self._path, PLAN_VERSION))
+        return self._serializer.deserialize(plan['commands'])
@@ -0,0 +1,152 @@
+"""
+Turns the progress output from the encoders into events, for a compact progress display
+and a stream of metrics for each encoded track.
+"""
+import json
+import os
+import re
+import threading
+import time
+import wave
+
+LAME_PROGRESS_PATTERN = re.compile(r'^\s*\d+/\d+\s+\(\s*(\d+)%\)\|.*\|\s*([\d.]+)x\|')
+FLAC_PROGRESS_PATTERN = re.compile(r': (\d+)% complete, ratio=([\d.]+)')
+FLAC_WROTE_PATTERN = re.compile(r': wrote (\d+) bytes, ratio=([\d.]+)')
+
+class ProgressEvent(object):
+    def __init__(self, percent, speed=None, bytes_written=None):
+        self._percent = percent
+        self._speed = speed
+        self._bytes_written = bytes_written
+
+    @property
+    def percent(self):
+        return self._percent
+
+    @property
+    def speed(self):
+        """ How many times faster than realtime the encoder is running, if it reports it. """
+        return self._speed
+
+    @property
+    def bytes_written(self):
+        return self._bytes_written
+
+def parse_lame_progress(line):
+    """ Parses a progress line from lame, which looks like:
+
+        1500/9327  (16%)|    0:00/    0:03|    0:00/    0:03|   42.617x|    0:02
+
+    :returns: A progress event, or None if the line isn't a progress line.
+    """
+    match = LAME_PROGRESS_PATTERN.match(line)
+    if not match:
+        return None
+    return ProgressEvent(int(match.group(1)), float(match.group(2)))
+
+def parse_flac_progress(line):
+    """ Parses a progress line from flac, which looks like:
+
+        01 - Track 1.wav: 45% complete, ratio=0.612
+
+    The final line, when the encode is finished, has the number of bytes written instead.
+
+    :returns: A progress event, or None if the line isn't a progress line.
+    """
+    match = FLAC_WROTE_PATTERN.search(line)
+    if match:
+        return ProgressEvent(100, bytes_written=int(match.group(1)))
+    match = FLAC_PROGRESS_PATTERN.search(line)
+    if match:
+        return ProgressEvent(int(match.group(1)))
+    return None
+
+class EncodeProgressReporter(object):
+    """ Reports the progress of each encode.
+
+    Rather than echoing every progress line from the encoder, the display only has a line
+    when a track passes each quarter, and a summary when it finishes. If a metrics file is
+    given, a JSON line is appended to it for each finished track, with the wall time, how
+    many times faster than realtime it was encoded, and the compression ratio.
+    """
+    MILESTONE = 25
+
+    def __init__(self, metrics_path=None):
+        self._metrics_path = metrics_path
+        self._lock = threading.Lock()
+
+    def start(self, source, destination):
+        return EncodeProgress(self, source, destination)
+
+    def write_metrics(self, metrics):
+        if not self._metrics_path:
+            return
+        with self._lock:
+            with open(self._metrics_path, 'a') as metrics_file:
+                metrics_file.write(json.dumps(metrics, sort_keys=True) + '\n')
+
+class EncodeProgress(object):
+    """ The progress of a single encode. """
+    def __init__(self, reporter, source, destination):
+        self._reporter = reporter
+        self._source = source
+        self._destination = destination
+        self._start_time = time.time()
+        self._next_milestone = reporter.MILESTONE
+        self._last_event = None
+
+    def update(self, event):
+        self._last_event = event
+        if event.percent >= self._next_milestone and event.percent < 100:
+            print u'[encode] {0}: {1}%'.format(os.path.basename(self._destination), event.percent)
+            while self._next_milestone <= event.percent:
+                self._next_milestone += self._reporter.MILESTONE
+
+    def finish(self):
+        wall_time = time.time() - self._start_time
+        metrics = self._get_metrics(wall_time)
+        summary = u'[encode] Finished {0} in {1:.1f}s'.format(self._destination, wall_time)
+        if metrics['realtime_factor'] is not None:
+            summary += u' ({0:.1f}x realtime)'.format(metrics['realtime_factor'])
+        print summary
+        self._reporter.write_metrics(metrics)
+        return metrics
+
+    def _get_metrics(self, wall_time):
+        audio_duration = _get_wav_duration(self._source)
+        source_bytes = _get_size(self._source)
+        output_bytes = _get_size(self._destination)
+        if output_bytes is None and self._last_event:
+            output_bytes = self._last_event.bytes_written
+        realtime_factor = None
+        if audio_duration is not None and wall_time > 0:
+            realtime_factor = audio_duration / wall_time
+        compression_ratio = None
+        if source_bytes and output_bytes is not None:
+            compression_ratio = float(output_bytes) / source_bytes
+        return {
+            'source': self._source,
+            'destination': self._destination,
+            'wall_time': wall_time,
+            'audio_duration': audio_duration,
+            'realtime_factor': realtime_factor,
+            'source_bytes': source_bytes,
+            'output_bytes': output_bytes,
+            'compression_ratio': compression_ratio
+        }
+
+def _get_wav_duration(path):
+    try:
+        wav = wave.open(path, 'rb')
+        try:
+            return float(wav.getnframes()) / wav.getframerate()
+        finally:
+            wav.close()
+    except (IOError, EOFError, ZeroDivisionError, wave.Error):
+        return None
+
+def _get_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
@@ -0,0 +1,129 @@
+"""
+Paces the requests made to the discogs API, across every amu process on the host.
+"""
+import contextlib
+import fcntl
+import json
+import time
+import requests
+
+DEFAULT_BACK_OFF = 60
+MAX_RETRIES = 5
+
+class SharedTokenBucket(object):
+    """ A token bucket with its state in a small file, so processes that use the same file
+    share the same allowance.
+
+    The file is locked while the state is read and written. The lock is taken on a new
+    file descriptor each time, which means the threads within a process are also kept
+    apart.
+    """
+    def __init__(self, path, rate, capacity):
+        """
+        :path: The path of the state file.
+        :rate: The number of tokens added per second.
+        :capacity: The most tokens the bucket can hold, i.e. the largest burst of requests.
+        """
+        self._path = path
+        self._rate = rate
+        self._capacity = capacity
+
+    @property
+    def path(self):
+        return self._path
+
+    def acquire(self):
+        """ Takes a token, waiting until there is one. """
+        while True:
+            wait = self._try_acquire()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def back_off(self, seconds):
+        """ Stops any tokens being taken for a number of seconds. """
+        with self._locked_state() as state:
+            state['tokens'] = 0
+            state['blocked_until'] = max(state['blocked_until'], time.time() + seconds)
+
+    def limit_tokens(self, remaining):
+        """ Makes sure the bucket holds no more than the number of requests the server says
+        are remaining. """
+        with self._locked_state() as state:
+            state['tokens'] = min(state['tokens'], remaining)
+
+    def _try_acquire(self):
+        """ :returns: 0 if a token was taken, otherwise the number of seconds to wait. """
+        with self._locked_state() as state:
+            now = time.time()
+            if now < state['blocked_until']:
+                return state['blocked_until'] - now
+            if state['tokens'] >= 1:
+                state['tokens'] -= 1
+                return 0
+            return (1 - state['tokens']) / self._rate
+
+    @contextlib.contextmanager
+    def _locked_state(self):
+        with open(self._path, 'a+') as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state_file.seek(0)
+                state = self._refill(self._read_state(state_file.read()))
+                yield state
+                state_file.seek(0)
+                state_file.truncate()
+                state_file.write(json.dumps(state))
+                state_file.flush()
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+    def _read_state(self, content):
+        try:
+            state = json.loads(content)
+            return {
+                'tokens': float(state['tokens']),
+                'updated_at': float(state['updated_at']),
+                'blocked_until': float(state['blocked_until'])
+            }
+        except (ValueError, KeyError, TypeError):
+            # A new or corrupt state file starts off with a full bucket.
+            return {'tokens': float(self._capacity), 'updated_at': time.time(), 'blocked_until': 0.0}
+
+    def _refill(self, state):
+        now = time.time()
+        elapsed = max(0, now - state['updated_at'])
+        state['tokens'] = min(float(self._capacity), state['tokens'] + elapsed * self._rate)
+        state['updated_at'] = now
+        return state
+
+class RateLimitedFetcher(object):
+    """ A fetcher for the discogs client that takes a token from the bucket before each
+    request.
+
+    The discogs rate limit headers are used to keep the bucket in line with the server,
+    and when the server responds with a 429 the bucket backs off for as long as the server
+    asks, then the request is queued again rather than failing.
+    """
+    def __init__(self, bucket, max_retries=MAX_RETRIES):
+        self._bucket = bucket
+        self._max_retries = max_retries
+
+    def fetch(self, client, method, url, data=None, headers=None, json=True):
+        attempt = 0
+        while True:
+            self._bucket.acquire()
+            response = requests.request(method, url, data=data, headers=headers)
+            remaining = response.headers.get('X-Discogs-Ratelimit-Remaining')
+            if remaining is not None and remaining.isdigit():
+                self._bucket.limit_tokens(int(remaining))
+            if response.status_code != 429 or attempt >= self._max_retries:
+                return (response.content, response.status_code)
+            attempt += 1
+            self._bucket.back_off(self._get_retry_after(response))
+
+    def _get_retry_after(self, response):
+        try:
+            return float(response.headers.get('Retry-After', DEFAULT_BACK_OFF))
+        except ValueError:
+            return DEFAULT_BACK_OFF
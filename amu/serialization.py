@@ -0,0 +1,207 @@
+"""
+Converts commands to and from plain dictionaries, so a list of commands can be written
+to disk and run later on.
+"""
+import base64
+import os
+from amu.audio import ArtworkCache
+from amu.audio import FlacEncoder
+from amu.audio import FlacTagger
+from amu.audio import LameEncoder
+from amu.audio import Mp3Tagger
+from amu.audio import MultiFormatEncoder
+from amu.audio import PipeTranscoder
+from amu.commands import AddArtworkCommand
+from amu.commands import AddTagCommand
+from amu.commands import BuildLibraryIndexCommand
+from amu.commands import DecodeAudioCommand
+from amu.commands import EncodeWavCommand
+from amu.commands import FetchReleaseCommand
+from amu.commands import ImportDiscogsDumpCommand
+from amu.commands import MoveAudioFileCommand
+from amu.commands import MultiFormatEncodeWavCommand
+from amu.commands import QueryLibraryCommand
+from amu.commands import RemoveTagCommand
+from amu.commands import RipCdCommand
+from amu.commands import TranscodeAudioCommand
+from amu.dump import DiscogsDumpStore
+from amu.library import LibraryIndex
+from amu.library import LibraryScanner
+from amu.manifest import EncodeManifest
+
+COMMAND_PROPERTIES = {
+    'AddArtworkCommand': ['source', 'destination'],
+    'AddTagCommand': [
+        'source', 'artist', 'album_artist', 'title', 'album', 'year', 'genre', 'comment',
+        'track_number', 'track_total', 'disc_number', 'disc_total', 'artwork'
+    ],
+    'BuildLibraryIndexCommand': ['roots', 'full', 'workers'],
+    'DecodeAudioCommand': ['source', 'destination'],
+    'EncodeWavCommand': ['source', 'destination', 'keep_source'],
+    'FetchReleaseCommand': ['discogs_id', 'output_json'],
+    'ImportDiscogsDumpCommand': ['source'],
+    'MoveAudioFileCommand': ['source', 'destination', 'copy'],
+    'MultiFormatEncodeWavCommand': ['source', 'destinations', 'keep_source'],
+    'QueryLibraryCommand': [
+        'artist', 'label', 'catno', 'year', 'genre', 'discogs_id', 'format', 'without_format',
+        'min_duration', 'max_duration', 'title', 'releases', 'output_json'
+    ],
+    'RemoveTagCommand': ['source'],
+    'RipCdCommand': ['destination'],
+    'TranscodeAudioCommand': ['source', 'destination']
+}
+
+# The properties that hold paths, which can be made absolute when the commands are written
+# out to be run from somewhere else.
+PATH_PROPERTIES = ['source', 'destination', 'destinations', 'roots', 'artwork']
+
+class SerializationError(Exception):
+    def __init__(self, message):
+        super(SerializationError, self).__init__(message)
+        self.message = message
+
+def serialize_value(value):
+    """ Gets a value in a form that can be written out as JSON.
+
+    Paths are byte strings, as they're encoded on disk, which JSON has no type for. The
+    ones that aren't ASCII are written as their base64, so they're read back as the same
+    bytes whether or not they're valid UTF-8.
+    """
+    if isinstance(value, list):
+        return [serialize_value(x) for x in value]
+    if isinstance(value, str):
+        try:
+            value.decode('ascii')
+        except UnicodeDecodeError:
+            return {'bytes': base64.b64encode(value)}
+    return value
+
+def deserialize_value(value):
+    """ Gets a value back from the form serialize_value writes it in. """
+    if isinstance(value, list):
+        return [deserialize_value(x) for x in value]
+    if isinstance(value, dict) and 'bytes' in value:
+        return base64.b64decode(value['bytes'])
+    return value
+
+class CommandSerializer(object):
+    """ Serializes commands to dictionaries that can be written out as JSON.
+
+    The encoders and taggers the commands use aren't written out. When the commands are
+    read back they're created again, based on the type of the command and the extensions
+    of the files it operates on, which is how the command parser picks them in the first
+    place.
+
+    Dependencies are written as the positions of the commands in the list.
+    """
+    def __init__(self, configuration_provider, cd_ripper, metadata_service, progress_reporter=None, artwork_cache=None):
+        self._configuration_provider = configuration_provider
+        self._cd_ripper = cd_ripper
+        self._metadata_service = metadata_service
+        self._progress_reporter = progress_reporter
+        self._artwork_cache = artwork_cache if artwork_cache else ArtworkCache(configuration_provider)
+
+    def serialize(self, commands, absolute_paths=False):
+        """
+        :commands: The commands to serialize.
+        :absolute_paths: Make any relative paths absolute, based on the current directory,
+        so the commands can be run from another directory.
+        """
+        positions = dict((id(command), i) for i, command in enumerate(commands))
+        return [self._serialize_command(command, positions, absolute_paths) for command in commands]
+
+    def deserialize(self, states):
+        commands = []
+        for state in states:
+            properties = dict((name, deserialize_value(value)) for name, value in state['properties'].iteritems())
+            command = self._create_command(state['type'], properties)
+            for name, value in properties.iteritems():
+                setattr(command, name, value)
+            if state['type'] == 'EncodeWavCommand' and state.get('incremental'):
+                command.manifest = EncodeManifest(os.path.dirname(command.destination))
+            commands.append(command)
+        for command, state in zip(commands, states):
+            if state['dependencies'] is not None:
+                command.dependencies = [commands[position] for position in state['dependencies']]
+        return commands
+
+    def _serialize_command(self, command, positions, absolute_paths):
+        command_type = type(command).__name__
+        if command_type not in COMMAND_PROPERTIES:
+            raise SerializationError('The {0} command cannot be serialized.'.format(command_type))
+        properties = {}
+        for name in COMMAND_PROPERTIES[command_type]:
+            value = getattr(command, name)
+            if absolute_paths and name in PATH_PROPERTIES:
+                value = _get_absolute_path(value)
+            properties[name] = serialize_value(value)
+        state = {
+            'type': command_type,
+            'properties': properties
+        }
+        if command.dependencies is None:
+            state['dependencies'] = None
+        else:
+            state['dependencies'] = [positions[id(d)] for d in command.dependencies if id(d) in positions]
+        if command_type == 'EncodeWavCommand':
+            state['incremental'] = command.manifest is not None
+        return state
+
+    def _create_command(self, command_type, properties):
+        if command_type == 'EncodeWavCommand':
+            return EncodeWavCommand(self._configuration_provider, self._get_encoder(properties['destination']))
+        if command_type == 'MultiFormatEncodeWavCommand':
+            encoder = MultiFormatEncoder([self._get_encoder(x) for x in properties['destinations']])
+            return MultiFormatEncodeWavCommand(self._configuration_provider, encoder)
+        if command_type == 'DecodeAudioCommand':
+            return DecodeAudioCommand(self._configuration_provider, FlacEncoder(self._configuration_provider))
+        if command_type == 'TranscodeAudioCommand':
+            transcoder = PipeTranscoder(
+                FlacEncoder(self._configuration_provider), LameEncoder(self._configuration_provider))
+            return TranscodeAudioCommand(self._configuration_provider, transcoder)
+        if command_type == 'RipCdCommand':
+            return RipCdCommand(self._configuration_provider, self._cd_ripper)
+        if command_type == 'AddTagCommand':
+            return AddTagCommand(self._configuration_provider, self._get_tagger(properties['source']))
+        if command_type == 'RemoveTagCommand':
+            return RemoveTagCommand(self._configuration_provider, self._get_tagger(properties['source']))
+        if command_type == 'AddArtworkCommand':
+            return AddArtworkCommand(self._configuration_provider, self._get_tagger(properties['destination']))
+        if command_type == 'MoveAudioFileCommand':
+            return MoveAudioFileCommand(self._configuration_provider)
+        if command_type == 'FetchReleaseCommand':
+            return FetchReleaseCommand(self._configuration_provider, self._metadata_service)
+        if command_type == 'ImportDiscogsDumpCommand':
+            dump_store = DiscogsDumpStore(self._configuration_provider.get_discogs_dump_path())
+            return ImportDiscogsDumpCommand(self._configuration_provider, dump_store)
+        if command_type == 'BuildLibraryIndexCommand':
+            scanner = LibraryScanner(LibraryIndex(self._configuration_provider.get_library_index_path()))
+            return BuildLibraryIndexCommand(self._configuration_provider, scanner)
+        if command_type == 'QueryLibraryCommand':
+            index = LibraryIndex(self._configuration_provider.get_library_index_path())
+            return QueryLibraryCommand(self._configuration_provider, index)
+        raise SerializationError('The {0} command cannot be deserialized.'.format(command_type))
+
+    def _get_encoder(self, destination):
+        format = _get_format(destination)
+        if format == 'mp3':
+            return LameEncoder(self._configuration_provider, self._progress_reporter)
+        if format == 'flac':
+            return FlacEncoder(self._configuration_provider, self._progress_reporter)
+        raise SerializationError('There is no encoder for {0}.'.format(destination))
+
+    def _get_tagger(self, path):
+        format = _get_format(path)
+        if format == 'mp3':
+            return Mp3Tagger(self._configuration_provider.get_tag_padding(), self._artwork_cache)
+        if format == 'flac':
+            return FlacTagger(self._configuration_provider.get_tag_padding(), self._artwork_cache)
+        raise SerializationError('There is no tagger for {0}.'.format(path))
+
+def _get_absolute_path(value):
+    if isinstance(value, list):
+        return [_get_absolute_path(x) for x in value]
+    return os.path.abspath(value) if value else value
+
+def _get_format(path):
+    return os.path.splitext(path)[1][1:].lower()
@@ -0,0 +1,60 @@
+"""
+A snapshot of the parts of the filesystem that are read while commands are being parsed.
+"""
+import os
+
+COVER_EXTENSIONS = ('.jpg', '.png')
+
+class FileSystemSnapshot(object):
+    """ Remembers the result of every filesystem query made through it, so each directory
+    is listed and each path is checked a single time, however many parsers ask about it.
+    On a network mount every one of those queries is a round trip.
+
+    A snapshot is only meant to last while the commands for a single invocation are being
+    parsed. The commands check their files again when they run, since by then earlier
+    commands will have created or moved them.
+    """
+    def __init__(self):
+        self._results = {}
+
+    def exists(self, path):
+        return self._get('exists', path, os.path.exists)
+
+    def isfile(self, path):
+        return self._get('isfile', path, os.path.isfile)
+
+    def isdir(self, path):
+        return self._get('isdir', path, os.path.isdir)
+
+    def listdir(self, path):
+        return list(self._get('listdir', path, os.listdir))
+
+    def scan(self, path):
+        """ Gets the top level of a directory, split into directories and files, which is
+        where the parsers look for the tracks and the disc directories.
+
+        :returns: A list with the top level in the same form as os.walk, which is empty if
+        the directory can't be walked.
+        """
+        return [(root, list(directories), list(files)) for root, directories, files in self._get('scan', path, _scan)]
+
+    def get_covers(self, directory):
+        """ Gets the cover images in a directory, which are the jpgs or pngs whose names
+        start with cover.
+
+        :returns: The names of the cover images, in the order they were listed.
+        """
+        return [
+            f for f in self.listdir(directory) if f.endswith(COVER_EXTENSIONS) and f.startswith('cover')
+        ]
+
+    def _get(self, query, path, function):
+        key = (query, path)
+        if key not in self._results:
+            self._results[key] = function(path)
+        return self._results[key]
+
+def _scan(path):
+    for top in os.walk(path):
+        return [top]
+    return []
@@ -1,4 +1,5 @@
 import re
+import struct
 import subprocess
 import sys
 from contextlib import contextmanager
@@ -18,6 +19,13 @@ def captured_output():
     finally:
         sys.stdout, sys.stderr = old_out, old_err
 
+def write_flac(path):
+    """ Writes a flac with a stream info block and no audio, which is enough for mutagen. """
+    stream_info = struct.pack('>HH', 4096, 4096) + '\x00' * 6
+    stream_info += struct.pack('>Q', (44100 << 44) | (1 << 41) | (15 << 36)) + '\x00' * 16
+    with open(path, 'wb') as flac_file:
+        flac_file.write('fLaC' + '\x80' + struct.pack('>I', len(stream_info))[1:] + stream_info)
+
 def get_mp3_artwork_data(mp3_source):
     subprocess_args = ['mid3v2', '--list', mp3_source]
     result = subprocess.Popen(subprocess_args, stdout=subprocess.PIPE)
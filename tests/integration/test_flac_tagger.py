@@ -175,6 +175,19 @@ class FlacTaggerTest(unittest.TestCase):
         self.assertEqual(tag_data['genre'], u'Electronic')
         self.assertEqual(tag_data['comment'], u'Nightwind Records (NW001)')
 
+    def test__add_tags__artwork_is_set__tags_and_artwork_should_be_applied(self):
+        tagger = FlacTagger()
+        tagger.add_tags(
+            'tests/integration/data/test_data.flac', artist='Aphex Twin', title='Flap Head',
+            track_number=1, track_total=1, disc_number=1, disc_total=1,
+            artwork='tests/integration/data/cover.jpg')
+        tag_data = get_flac_tag_data('tests/integration/data/test_data.flac')
+        artwork_data = get_flac_artwork_data('tests/integration/data/test_data.flac')
+        size = os.path.getsize('tests/integration/data/cover.jpg')
+        self.assertEqual(tag_data['artist'], u'Aphex Twin')
+        self.assertEqual('image/jpeg', artwork_data[0])
+        self.assertEqual(size, artwork_data[1])
+
     def test__apply_artwork__cover_is_jpg__artwork_should_be_applied(self):
         tagger = FlacTagger()
         tagger.apply_artwork('tests/integration/data/cover.jpg', 'tests/integration/data/test_data.flac')
@@ -224,3 +237,29 @@ class FlacTaggerTest(unittest.TestCase):
         with self.assertRaisesRegexp(ValueError, 'A source must be supplied.'):
             tagger = FlacTagger()
             tagger.remove_tags('')
+
+    def test__get_tags__flac_was_tagged_by_add_tags__the_same_values_are_returned(self):
+        tagger = FlacTagger()
+        tagger.add_tags(
+            'tests/integration/data/test_data.flac', artist='Aphex Twin', album='Drukqs',
+            title='Jynweythek', year='2001', track_number=1, track_total=30, disc_number=1, disc_total=2)
+        tags = tagger.get_tags('tests/integration/data/test_data.flac')
+        self.assertEqual(u'Aphex Twin', tags['artist'])
+        self.assertEqual(u'Drukqs', tags['album'])
+        self.assertEqual(u'Jynweythek', tags['title'])
+        self.assertEqual(u'2001', tags['year'])
+        self.assertEqual(1, tags['track_number'])
+        self.assertEqual(30, tags['track_total'])
+        self.assertEqual(1, tags['disc_number'])
+        self.assertEqual(2, tags['disc_total'])
+
+    def test__get_tags__flac_has_no_tags__empty_values_are_returned(self):
+        tagger = FlacTagger()
+        tags = tagger.get_tags('tests/integration/data/test_data.flac')
+        self.assertEqual('', tags['artist'])
+        self.assertEqual(0, tags['track_number'])
+
+    def test__get_tags__source_is_empty__raises_value_error(self):
+        with self.assertRaisesRegexp(ValueError, 'A source must be supplied.'):
+            tagger = FlacTagger()
+            tagger.get_tags('')
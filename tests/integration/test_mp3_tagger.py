@@ -3,6 +3,7 @@ import os
 import shutil
 import unittest
 from amu.audio import Mp3Tagger, TaggerError
+from mutagen.id3 import ID3
 from tests.helpers import get_id3_tag_data
 from tests.helpers import get_mp3_artwork_data
 from tests.helpers import mp3_has_tags
@@ -48,13 +49,13 @@ class Mp3TaggerTest(unittest.TestCase):
         tag_data = get_id3_tag_data('tests/integration/data/test_data.mp3')
         self.assertEqual(tag_data['artist'], u'Aphex Twin')
 
-    def test__add_tags__artist_is_not_set__artist_should_be_set_to_placeholder(self):
-        # It's horrible to have to check for this placeholder value, but due to the way
-        # the tagging library works, sadly it's necessary.
+    def test__add_tags__artist_is_not_set__tag_should_not_have_an_artist_frame_and_is_saved_once(self):
         tagger = Mp3Tagger()
-        tagger.add_tags('tests/integration/data/test_data.mp3')
+        with mock.patch.object(ID3, 'save', autospec=True, side_effect=ID3.save) as save_mock:
+            tagger.add_tags('tests/integration/data/test_data.mp3')
+        self.assertEqual(1, save_mock.call_count)
         tag_data = get_id3_tag_data('tests/integration/data/test_data.mp3')
-        self.assertEqual(tag_data['artist'], u'placeholder')
+        self.assertFalse(tag_data.has_key('artist'))
 
     def test__add_tags__album_artist_is_set__tag_should_have_an_album_artist_frame(self):
         tagger = Mp3Tagger()
@@ -180,6 +181,19 @@ class Mp3TaggerTest(unittest.TestCase):
         self.assertEqual(tag_data['genre'], u'Electronic')
         self.assertEqual(tag_data['comment'], u'Nightwind Records (NW001)')
 
+    def test__add_tags__artwork_is_set__tags_and_artwork_should_be_applied(self):
+        tagger = Mp3Tagger()
+        tagger.add_tags(
+            'tests/integration/data/test_data.mp3', artist='Aphex Twin', title='Flap Head',
+            track_number=1, track_total=1, disc_number=1, disc_total=1,
+            artwork='tests/integration/data/cover.jpg')
+        tag_data = get_id3_tag_data('tests/integration/data/test_data.mp3')
+        artwork_data = get_mp3_artwork_data('tests/integration/data/test_data.mp3')
+        size = os.path.getsize('tests/integration/data/cover.jpg')
+        self.assertEqual(tag_data['artist'], u'Aphex Twin')
+        self.assertEqual('image/jpeg', artwork_data[0])
+        self.assertEqual(size, artwork_data[1])
+
     def test__apply_artwork__cover_is_jpg__artwork_should_be_applied(self):
         tagger = Mp3Tagger()
         tagger.apply_artwork('tests/integration/data/cover.jpg', 'tests/integration/data/test_data.mp3')
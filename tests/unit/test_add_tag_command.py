@@ -3,6 +3,7 @@ import mock
 import unittest
 from amu.commands import CommandValidationError
 from amu.commands import AddTagCommand
+from tests.helpers import captured_output
 from mock import Mock
 
 
@@ -75,4 +76,57 @@ class AddTagCommandTest(unittest.TestCase):
         command.disc_total = 3
         command.execute()
         tagger_mock.add_tags.assert_called_once_with(
-            '/Music/album/song.mp3', 'Aphex Twin', 'Various', 'Druqks', 'Flap Head', '2015', 'Electronic', 'WarpCD92', 3, 4, 2, 3)
+            '/Music/album/song.mp3', 'Aphex Twin', 'Various', 'Druqks', 'Flap Head', '2015', 'Electronic', 'WarpCD92', 3, 4, 2, 3, '')
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('os.path.isdir')
+    def test__validate__artwork_does_not_exist__throws_command_validation_exception(self, isdir_mock, path_exists_mock):
+        config_mock, tagger_mock = (Mock(),)*2
+        path_exists_mock.side_effect = lambda path: path == '/Music/album/song.mp3'
+        isdir_mock.return_value = False
+        command = AddTagCommand(config_mock, tagger_mock)
+        command.source = '/Music/album/song.mp3'
+        command.track_number = 1
+        command.track_total = 2
+        command.artwork = '/Music/album/cover.jpg'
+        with self.assertRaisesRegexp(CommandValidationError, 'The artwork /Music/album/cover.jpg does not exist.'):
+            command.validate()
+
+    def test__execute__artwork_specified__artwork_is_passed_to_the_tagger(self):
+        config_mock, tagger_mock = (Mock(),)*2
+        command = AddTagCommand(config_mock, tagger_mock)
+        command.source = '/Music/album/song.mp3'
+        command.artist = 'Aphex Twin'
+        command.title = 'Flap Head'
+        command.album = 'Druqks'
+        command.track_number = 3
+        command.track_total = 4
+        command.disc_number = 1
+        command.disc_total = 1
+        command.artwork = '/Music/album/cover.jpg'
+        command.execute()
+        tagger_mock.add_tags.assert_called_once_with(
+            '/Music/album/song.mp3', 'Aphex Twin', '', 'Druqks', 'Flap Head', '', '', '', 3, 4, 1, 1, '/Music/album/cover.jpg')
+
+    def test__execute__file_already_has_the_tags__it_should_print_that_the_file_was_skipped(self):
+        with captured_output() as (out, _):
+            config_mock, tagger_mock = (Mock(),)*2
+            tagger_mock.add_tags.return_value = False
+            command = AddTagCommand(config_mock, tagger_mock)
+            command.source = '/Music/album/song.mp3'
+            command.track_number = 1
+            command.track_total = 1
+            command.execute()
+            output = out.getvalue().strip().split('\n')
+            self.assertEqual('[tag] Skipped /Music/album/song.mp3, it already has these tags.', output[-1])
+
+    def test__execute__file_was_written__it_should_not_print_that_the_file_was_skipped(self):
+        with captured_output() as (out, _):
+            config_mock, tagger_mock = (Mock(),)*2
+            tagger_mock.add_tags.return_value = True
+            command = AddTagCommand(config_mock, tagger_mock)
+            command.source = '/Music/album/song.mp3'
+            command.track_number = 1
+            command.track_total = 1
+            command.execute()
+            self.assertNotIn('Skipped', out.getvalue())
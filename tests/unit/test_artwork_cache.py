@@ -0,0 +1,140 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from amu.audio import ARTWORK_LOCK_STRIPES, ArtworkCache, MAX_CACHED_ARTWORK, TaggerError, normalise_artwork
+from mock import Mock
+from PIL import Image
+
+
+class ArtworkCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cover = os.path.join(self.directory, 'cover.png')
+        Image.new('RGB', (20, 10)).save(self.cover)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test__get__cover_exists__the_cover_is_prepared(self):
+        cache = ArtworkCache()
+        artwork = cache.get(self.cover)
+        with open(self.cover, 'rb') as cover_file:
+            self.assertEqual(cover_file.read(), artwork.data)
+        self.assertEqual('image/png', artwork.mime)
+        self.assertEqual(20, artwork.width)
+        self.assertEqual(10, artwork.height)
+
+    def test__get__cover_requested_twice__the_same_prepared_cover_is_returned(self):
+        cache = ArtworkCache()
+        self.assertIs(cache.get(self.cover), cache.get(self.cover))
+
+    def test__get__cover_modified_since_it_was_prepared__the_cover_is_prepared_again(self):
+        cache = ArtworkCache()
+        artwork = cache.get(self.cover)
+        Image.new('RGB', (30, 40)).save(self.cover)
+        modified_time = os.path.getmtime(self.cover) + 10
+        os.utime(self.cover, (modified_time, modified_time))
+        prepared_again = cache.get(self.cover)
+        self.assertIsNot(artwork, prepared_again)
+        self.assertEqual(30, prepared_again.width)
+
+    def test__get__more_covers_than_the_cache_holds__the_least_recently_used_cover_is_dropped(self):
+        cache = ArtworkCache()
+        first_cover = cache.get(self.cover)
+        covers = []
+        for i in range(MAX_CACHED_ARTWORK):
+            covers.append(os.path.join(self.directory, 'cover{0}.png'.format(i)))
+            Image.new('RGB', (20, 10)).save(covers[i])
+        second_cover = cache.get(covers[0])
+        cache.get(self.cover)
+        for cover in covers[1:]:
+            cache.get(cover)
+        self.assertIs(first_cover, cache.get(self.cover))
+        self.assertIsNot(second_cover, cache.get(covers[0]))
+
+    def test__get__more_covers_than_there_are_locks__no_more_locks_are_created(self):
+        cache = ArtworkCache()
+        for i in range(ARTWORK_LOCK_STRIPES * 2):
+            cover = os.path.join(self.directory, 'cover{0}.png'.format(i))
+            Image.new('RGB', (20, 10)).save(cover)
+            cache.get(cover)
+        self.assertEqual(ARTWORK_LOCK_STRIPES, len(cache._path_locks))
+        self.assertIs(cache._get_path_lock(self.cover), cache._get_path_lock(self.cover))
+
+    def test__get__cover_does_not_exist__raises_tagger_error(self):
+        cache = ArtworkCache()
+        with self.assertRaisesRegexp(TaggerError, 'The cover art source does not exist.'):
+            cache.get(os.path.join(self.directory, 'missing.jpg'))
+
+    def test__get_picture__called_twice__the_same_picture_is_returned(self):
+        artwork = ArtworkCache().get(self.cover)
+        picture = artwork.get_picture()
+        self.assertIs(picture, artwork.get_picture())
+        self.assertEqual(20, picture.width)
+        self.assertEqual('image/png', picture.mime)
+
+    def test__get_apic_frame__called_twice__each_frame_shares_the_image_data(self):
+        artwork = ArtworkCache().get(self.cover)
+        frame1 = artwork.get_apic_frame()
+        frame2 = artwork.get_apic_frame()
+        self.assertIsNot(frame1, frame2)
+        self.assertIs(frame1.data, frame2.data)
+        self.assertEqual(u'cover', frame1.desc)
+
+    def test__get__config_has_an_artwork_max_size__the_cover_is_scaled_down_to_a_jpg(self):
+        config_mock = Mock()
+        config_mock.get_artwork_max_size.return_value = 8
+        config_mock.get_artwork_quality.return_value = 85
+        cache = ArtworkCache(config_mock)
+        artwork = cache.get(self.cover)
+        self.assertEqual('image/jpeg', artwork.mime)
+        self.assertEqual(8, artwork.width)
+        self.assertEqual(4, artwork.height)
+        self.assertEqual('JPEG', Image.open(io.BytesIO(artwork.data)).format)
+        self.assertEqual((20, 10), Image.open(self.cover).size)
+
+    def test__get__cache_has_a_pool__the_cover_is_scaled_down_in_the_pool(self):
+        config_mock = Mock()
+        config_mock.get_artwork_max_size.return_value = 8
+        config_mock.get_artwork_quality.return_value = 85
+        pool_mock = Mock()
+        pool_mock.apply.return_value = ('jpg data', 'image/jpeg', 8, 4)
+        artwork = ArtworkCache(config_mock, pool_mock).get(self.cover)
+        pool_mock.apply.assert_called_once_with(normalise_artwork, (self.cover, 8, 85))
+        self.assertEqual('jpg data', artwork.data)
+
+    def test__normalise_artwork__cover_has_a_palette__it_is_resampled_rather_than_using_the_nearest_pixel(self):
+        cover = os.path.join(self.directory, 'stripes.png')
+        image = Image.new('P', (200, 200))
+        image.putpalette([0, 0, 0, 255, 255, 255] + [0] * 762)
+        image.putdata([x % 2 for y in range(200) for x in range(200)])
+        image.save(cover)
+        data, mime, width, height = normalise_artwork(cover, 100, 95)
+        red, green, blue = Image.open(io.BytesIO(data)).getpixel((50, 50))
+        self.assertTrue(64 < red < 192)
+
+    def test__normalise_artwork__cover_is_larger_than_the_max_size__it_is_scaled_to_fit(self):
+        cover = os.path.join(self.directory, 'large.png')
+        Image.new('RGB', (300, 150)).save(cover)
+        data, mime, width, height = normalise_artwork(cover, 100, 85)
+        self.assertEqual('image/jpeg', mime)
+        self.assertEqual((100, 50), (width, height))
+        self.assertEqual((100, 50), Image.open(io.BytesIO(data)).size)
+
+    def test__normalise_artwork__jpg_is_within_the_max_size__the_jpg_is_used_as_it_is(self):
+        cover = os.path.join(self.directory, 'cover.jpg')
+        Image.new('RGB', (50, 50)).save(cover, 'JPEG')
+        data, mime, width, height = normalise_artwork(cover, 100, 85)
+        with open(cover, 'rb') as cover_file:
+            self.assertEqual(cover_file.read(), data)
+        self.assertEqual((50, 50), (width, height))
+
+    def test__normalise_artwork__cover_is_transparent__it_is_saved_as_an_rgb_jpg(self):
+        cover = os.path.join(self.directory, 'transparent.png')
+        Image.new('RGBA', (50, 50), (0, 0, 0, 0)).save(cover)
+        data, mime, width, height = normalise_artwork(cover, 100, 85)
+        image = Image.open(io.BytesIO(data))
+        self.assertEqual('RGB', image.mode)
+        self.assertEqual((255, 255, 255), image.getpixel((25, 25)))
@@ -188,154 +188,24 @@ class ArtworkCommandParserTest(unittest.TestCase):
         self.assertEqual('/some/source/cover.jpg', commands[5].source)
 
     @mock.patch('os.listdir')
-    def test__parse_from_encode_commands__4_encode_commands_and_source_has_cover_jpg__returns_4_add_artwork_commands(self, listdir_mock):
+    def test__get_cover_from_encode_commands__source_has_cover_png__returns_the_path_of_the_cover(self, listdir_mock):
         config_mock, tagger_mock, encoder_mock = (Mock(),)*3
-        listdir_mock.return_value = [
-            '01 - Track 01.wav', '02 - Track 02.wav', '03 - Track 03.wav', '04 - Track 04.wav', 'cover.jpg'
-        ]
-        commands = []
-        command1 = EncodeWavCommand(config_mock, encoder_mock)
-        command1.source = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/01 - Track 01.wav'
-        command1.destination = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/01 - Track 01.mp3'
-        commands.append(command1)
-        command2 = EncodeWavCommand(config_mock, encoder_mock)
-        command2.source = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/02 - Track 02.wav'
-        command2.destination = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/02 - Track 02.mp3'
-        commands.append(command2)
-        command3 = EncodeWavCommand(config_mock, encoder_mock)
-        command3.source = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/03 - Track 03.wav'
-        command3.destination = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/03 - Track 03.mp3'
-        commands.append(command3)
-        command4 = EncodeWavCommand(config_mock, encoder_mock)
-        command4.source = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/04 - Track 04.wav'
-        command4.destination = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/04 - Track 04.mp3'
-        commands.append(command4)
-
-        parser = ArtworkCommandParser(config_mock, tagger_mock)
-        artwork_commands = parser.parse_from_encode_commands(commands)
-        self.assertEqual(4, len(artwork_commands))
-        self.assertIsInstance(artwork_commands[0], AddArtworkCommand)
-        self.assertIsInstance(artwork_commands[1], AddArtworkCommand)
-        self.assertIsInstance(artwork_commands[2], AddArtworkCommand)
-        self.assertIsInstance(artwork_commands[3], AddArtworkCommand)
-
-    @mock.patch('os.listdir')
-    def test__parse_from_encode_commands__4_encode_commands_and_source_has_cover_jpg__commands_have_source_specified_correctly(self, listdir_mock):
-        config_mock, tagger_mock, encoder_mock = (Mock(),)*3
-        listdir_mock.return_value = [
-            '01 - Track 01.wav', '02 - Track 02.wav', '03 - Track 03.wav', '04 - Track 04.wav', 'cover.jpg'
-        ]
-        commands = []
-        command1 = EncodeWavCommand(config_mock, encoder_mock)
-        command1.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/01 - Track 01.wav'
-        command1.destination = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/01 - Track 01.mp3'
-        commands.append(command1)
-        command2 = EncodeWavCommand(config_mock, encoder_mock)
-        command2.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/02 - Track 02.wav'
-        command2.destination = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/02 - Track 02.mp3'
-        commands.append(command2)
-        command3 = EncodeWavCommand(config_mock, encoder_mock)
-        command3.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/03 - Track 03.wav'
-        command3.destination = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/03 - Track 03.mp3'
-        commands.append(command3)
-        command4 = EncodeWavCommand(config_mock, encoder_mock)
-        command4.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/04 - Track 04.wav'
-        command4.destination = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/04 - Track 04.mp3'
-        commands.append(command4)
-
-        parser = ArtworkCommandParser(config_mock, tagger_mock)
-        artwork_commands = parser.parse_from_encode_commands(commands)
-        self.assertEqual(artwork_commands[0].source, '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/cover.jpg')
-        self.assertEqual(artwork_commands[1].source, '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/cover.jpg')
-        self.assertEqual(artwork_commands[2].source, '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/cover.jpg')
-        self.assertEqual(artwork_commands[3].source, '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/cover.jpg')
-
-    @mock.patch('os.listdir')
-    def test__parse_from_encode_commands__4_encode_commands_and_source_has_cover_png__commands_have_source_specified_correctly(self, listdir_mock):
-        config_mock, tagger_mock, encoder_mock = (Mock(),)*3
-        listdir_mock.return_value = [
-            '01 - Track 01.wav', '02 - Track 02.wav', '03 - Track 03.wav', '04 - Track 04.wav', 'cover.png'
-        ]
-        commands = []
-        command1 = EncodeWavCommand(config_mock, encoder_mock)
-        command1.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/01 - Track 01.wav'
-        command1.destination = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/01 - Track 01.mp3'
-        commands.append(command1)
-        command2 = EncodeWavCommand(config_mock, encoder_mock)
-        command2.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/02 - Track 02.wav'
-        command2.destination = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/02 - Track 02.mp3'
-        commands.append(command2)
-        command3 = EncodeWavCommand(config_mock, encoder_mock)
-        command3.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/03 - Track 03.wav'
-        command3.destination = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/03 - Track 03.mp3'
-        commands.append(command3)
-        command4 = EncodeWavCommand(config_mock, encoder_mock)
-        command4.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/04 - Track 04.wav'
-        command4.destination = '/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/04 - Track 04.mp3'
-        commands.append(command4)
-
-        parser = ArtworkCommandParser(config_mock, tagger_mock)
-        artwork_commands = parser.parse_from_encode_commands(commands)
-        self.assertEqual(artwork_commands[0].source, '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/cover.png')
-        self.assertEqual(artwork_commands[1].source, '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/cover.png')
-        self.assertEqual(artwork_commands[2].source, '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/cover.png')
-        self.assertEqual(artwork_commands[3].source, '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/cover.png')
-
-    @mock.patch('os.listdir')
-    def test__parse_from_encode_commands__4_encode_commands_and_source_has_cover_jpg__commands_have_destination_specified_correctly(self, listdir_mock):
-        config_mock, tagger_mock, encoder_mock = (Mock(),)*3
-        listdir_mock.return_value = [
-            '01 - Track 01.wav', '02 - Track 02.wav', '03 - Track 03.wav', '04 - Track 04.wav', 'cover.jpg'
-        ]
-        commands = []
-        command1 = EncodeWavCommand(config_mock, encoder_mock)
-        command1.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/01 - Track 01.wav'
-        command1.destination = '/mp3/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/01 - Track 01.mp3'
-        commands.append(command1)
-        command2 = EncodeWavCommand(config_mock, encoder_mock)
-        command2.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/02 - Track 02.wav'
-        command2.destination = '/mp3/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/02 - Track 02.mp3'
-        commands.append(command2)
-        command3 = EncodeWavCommand(config_mock, encoder_mock)
-        command3.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/03 - Track 03.wav'
-        command3.destination = '/mp3/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/03 - Track 03.mp3'
-        commands.append(command3)
-        command4 = EncodeWavCommand(config_mock, encoder_mock)
-        command4.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/04 - Track 04.wav'
-        command4.destination = '/mp3/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/04 - Track 04.mp3'
-        commands.append(command4)
+        listdir_mock.return_value = ['01 - Track 01.wav', 'cover.png']
+        command = EncodeWavCommand(config_mock, encoder_mock)
+        command.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/01 - Track 01.wav'
+        command.destination = '/mp3/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/01 - Track 01.mp3'
 
         parser = ArtworkCommandParser(config_mock, tagger_mock)
-        artwork_commands = parser.parse_from_encode_commands(commands)
-        self.assertEqual(artwork_commands[0].destination, '/mp3/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/01 - Track 01.mp3')
-        self.assertEqual(artwork_commands[1].destination, '/mp3/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/02 - Track 02.mp3')
-        self.assertEqual(artwork_commands[2].destination, '/mp3/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/03 - Track 03.mp3')
-        self.assertEqual(artwork_commands[3].destination, '/mp3/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/04 - Track 04.mp3')
+        cover = parser.get_cover_from_encode_commands([command])
+        self.assertEqual('/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/cover.png', cover)
 
     @mock.patch('os.listdir')
-    def test__parse_from_encode_commands__4_encode_commands_source_has_no_cover__returns_empty_list(self, listdir_mock):
+    def test__get_cover_from_encode_commands__source_has_no_cover__returns_empty_string(self, listdir_mock):
         config_mock, tagger_mock, encoder_mock = (Mock(),)*3
-        listdir_mock.return_value = [
-            '01 - Track 01.wav', '02 - Track 02.wav', '03 - Track 03.wav', '04 - Track 04.wav'
-        ]
-        commands = []
-        command1 = EncodeWavCommand(config_mock, encoder_mock)
-        command1.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/01 - Track 01.wav'
-        command1.destination = '/mp3/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/01 - Track 01.mp3'
-        commands.append(command1)
-        command2 = EncodeWavCommand(config_mock, encoder_mock)
-        command2.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/02 - Track 02.wav'
-        command2.destination = '/mp3/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/02 - Track 02.mp3'
-        commands.append(command2)
-        command3 = EncodeWavCommand(config_mock, encoder_mock)
-        command3.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/03 - Track 03.wav'
-        command3.destination = '/mp3/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/03 - Track 03.mp3'
-        commands.append(command3)
-        command4 = EncodeWavCommand(config_mock, encoder_mock)
-        command4.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/04 - Track 04.wav'
-        command4.destination = '/mp3/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/04 - Track 04.mp3'
-        commands.append(command4)
+        listdir_mock.return_value = ['01 - Track 01.wav']
+        command = EncodeWavCommand(config_mock, encoder_mock)
+        command.source = '/wav/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/01 - Track 01.wav'
+        command.destination = '/mp3/Rephlex/[ANALORD 08] AFX - Analord 08 (2005)/01 - Track 01.mp3'
 
         parser = ArtworkCommandParser(config_mock, tagger_mock)
-        artwork_commands = parser.parse_from_encode_commands(commands)
-        self.assertEqual(0, len(artwork_commands))
+        self.assertEqual('', parser.get_cover_from_encode_commands([command]))
@@ -0,0 +1,55 @@
+import mock
+import unittest
+from mock import Mock
+from amu.commands import BuildLibraryIndexCommand
+from amu.commands import CommandValidationError
+from amu.library import LibraryScanResult
+from tests.helpers import captured_output
+
+
+class BuildLibraryIndexCommandTest(unittest.TestCase):
+    def test__validate__no_release_directories_are_specified__raises_command_validation_error(self):
+        command = BuildLibraryIndexCommand(Mock(), Mock())
+        with self.assertRaisesRegexp(CommandValidationError, 'At least one release directory must be specified for building the library index.'):
+            command.validate()
+
+    @mock.patch('os.path.isdir')
+    def test__validate__release_directory_does_not_exist__raises_command_validation_error(self, isdir_mock):
+        isdir_mock.return_value = False
+        command = BuildLibraryIndexCommand(Mock(), Mock())
+        command.roots = ['/music/flac']
+        with self.assertRaisesRegexp(CommandValidationError, 'The release directory /music/flac does not exist.'):
+            command.validate()
+
+    @mock.patch('os.path.isdir')
+    def test__validate__zero_workers_are_specified__raises_command_validation_error(self, isdir_mock):
+        isdir_mock.return_value = True
+        command = BuildLibraryIndexCommand(Mock(), Mock())
+        command.roots = ['/music/flac']
+        command.workers = 0
+        with self.assertRaisesRegexp(CommandValidationError, 'At least 1 worker must be used for building the library index.'):
+            command.validate()
+
+    def test__execute__the_release_directories_are_specified__the_scanner_is_used_with_the_options(self):
+        scanner_mock = Mock()
+        scanner_mock.scan.return_value = LibraryScanResult()
+        command = BuildLibraryIndexCommand(Mock(), scanner_mock)
+        command.roots = ['/music/mp3', '/music/flac']
+        command.full = True
+        command.workers = 4
+        with captured_output():
+            command.execute()
+        scanner_mock.scan.assert_called_once_with(['/music/mp3', '/music/flac'], True, 4)
+
+    def test__execute__tracks_could_not_be_read__the_number_of_unreadable_tracks_is_printed(self):
+        scanner_mock = Mock()
+        result = LibraryScanResult()
+        result.tracks_indexed = 10
+        result.unreadable_tracks = 2
+        scanner_mock.scan.return_value = result
+        command = BuildLibraryIndexCommand(Mock(), scanner_mock)
+        command.roots = ['/music/flac']
+        with captured_output() as (out, _):
+            command.execute()
+        self.assertIn('[index] Indexed 10 tracks.', out.getvalue())
+        self.assertIn('[index] 2 tracks could not be read.', out.getvalue())
@@ -0,0 +1,27 @@
+import unittest
+from amu.clidriver import CliDriver
+from tests.helpers import captured_output
+
+
+class CliDriverTest(unittest.TestCase):
+    def test__get_argument_parser__journaled_commands__resume_can_be_used(self):
+        arg_parser = CliDriver().get_argument_parser()
+        for args in [
+                ['discogs', 'import-dump', 'releases.xml.gz'],
+                ['index', 'build'],
+                ['rip'],
+                ['encode', 'wav', 'mp3'],
+                ['decode', 'flac'],
+                ['transcode', 'flac', 'mp3'],
+                ['tag', 'add', 'mp3'],
+                ['artwork', 'add', 'mp3'],
+                ['run-plan', 'plan.json'],
+                ['mix', 'mix.wav']]:
+            self.assertTrue(arg_parser.parse_args(args + ['--resume']).resume)
+
+    def test__get_argument_parser__commands_that_are_not_journaled__resume_is_rejected(self):
+        arg_parser = CliDriver().get_argument_parser()
+        for args in [['fetch', '1'], ['query'], ['search', 'Legowelt']]:
+            with captured_output():
+                with self.assertRaises(SystemExit):
+                    arg_parser.parse_args(args + ['--resume'])
@@ -0,0 +1,217 @@
+import unittest
+from mock import Mock
+from amu.execution import CommandExecutionError, CommandExecutor
+from tests.helpers import captured_output
+
+
+class CommandExecutorTest(unittest.TestCase):
+    def _get_command_mock(self, calls, name, dependencies=None, error=None):
+        command = Mock()
+        command.dependencies = dependencies
+        command.source = name
+        command.validate.side_effect = lambda: calls.append('validate ' + name)
+        def execute():
+            calls.append('execute ' + name)
+            if error:
+                raise error
+        command.execute.side_effect = execute
+        return command
+
+    def test__init__jobs_is_less_than_1__raises_value_error(self):
+        with self.assertRaisesRegexp(ValueError, 'At least 1 job must be used to execute the commands.'):
+            CommandExecutor(0)
+
+    def test__init__jobs_is_not_specified__number_of_cores_is_used(self):
+        executor = CommandExecutor()
+        self.assertGreaterEqual(executor.jobs, 1)
+
+    def test__execute__sequential_commands__commands_are_validated_and_executed_in_order(self):
+        calls = []
+        commands = [self._get_command_mock(calls, 'a'), self._get_command_mock(calls, 'b')]
+        executor = CommandExecutor(4)
+        executor.execute(commands)
+        self.assertEqual(['validate a', 'execute a', 'validate b', 'execute b'], calls)
+
+    def test__execute__independent_commands_followed_by_command_without_dependencies__it_runs_last(self):
+        calls = []
+        commands = [
+            self._get_command_mock(calls, 'encode 1', []),
+            self._get_command_mock(calls, 'encode 2', []),
+            self._get_command_mock(calls, 'encode 3', []),
+            self._get_command_mock(calls, 'tag')
+        ]
+        executor = CommandExecutor(4)
+        executor.execute(commands)
+        self.assertEqual(8, len(calls))
+        self.assertEqual('execute tag', calls[-1])
+
+    def test__execute__a_command_with_a_non_ascii_path_fails__the_failure_is_reported(self):
+        calls = []
+        commands = [
+            self._get_command_mock(calls, '/music/Bj\xc3\xb6rk/01.flac', [], Exception('/music/Bj\xc3\xb6rk/01.flac is corrupt')),
+            self._get_command_mock(calls, '/music/Bj\xc3\xb6rk/02.flac', [])
+        ]
+        executor = CommandExecutor(2)
+        with captured_output() as (_, err):
+            with self.assertRaises(CommandExecutionError) as context:
+                executor.execute(commands)
+        self.assertEqual(1, len(context.exception.failures))
+        self.assertIn('[error] Mock for /music/Bj\xc3\xb6rk/01.flac failed', err.getvalue())
+
+    def test__execute__an_independent_command_fails__the_other_independent_commands_are_executed(self):
+        calls = []
+        commands = [
+            self._get_command_mock(calls, 'encode 1', [], Exception('lame failed')),
+            self._get_command_mock(calls, 'encode 2', []),
+            self._get_command_mock(calls, 'encode 3', [])
+        ]
+        executor = CommandExecutor(2)
+        with captured_output():
+            with self.assertRaises(CommandExecutionError):
+                executor.execute(commands)
+        self.assertIn('execute encode 2', calls)
+        self.assertIn('execute encode 3', calls)
+
+    def test__execute__an_independent_command_fails__later_commands_without_dependencies_are_skipped(self):
+        calls = []
+        commands = [
+            self._get_command_mock(calls, 'encode 1', [], Exception('lame failed')),
+            self._get_command_mock(calls, 'encode 2', []),
+            self._get_command_mock(calls, 'tag')
+        ]
+        executor = CommandExecutor(2)
+        with captured_output():
+            with self.assertRaises(CommandExecutionError):
+                executor.execute(commands)
+        self.assertNotIn('validate tag', calls)
+
+    def test__execute__two_commands_fail__each_failure_is_reported(self):
+        calls = []
+        first_error = Exception('first')
+        second_error = Exception('second')
+        commands = [
+            self._get_command_mock(calls, 'encode 1', [], first_error),
+            self._get_command_mock(calls, 'encode 2', [], second_error)
+        ]
+        executor = CommandExecutor(2)
+        with captured_output() as (_, err):
+            with self.assertRaises(CommandExecutionError) as context:
+                executor.execute(commands)
+            self.assertIn('encode 1 failed: first', err.getvalue())
+            self.assertIn('encode 2 failed: second', err.getvalue())
+        self.assertEqual([(commands[0], first_error), (commands[1], second_error)], context.exception.failures)
+
+    def test__execute__command_depends_on_a_failed_command__it_is_skipped(self):
+        calls = []
+        encode1 = self._get_command_mock(calls, 'encode 1', [], Exception('lame failed'))
+        encode2 = self._get_command_mock(calls, 'encode 2', [])
+        tag1 = self._get_command_mock(calls, 'tag 1', [encode1])
+        tag2 = self._get_command_mock(calls, 'tag 2', [encode2])
+        executor = CommandExecutor(2)
+        with captured_output() as (_, err):
+            with self.assertRaises(CommandExecutionError):
+                executor.execute([encode1, encode2, tag1, tag2])
+            self.assertIn('tag 1 was skipped', err.getvalue())
+        self.assertNotIn('validate tag 1', calls)
+        self.assertIn('execute tag 2', calls)
+
+    def test__execute__command_depends_on_a_skipped_command__it_is_also_skipped(self):
+        calls = []
+        encode = self._get_command_mock(calls, 'encode', [], Exception('lame failed'))
+        tag = self._get_command_mock(calls, 'tag', [encode])
+        move = self._get_command_mock(calls, 'move', [tag])
+        executor = CommandExecutor(2)
+        with captured_output():
+            with self.assertRaises(CommandExecutionError):
+                executor.execute([encode, tag, move])
+        self.assertEqual(['validate encode', 'execute encode'], calls)
+
+    def test__execute__track_chains__each_command_runs_after_its_dependency(self):
+        calls = []
+        commands = []
+        for i in range(1, 4):
+            encode = self._get_command_mock(calls, 'encode {0}'.format(i), [])
+            tag = self._get_command_mock(calls, 'tag {0}'.format(i), [encode])
+            move = self._get_command_mock(calls, 'move {0}'.format(i), [tag])
+            commands.extend([encode, tag, move])
+        executor = CommandExecutor(3)
+        executor.execute(commands)
+        for i in range(1, 4):
+            self.assertLess(calls.index('execute encode {0}'.format(i)), calls.index('validate tag {0}'.format(i)))
+            self.assertLess(calls.index('execute tag {0}'.format(i)), calls.index('validate move {0}'.format(i)))
+
+    def test__execute__single_job_with_track_chains__a_track_is_finished_before_the_next_is_started(self):
+        calls = []
+        encode1 = self._get_command_mock(calls, 'encode 1', [])
+        encode2 = self._get_command_mock(calls, 'encode 2', [])
+        tag1 = self._get_command_mock(calls, 'tag 1', [encode1])
+        tag2 = self._get_command_mock(calls, 'tag 2', [encode2])
+        executor = CommandExecutor(1)
+        executor.execute([encode1, encode2, tag1, tag2])
+        self.assertEqual(
+            ['execute encode 1', 'execute tag 1', 'execute encode 2', 'execute tag 2'],
+            [call for call in calls if call.startswith('execute')])
+
+    def test__execute__dependency_is_not_in_the_list__it_is_treated_as_satisfied(self):
+        calls = []
+        encode = self._get_command_mock(calls, 'encode', [])
+        tag = self._get_command_mock(calls, 'tag', [encode])
+        executor = CommandExecutor(2)
+        executor.execute([tag])
+        self.assertEqual(['validate tag', 'execute tag'], calls)
+
+    def test__execute__circular_dependencies__raises_command_execution_error(self):
+        calls = []
+        first = self._get_command_mock(calls, 'first')
+        second = self._get_command_mock(calls, 'second')
+        first.dependencies = [second]
+        second.dependencies = [first]
+        executor = CommandExecutor(2)
+        with self.assertRaisesRegexp(CommandExecutionError, 'circular dependencies'):
+            executor.execute([first, second])
+
+    def test__execute__command_completed_callback_is_given__it_is_called_for_each_successful_command(self):
+        calls = []
+        encode1 = self._get_command_mock(calls, 'encode 1', [], Exception('lame failed'))
+        encode2 = self._get_command_mock(calls, 'encode 2', [])
+        completed = []
+        executor = CommandExecutor(2)
+        with captured_output():
+            with self.assertRaises(CommandExecutionError):
+                executor.execute([encode1, encode2], completed.append)
+        self.assertEqual([encode2], completed)
+
+    def test__execute_stream__generator_of_commands__only_a_few_commands_are_taken_ahead(self):
+        calls = []
+        in_flight = []
+        def generate_commands():
+            for i in range(10):
+                executed = len([x for x in calls if x.startswith('execute')])
+                in_flight.append(i - executed)
+                yield self._get_command_mock(calls, str(i), [])
+        executor = CommandExecutor(1)
+        executor.execute_stream(generate_commands())
+        self.assertEqual(10, len([x for x in calls if x.startswith('execute')]))
+        self.assertLessEqual(max(in_flight), 2)
+
+    def test__execute_stream__command_fails__the_other_commands_still_run(self):
+        calls = []
+        commands = [
+            self._get_command_mock(calls, 'a', []),
+            self._get_command_mock(calls, 'b', [], ValueError('failed')),
+            self._get_command_mock(calls, 'c', [])
+        ]
+        executor = CommandExecutor(1)
+        with captured_output():
+            with self.assertRaisesRegexp(CommandExecutionError, '1 command\\(s\\) failed to execute.') as context:
+                executor.execute_stream(iter(commands))
+        self.assertIn('execute c', calls)
+        self.assertEqual(commands[1], context.exception.failures[0][0])
+
+    def test__execute_stream__command_completes__callback_is_called_with_the_command(self):
+        calls = []
+        completed = []
+        commands = [self._get_command_mock(calls, 'a', []), self._get_command_mock(calls, 'b', [])]
+        executor = CommandExecutor(2)
+        executor.execute_stream(iter(commands), completed.append)
+        self.assertEqual(set([id(x) for x in commands]), set([id(x) for x in completed]))
@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+import unittest
+from mock import Mock
+from amu.commands import EncodeWavCommand, MoveAudioFileCommand
+from amu.journal import CommandJournal, JournalError, get_batch_argv, get_journal_path
+from amu.serialization import CommandSerializer
+
+
+class CommandJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, '.amu_journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _get_journal(self):
+        return CommandJournal(self.path, CommandSerializer(Mock(), Mock(), Mock()))
+
+    def _get_commands(self):
+        commands = []
+        for i in range(1, 4):
+            command = EncodeWavCommand(Mock(), Mock())
+            command.source = '/some/path/0{0} - Track {0}.wav'.format(i)
+            command.destination = '/some/destination/0{0} - Track {0}.mp3'.format(i)
+            command.dependencies = []
+            commands.append(command)
+        return commands
+
+    def test__resume__two_of_three_commands_completed__the_remaining_command_is_returned(self):
+        commands = self._get_commands()
+        journal = self._get_journal()
+        journal.start(['encode', 'wav', 'mp3'], commands)
+        journal.command_completed(commands[0])
+        journal.command_completed(commands[2])
+        journal.close()
+        remaining = self._get_journal().resume(['encode', 'wav', 'mp3'])
+        self.assertEqual(1, len(remaining))
+        self.assertEqual('/some/path/02 - Track 2.wav', remaining[0].source)
+
+    def test__resume__commands_depend_on_a_completed_command__the_dependency_is_kept(self):
+        encode = self._get_commands()[0]
+        move = MoveAudioFileCommand(Mock())
+        move.source = encode.destination
+        move.destination = '/some/release/01 - Track 1.mp3'
+        move.dependencies = [encode]
+        journal = self._get_journal()
+        journal.start(['encode', 'wav', 'mp3'], [encode, move])
+        journal.command_completed(encode)
+        journal.close()
+        remaining = self._get_journal().resume(['encode', 'wav', 'mp3'])
+        self.assertEqual([move.destination], [x.destination for x in remaining])
+        self.assertEqual(1, len(remaining[0].dependencies))
+        self.assertNotIn(remaining[0].dependencies[0], remaining)
+
+    def test__resume__commands_complete_after_resuming__they_are_recorded_against_the_original_plan(self):
+        commands = self._get_commands()
+        journal = self._get_journal()
+        journal.start(['encode', 'wav', 'mp3'], commands)
+        journal.command_completed(commands[0])
+        journal.close()
+        resumed_journal = self._get_journal()
+        remaining = resumed_journal.resume(['encode', 'wav', 'mp3'])
+        resumed_journal.command_completed(remaining[0])
+        resumed_journal.close()
+        remaining = self._get_journal().resume(['encode', 'wav', 'mp3'])
+        self.assertEqual(['/some/path/03 - Track 3.wav'], [x.source for x in remaining])
+
+    def test__resume__last_entry_was_cut_short__the_entry_is_ignored(self):
+        commands = self._get_commands()
+        journal = self._get_journal()
+        journal.start(['encode', 'wav', 'mp3'], commands)
+        journal.command_completed(commands[0])
+        journal.close()
+        with open(self.path, 'a') as journal_file:
+            journal_file.write('{"entry": "compl')
+        remaining = self._get_journal().resume(['encode', 'wav', 'mp3'])
+        self.assertEqual(2, len(remaining))
+
+    def test__resume__paths_are_not_valid_utf8__the_commands_are_resumed_with_the_same_paths(self):
+        commands = self._get_commands()
+        commands[1].source = '/some/path/02 - Caf\xe9.wav'
+        argv = ['encode', 'wav', 'mp3', '--source=/some/path/02 - Caf\xe9.wav']
+        journal = self._get_journal()
+        journal.start(argv, commands)
+        journal.command_completed(commands[0])
+        journal.close()
+        remaining = self._get_journal().resume(argv)
+        self.assertEqual(['/some/path/02 - Caf\xe9.wav', '/some/path/03 - Track 3.wav'], [x.source for x in remaining])
+
+    def test__resume__arguments_are_different__raises_journal_error(self):
+        journal = self._get_journal()
+        journal.start(['encode', 'wav', 'mp3'], self._get_commands())
+        journal.close()
+        with self.assertRaisesRegexp(JournalError, "The journal is for 'amu encode wav mp3'"):
+            self._get_journal().resume(['encode', 'wav', 'flac'])
+
+    def test__resume__there_is_no_journal__raises_journal_error(self):
+        with self.assertRaisesRegexp(JournalError, 'There is no journal to resume from'):
+            self._get_journal().resume(['encode', 'wav', 'mp3'])
+
+    def test__remove__batch_has_completed__the_journal_is_removed(self):
+        journal = self._get_journal()
+        journal.start(['encode', 'wav', 'mp3'], self._get_commands())
+        journal.remove()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test__start__journal_is_being_used_by_another_process__raises_journal_error(self):
+        journal = self._get_journal()
+        journal.start(['encode', 'wav', 'mp3'], self._get_commands())
+        with self.assertRaisesRegexp(JournalError, 'is being used by another amu process'):
+            self._get_journal().start(['encode', 'wav', 'mp3'], self._get_commands())
+        journal.close()
+        self.assertEqual(3, len(self._get_journal().resume(['encode', 'wav', 'mp3'])))
+
+    def test__start__journal_directory_does_not_exist__the_directory_is_created(self):
+        self.path = os.path.join(self.directory, '.amu_journals', 'journal')
+        journal = self._get_journal()
+        journal.start(['encode', 'wav', 'mp3'], self._get_commands())
+        journal.close()
+        self.assertTrue(os.path.exists(self.path))
+
+    def test__get_journal_path__same_arguments_in_different_directories__the_paths_are_different(self):
+        first_path = get_journal_path('/music/wavs/Autechre - Confield', ['encode', 'wav', 'mp3'])
+        second_path = get_journal_path('/music/wavs/AFX - Analord 08', ['encode', 'wav', 'mp3'])
+        self.assertNotEqual(first_path, second_path)
+        self.assertEqual(first_path, get_journal_path('/music/wavs/Autechre - Confield', ['encode', 'wav', 'mp3']))
+
+    def test__get_batch_argv__resumed_with_a_different_number_of_jobs__the_arguments_match_the_original_ones(self):
+        original_argv = get_batch_argv(['encode', 'wav', 'mp3', '--jobs', '8', '--source=/music/wavs'])
+        resumed_argv = get_batch_argv(['encode', 'wav', 'mp3', '--jobs=2', '--source=/music/wavs', '--resume'])
+        self.assertEqual(['encode', 'wav', 'mp3', '--source=/music/wavs'], original_argv)
+        self.assertEqual(original_argv, resumed_argv)
+        self.assertEqual(get_journal_path('/music', original_argv), get_journal_path('/music', resumed_argv))
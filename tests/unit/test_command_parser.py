@@ -7,10 +7,11 @@ from amu import utils
 from amu.audio import FlacTagger
 from amu.audio import Mp3Tagger
 from amu.clidriver import CliDriver
-from amu.commands import AddArtworkCommand, AddTagCommand, DecodeAudioCommand, EncodeWavCommand, FetchReleaseCommand, MoveAudioFileCommand, RemoveTagCommand, RipCdCommand
+from amu.commands import AddArtworkCommand, AddTagCommand, BuildLibraryIndexCommand, DecodeAudioCommand, EncodeWavCommand, FetchReleaseCommand, ImportDiscogsDumpCommand, MoveAudioFileCommand, MultiFormatEncodeWavCommand, QueryLibraryCommand, RemoveTagCommand, RipCdCommand
 from amu.models import ReleaseModel
 from amu.parsing import CommandParser, CommandParsingError
 from mock import Mock
+from tests.helpers import captured_output
 
 
 class CommandParserTest(unittest.TestCase):
@@ -152,7 +153,7 @@ class CommandParserTest(unittest.TestCase):
             parser.from_args(args)
 
     @mock.patch('amu.parsing.MoveAudioFileCommandParser.parse_from_encode_commands')
-    @mock.patch('amu.parsing.ArtworkCommandParser.parse_from_encode_commands')
+    @mock.patch('amu.parsing.ArtworkCommandParser.get_cover_from_encode_commands')
     @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
     def test__from_args__encode_wav_to_mp3_command_with_discogs_id_specified__it_should_return_4_tag_mp3_commands(self, encode_command_parser_mock, artwork_command_parser_mock, move_file_command_parser_mock):
         config_mock, cd_ripper_mock, encoder_mock, metadata_mock, tagger_mock, genre_selector_mock = (Mock(),)*6
@@ -171,12 +172,7 @@ class CommandParserTest(unittest.TestCase):
             EncodeWavCommand(config_mock, encoder_mock),
             EncodeWavCommand(config_mock, encoder_mock)
         ]
-        artwork_command_parser_mock.return_value = [
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock)
-        ]
+        artwork_command_parser_mock.return_value = '/some/path/to/wavs/cover.jpg'
         move_file_command_parser_mock.return_value = [
             MoveAudioFileCommand(config_mock),
             MoveAudioFileCommand(config_mock),
@@ -207,7 +203,7 @@ class CommandParserTest(unittest.TestCase):
         self.assertEqual(4, len(commands))
 
     @mock.patch('amu.parsing.MoveAudioFileCommandParser.parse_from_encode_commands')
-    @mock.patch('amu.parsing.ArtworkCommandParser.parse_from_encode_commands')
+    @mock.patch('amu.parsing.ArtworkCommandParser.get_cover_from_encode_commands')
     @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
     def test__from_args__encode_wav_to_mp3_command_with_discogs_id_specified__the_sources_from_the_encode_commands_should_be_used(self, encode_command_parser_mock, artwork_command_parser_mock, move_file_command_parser_mock):
         config_mock, cd_ripper_mock, encoder_mock, metadata_mock, tagger_mock, genre_selector_mock = (Mock(),)*6
@@ -238,12 +234,7 @@ class CommandParserTest(unittest.TestCase):
         command4.destination = '/some/path/to/mp3s/04 - Track 04.mp3'
         commands.append(command4)
         encode_command_parser_mock.return_value = commands
-        artwork_command_parser_mock.return_value = [
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock)
-        ]
+        artwork_command_parser_mock.return_value = '/some/path/to/wavs/cover.jpg'
         move_file_command_parser_mock.return_value = [
             MoveAudioFileCommand(config_mock),
             MoveAudioFileCommand(config_mock),
@@ -277,7 +268,7 @@ class CommandParserTest(unittest.TestCase):
         self.assertEqual('/some/path/to/mp3s/04 - Track 04.mp3', commands[3].source)
 
     @mock.patch('amu.parsing.MoveAudioFileCommandParser.parse_from_encode_commands')
-    @mock.patch('amu.parsing.ArtworkCommandParser.parse_from_encode_commands')
+    @mock.patch('amu.parsing.ArtworkCommandParser.get_cover_from_encode_commands')
     @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
     def test__from_args__encode_wav_to_mp3_command_with_discogs_id_specified__the_genre_selector_should_be_used(self, encode_command_parser_mock, artwork_command_parser_mock, move_file_command_parser_mock):
         config_mock, cd_ripper_mock, encoder_mock, metadata_mock, tagger_mock, genre_selector_mock = (Mock(),)*6
@@ -308,12 +299,7 @@ class CommandParserTest(unittest.TestCase):
         command4.destination = '/some/path/to/mp3s/04 - Track 04.mp3'
         commands.append(command4)
         encode_command_parser_mock.return_value = commands
-        artwork_command_parser_mock.return_value = [
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock)
-        ]
+        artwork_command_parser_mock.return_value = '/some/path/to/wavs/cover.jpg'
         move_file_command_parser_mock.return_value = [
             MoveAudioFileCommand(config_mock),
             MoveAudioFileCommand(config_mock),
@@ -344,7 +330,7 @@ class CommandParserTest(unittest.TestCase):
         genre_selector_mock.select_genre.assert_called_once_with(['Electronic', 'Acid'])
 
     @mock.patch('amu.parsing.MoveAudioFileCommandParser.parse_from_encode_commands')
-    @mock.patch('amu.parsing.ArtworkCommandParser.parse_from_encode_commands')
+    @mock.patch('amu.parsing.ArtworkCommandParser.get_cover_from_encode_commands')
     @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
     def test__from_args__encode_wav_to_mp3_command_with_discogs_id_specified_and_use_genre_is_false__the_genre_selector_should_not_be_used(self, encode_command_parser_mock, artwork_command_parser_mock, move_file_command_parser_mock):
         config_mock, cd_ripper_mock, encoder_mock, metadata_mock, tagger_mock, genre_selector_mock = (Mock(),)*6
@@ -375,12 +361,7 @@ class CommandParserTest(unittest.TestCase):
         command4.destination = '/some/path/to/mp3s/04 - Track 04.mp3'
         commands.append(command4)
         encode_command_parser_mock.return_value = commands
-        artwork_command_parser_mock.return_value = [
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock)
-        ]
+        artwork_command_parser_mock.return_value = '/some/path/to/wavs/cover.jpg'
         move_file_command_parser_mock.return_value = [
             MoveAudioFileCommand(config_mock),
             MoveAudioFileCommand(config_mock),
@@ -454,7 +435,7 @@ class CommandParserTest(unittest.TestCase):
             parser.from_args(args)
 
     @mock.patch('amu.parsing.MoveAudioFileCommandParser.parse_from_encode_commands')
-    @mock.patch('amu.parsing.ArtworkCommandParser.parse_from_encode_commands')
+    @mock.patch('amu.parsing.ArtworkCommandParser.get_cover_from_encode_commands')
     @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
     def test__from_args__encode_wav_to_mp3_command_with_discogs_id_specified__the_release_should_only_be_fetched_once(self, encode_command_parser_mock, artwork_command_parser_mock, move_file_command_parser_mock):
         config_mock, cd_ripper_mock, encoder_mock, metadata_mock, tagger_mock, genre_selector_mock = (Mock(),)*6
@@ -473,12 +454,7 @@ class CommandParserTest(unittest.TestCase):
             EncodeWavCommand(config_mock, encoder_mock),
             EncodeWavCommand(config_mock, encoder_mock),
         ]
-        artwork_command_parser_mock.return_value = [
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock)
-        ]
+        artwork_command_parser_mock.return_value = '/some/path/to/wavs/cover.jpg'
         move_file_command_parser_mock.return_value = [
             MoveAudioFileCommand(config_mock),
             MoveAudioFileCommand(config_mock),
@@ -510,7 +486,7 @@ class CommandParserTest(unittest.TestCase):
         metadata_mock.get_release_by_id.assert_called_once_with(451034, False)
 
     @mock.patch('amu.parsing.MoveAudioFileCommandParser.parse_from_encode_commands')
-    @mock.patch('amu.parsing.ArtworkCommandParser.parse_from_encode_commands')
+    @mock.patch('amu.parsing.ArtworkCommandParser.get_cover_from_encode_commands')
     @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
     def test__from_args__encode_wav_to_mp3_command_with_discogs_id_specified__the_encode_command_parser_should_be_called_correctly(self, encode_command_parser_mock, artwork_command_parser_mock, move_file_command_parser_mock):
         config_mock, cd_ripper_mock, encoder_mock, metadata_mock, tagger_mock, genre_selector_mock = (Mock(),)*6
@@ -529,12 +505,7 @@ class CommandParserTest(unittest.TestCase):
             EncodeWavCommand(config_mock, encoder_mock),
             EncodeWavCommand(config_mock, encoder_mock),
         ]
-        artwork_command_parser_mock.return_value = [
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock)
-        ]
+        artwork_command_parser_mock.return_value = '/some/path/to/wavs/cover.jpg'
         move_file_command_parser_mock.return_value = [
             MoveAudioFileCommand(config_mock),
             MoveAudioFileCommand(config_mock),
@@ -566,7 +537,7 @@ class CommandParserTest(unittest.TestCase):
         encode_command_parser_mock.assert_called_once_with('/some/path/to/wavs', '/some/replaced/mask')
 
     @mock.patch('amu.parsing.MoveAudioFileCommandParser.parse_from_encode_commands')
-    @mock.patch('amu.parsing.ArtworkCommandParser.parse_from_encode_commands')
+    @mock.patch('amu.parsing.ArtworkCommandParser.get_cover_from_encode_commands')
     @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
     def test__from_args__encode_wav_to_mp3_command_with_discogs_id_specified__the_config_provider_should_supply_the_destination(self, encode_command_parser_mock, artwork_command_parser_mock, move_file_command_parser_mock):
         config_mock, cd_ripper_mock, encoder_mock, metadata_mock, tagger_mock, genre_selector_mock = (Mock(),)*6
@@ -585,12 +556,7 @@ class CommandParserTest(unittest.TestCase):
             EncodeWavCommand(config_mock, encoder_mock),
             EncodeWavCommand(config_mock, encoder_mock),
         ]
-        artwork_command_parser_mock.return_value = [
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock)
-        ]
+        artwork_command_parser_mock.return_value = '/some/path/to/wavs/cover.jpg'
         move_file_command_parser_mock.return_value = [
             MoveAudioFileCommand(config_mock),
             MoveAudioFileCommand(config_mock),
@@ -622,7 +588,7 @@ class CommandParserTest(unittest.TestCase):
         config_mock.get_releases_destination_with_mask_replaced.assert_called_once_with(release_model, 'mp3')
 
     @mock.patch('amu.parsing.MoveAudioFileCommandParser.parse_from_encode_commands')
-    @mock.patch('amu.parsing.ArtworkCommandParser.parse_from_encode_commands')
+    @mock.patch('amu.parsing.ArtworkCommandParser.get_cover_from_encode_commands')
     @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
     def test__from_args__encode_wav_to_mp3_command_with_discogs_id_specified_and_destination_is_overriden__the_destination_override_should_be_used(self, encode_command_parser_mock, artwork_command_parser_mock, move_file_command_parser_mock):
         config_mock, cd_ripper_mock, encoder_mock, metadata_mock, tagger_mock, genre_selector_mock = (Mock(),)*6
@@ -642,12 +608,7 @@ class CommandParserTest(unittest.TestCase):
             EncodeWavCommand(config_mock, encoder_mock),
             EncodeWavCommand(config_mock, encoder_mock),
         ]
-        artwork_command_parser_mock.return_value = [
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock)
-        ]
+        artwork_command_parser_mock.return_value = '/some/path/to/wavs/cover.jpg'
         move_file_command_parser_mock.return_value = [
             MoveAudioFileCommand(config_mock),
             MoveAudioFileCommand(config_mock),
@@ -679,7 +640,7 @@ class CommandParserTest(unittest.TestCase):
         self.assertEqual(4, len(commands))
 
     @mock.patch('amu.parsing.MoveAudioFileCommandParser.parse_from_encode_commands')
-    @mock.patch('amu.parsing.ArtworkCommandParser.parse_from_encode_commands')
+    @mock.patch('amu.parsing.ArtworkCommandParser.get_cover_from_encode_commands')
     @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
     def test__from_args__encode_wav_to_mp3_command_with_discogs_id_specified__4_move_audio_file_commands_are_generated(self, encode_command_parser_mock, artwork_command_parser_mock, move_file_command_parser_mock):
         config_mock, cd_ripper_mock, encoder_mock, metadata_mock, tagger_mock, genre_selector_mock = (Mock(),)*6
@@ -699,12 +660,7 @@ class CommandParserTest(unittest.TestCase):
             EncodeWavCommand(config_mock, encoder_mock),
             EncodeWavCommand(config_mock, encoder_mock),
         ]
-        artwork_command_parser_mock.return_value = [
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock)
-        ]
+        artwork_command_parser_mock.return_value = '/some/path/to/wavs/cover.jpg'
         move_file_command_parser_mock.return_value = [
             MoveAudioFileCommand(config_mock),
             MoveAudioFileCommand(config_mock),
@@ -736,7 +692,7 @@ class CommandParserTest(unittest.TestCase):
         self.assertEqual(4, len(commands))
 
     @mock.patch('amu.parsing.MoveAudioFileCommandParser.parse_from_encode_commands')
-    @mock.patch('amu.parsing.ArtworkCommandParser.parse_from_encode_commands')
+    @mock.patch('amu.parsing.ArtworkCommandParser.get_cover_from_encode_commands')
     @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
     def test__from_args__encode_wav_to_mp3_command_with_discogs_id_specified__the_add_artwork_command_parser_is_called_correctly(self, encode_command_parser_mock, artwork_command_parser_mock, move_file_command_parser_mock):
         config_mock, cd_ripper_mock, encoder_mock, metadata_mock, genre_selector_mock = (Mock(),)*5
@@ -790,6 +746,238 @@ class CommandParserTest(unittest.TestCase):
         self.assertIsInstance(command_args[2], EncodeWavCommand)
         self.assertIsInstance(command_args[3], EncodeWavCommand)
 
+    @mock.patch('amu.parsing.MoveAudioFileCommandParser.parse_from_encode_commands')
+    @mock.patch('amu.parsing.ArtworkCommandParser.get_cover_from_encode_commands')
+    @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
+    def test__from_args__encode_wav_to_mp3_command_with_discogs_id_specified__each_track_command_depends_on_the_previous_command_for_the_track(self, encode_command_parser_mock, artwork_command_parser_mock, move_file_command_parser_mock):
+        config_mock, cd_ripper_mock, encoder_mock, metadata_mock, tagger_mock, genre_selector_mock = (Mock(),)*6
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args([
+            'encode',
+            'wav',
+            'mp3',
+            '--source=/some/path/to/wavs',
+            '--discogs-id=451034'
+        ])
+        encode_commands = []
+        move_commands = []
+        for i in range(1, 3):
+            encode_command = EncodeWavCommand(config_mock, encoder_mock)
+            encode_command.source = '/some/path/to/wavs/0{0} - Track 0{0}.wav'.format(i)
+            encode_command.destination = '/some/path/to/mp3s/0{0} - Track 0{0}.mp3'.format(i)
+            encode_command.dependencies = []
+            encode_commands.append(encode_command)
+            move_command = MoveAudioFileCommand(config_mock)
+            move_command.source = encode_command.destination
+            move_command.destination = '/some/music/0{0} - Title.mp3'.format(i)
+            move_commands.append(move_command)
+        move_cover_command = MoveAudioFileCommand(config_mock)
+        move_cover_command.source = '/some/path/to/wavs/cover.jpg'
+        move_cover_command.destination = '/some/music/cover.jpg'
+        move_commands.append(move_cover_command)
+        encode_command_parser_mock.return_value = encode_commands
+        artwork_command_parser_mock.return_value = '/some/path/to/wavs/cover.jpg'
+        move_file_command_parser_mock.return_value = move_commands
+
+        release_model = ReleaseModel()
+        release_model.artist = 'AFX'
+        release_model.title = 'Analord 08'
+        release_model.label = 'Rephlex'
+        release_model.catno = 'ANALORD 08'
+        release_model.format = 'Vinyl'
+        release_model.format_quantity = 1
+        release_model.country = 'UK'
+        release_model.year = '2005'
+        release_model.genre = 'Electronic'
+        release_model.style = 'Breakbeat, House, Acid, Electro'
+        release_model.add_track_directly(None, 'PWSteal.Ldpinch.D', 1, 2, 1, 1)
+        release_model.add_track_directly(None, 'Backdoor.Berbew.Q', 2, 2, 1, 1)
+        metadata_mock.get_release_by_id.return_value = release_model
+        genre_selector_mock.select_genre.return_value = 'Electronic'
+
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        commands = parser.from_args(args)
+        tag_commands = [x for x in commands if type(x) == AddTagCommand]
+        self.assertEqual([encode_commands[0]], tag_commands[0].dependencies)
+        self.assertEqual([encode_commands[1]], tag_commands[1].dependencies)
+        self.assertEqual([tag_commands[0]], move_commands[0].dependencies)
+        self.assertEqual([tag_commands[1]], move_commands[1].dependencies)
+        self.assertIsNone(move_cover_command.dependencies)
+
+    @mock.patch('amu.parsing.MoveAudioFileCommandParser.parse_from_encode_commands')
+    @mock.patch('amu.parsing.ArtworkCommandParser.get_cover_from_encode_commands')
+    @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
+    def test__from_args__encode_wav_to_mp3_command_with_discogs_id_specified__the_cover_is_added_by_the_tag_commands(self, encode_command_parser_mock, artwork_command_parser_mock, move_file_command_parser_mock):
+        config_mock, cd_ripper_mock, encoder_mock, metadata_mock, genre_selector_mock = (Mock(),)*5
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args([
+            'encode',
+            'wav',
+            'mp3',
+            '--source=/some/path/to/wavs',
+            '--discogs-id=451034'
+        ])
+        encode_command_parser_mock.return_value = self._get_encode_wav_commands(config_mock, encoder_mock, 'mp3', '/some/path/to/mp3s', 2)
+        artwork_command_parser_mock.return_value = '/some/path/to/wavs/cover.jpg'
+        move_file_command_parser_mock.return_value = [MoveAudioFileCommand(config_mock), MoveAudioFileCommand(config_mock)]
+        release_model = ReleaseModel()
+        release_model.artist = 'AFX'
+        release_model.title = 'Analord 08'
+        release_model.genre = 'Electronic'
+        release_model.add_track_directly(None, 'PWSteal.Ldpinch.D', 1, 2, 1, 1)
+        release_model.add_track_directly(None, 'Backdoor.Berbew.Q', 2, 2, 1, 1)
+        metadata_mock.get_release_by_id.return_value = release_model
+        genre_selector_mock.select_genre.return_value = 'Electronic'
+
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        commands = parser.from_args(args)
+        tag_commands = [x for x in commands if type(x) == AddTagCommand]
+        self.assertEqual(['/some/path/to/wavs/cover.jpg'] * 2, [x.artwork for x in tag_commands])
+        self.assertEqual([], [x for x in commands if type(x) == AddArtworkCommand])
+
+    def _get_encode_wav_commands(self, config_mock, encoder_mock, format, destination, track_count):
+        commands = []
+        for i in range(1, track_count + 1):
+            command = EncodeWavCommand(config_mock, encoder_mock)
+            command.source = '/some/path/to/wavs/0{0} - Track 0{0}.wav'.format(i)
+            command.destination = '{0}/0{1} - Track 0{1}.{2}'.format(destination, i, format)
+            command.dependencies = []
+            commands.append(command)
+        return commands
+
+    @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
+    def test__from_args__encode_wav_to_mp3_and_flac__it_should_return_a_multi_format_encode_command_for_each_wav(self, encode_command_parser_mock):
+        config_mock, cd_ripper_mock, encoder_mock, metadata_mock, genre_selector_mock = (Mock(),)*5
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args([
+            'encode',
+            'wav',
+            'mp3,flac',
+            '--source=/some/path/to/wavs',
+            '--destination=/some/destination'
+        ])
+        encode_command_parser_mock.side_effect = [
+            self._get_encode_wav_commands(config_mock, encoder_mock, 'mp3', '/some/destination', 2),
+            self._get_encode_wav_commands(config_mock, encoder_mock, 'flac', '/some/destination', 2)
+        ]
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        commands = parser.from_args(args)
+        self.assertEqual(2, len(commands))
+        self.assertIsInstance(commands[0], MultiFormatEncodeWavCommand)
+        self.assertEqual('/some/path/to/wavs/01 - Track 01.wav', commands[0].source)
+        self.assertEqual(['/some/destination/01 - Track 01.mp3', '/some/destination/01 - Track 01.flac'], commands[0].destinations)
+        self.assertEqual('/some/path/to/wavs/02 - Track 02.wav', commands[1].source)
+        self.assertEqual(['/some/destination/02 - Track 02.mp3', '/some/destination/02 - Track 02.flac'], commands[1].destinations)
+
+    def test__from_args__encode_wav_to_an_unsupported_format__it_should_exit_with_an_error(self):
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        with captured_output():
+            with self.assertRaises(SystemExit):
+                arg_parser.parse_args(['encode', 'wav', 'mp3,ogg'])
+
+    def test__from_args__encode_wav_to_the_same_format_twice__it_should_exit_with_an_error(self):
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        with captured_output():
+            with self.assertRaises(SystemExit):
+                arg_parser.parse_args(['encode', 'wav', 'mp3,mp3'])
+
+    @mock.patch('amu.parsing.MoveAudioFileCommandParser.parse_from_encode_commands')
+    @mock.patch('amu.parsing.ArtworkCommandParser.get_cover_from_encode_commands')
+    @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
+    def test__from_args__encode_wav_to_mp3_and_flac_with_discogs_id__the_release_is_fetched_once_and_each_format_gets_its_own_destination(self, encode_command_parser_mock, artwork_command_parser_mock, move_file_command_parser_mock):
+        config_mock, cd_ripper_mock, encoder_mock, metadata_mock, genre_selector_mock = (Mock(),)*5
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args([
+            'encode',
+            'wav',
+            'mp3,flac',
+            '--source=/some/path/to/wavs',
+            '--discogs-id=451034'
+        ])
+        config_mock.get_releases_destination_with_mask_replaced.side_effect = lambda release_model, format: '/music/{0}'.format(format)
+        encode_command_parser_mock.side_effect = [
+            self._get_encode_wav_commands(config_mock, encoder_mock, 'mp3', '/music/mp3', 1),
+            self._get_encode_wav_commands(config_mock, encoder_mock, 'flac', '/music/flac', 1)
+        ]
+        artwork_command_parser_mock.return_value = ''
+        mp3_move_commands = [MoveAudioFileCommand(config_mock), MoveAudioFileCommand(config_mock)]
+        mp3_move_commands[0].source = '/music/mp3/01 - Track 01.mp3'
+        mp3_move_commands[1].source = '/some/path/to/wavs/cover.jpg'
+        flac_move_commands = [MoveAudioFileCommand(config_mock), MoveAudioFileCommand(config_mock)]
+        flac_move_commands[0].source = '/music/flac/01 - Track 01.flac'
+        flac_move_commands[1].source = '/some/path/to/wavs/cover.jpg'
+        move_file_command_parser_mock.side_effect = [mp3_move_commands, flac_move_commands]
+        release_model = ReleaseModel()
+        release_model.artist = 'AFX'
+        release_model.title = 'Analord 08'
+        release_model.label = 'Rephlex'
+        release_model.catno = 'ANALORD 08'
+        release_model.genre = 'Electronic'
+        release_model.add_track_directly(None, 'PWSteal.Ldpinch.D', 1, 1, 1, 1)
+        metadata_mock.get_release_by_id.return_value = release_model
+        genre_selector_mock.select_genre.return_value = 'Electronic'
+
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        commands = parser.from_args(args)
+        metadata_mock.get_release_by_id.assert_called_once_with(451034, False)
+        encode_command_parser_mock.assert_any_call('/some/path/to/wavs', '/music/mp3')
+        encode_command_parser_mock.assert_any_call('/some/path/to/wavs', '/music/flac')
+        tag_commands = [x for x in commands if type(x) == AddTagCommand]
+        self.assertEqual(['/music/mp3/01 - Track 01.mp3', '/music/flac/01 - Track 01.flac'], [x.source for x in tag_commands])
+        self.assertEqual([commands[0]], tag_commands[0].dependencies)
+        self.assertEqual([commands[0]], tag_commands[1].dependencies)
+        self.assertTrue(mp3_move_commands[1].copy)
+        self.assertFalse(flac_move_commands[1].copy)
+
+    @mock.patch('amu.parsing.MoveAudioFileCommandParser.parse_from_encode_commands')
+    @mock.patch('amu.parsing.ArtworkCommandParser.get_cover_from_encode_commands')
+    @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
+    def test__from_args__encode_wav_to_mp3_and_flac_with_a_cover__the_cover_is_moved_after_every_format_is_tagged(self, encode_command_parser_mock, artwork_command_parser_mock, move_file_command_parser_mock):
+        config_mock, cd_ripper_mock, encoder_mock, metadata_mock, genre_selector_mock = (Mock(),)*5
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args([
+            'encode',
+            'wav',
+            'mp3,flac',
+            '--source=/some/path/to/wavs',
+            '--discogs-id=451034'
+        ])
+        config_mock.get_releases_destination_with_mask_replaced.side_effect = lambda release_model, format: '/music/{0}'.format(format)
+        encode_command_parser_mock.side_effect = [
+            self._get_encode_wav_commands(config_mock, encoder_mock, 'mp3', '/music/mp3', 1),
+            self._get_encode_wav_commands(config_mock, encoder_mock, 'flac', '/music/flac', 1)
+        ]
+        artwork_command_parser_mock.return_value = '/some/path/to/wavs/cover.jpg'
+        mp3_move_commands = [MoveAudioFileCommand(config_mock), MoveAudioFileCommand(config_mock)]
+        mp3_move_commands[0].source = '/music/mp3/01 - Track 01.mp3'
+        mp3_move_commands[1].source = '/some/path/to/wavs/cover.jpg'
+        flac_move_commands = [MoveAudioFileCommand(config_mock), MoveAudioFileCommand(config_mock)]
+        flac_move_commands[0].source = '/music/flac/01 - Track 01.flac'
+        flac_move_commands[1].source = '/some/path/to/wavs/cover.jpg'
+        move_file_command_parser_mock.side_effect = [mp3_move_commands, flac_move_commands]
+        release_model = ReleaseModel()
+        release_model.artist = 'AFX'
+        release_model.title = 'Analord 08'
+        release_model.genre = 'Electronic'
+        release_model.add_track_directly(None, 'PWSteal.Ldpinch.D', 1, 1, 1, 1)
+        metadata_mock.get_release_by_id.return_value = release_model
+        genre_selector_mock.select_genre.return_value = 'Electronic'
+
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        commands = parser.from_args(args)
+        tag_commands = [x for x in commands if type(x) == AddTagCommand]
+        self.assertEqual(['/some/path/to/wavs/cover.jpg'] * 2, [x.artwork for x in tag_commands])
+        self.assertEqual([mp3_move_commands[1], flac_move_commands[1]], commands[-2:])
+        self.assertIsNone(mp3_move_commands[1].dependencies)
+        self.assertIsNone(flac_move_commands[1].dependencies)
+
     @mock.patch('tempfile.gettempdir')
     @mock.patch('amu.parsing.EncodeCommandParser.parse_cd_rip')
     def test__from_args__when_encode_cd_to_mp3_command_is_specified__it_should_use_the_encoder_command_parser(self, encode_command_parser_mock, gettempdir_mock):
@@ -1820,6 +2008,36 @@ class CommandParserTest(unittest.TestCase):
         parser.from_args(args)
         tag_command_parser_mock.assert_called_once_with('/some/current/working/directory')
 
+    @mock.patch('amu.parsing.TagCommandParser.iter_remove_tag_commands')
+    def test__stream_from_args__when_remove_mp3_tag_is_specified__the_remove_tag_commands_should_be_streamed(self, iter_remove_tag_commands_mock):
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args(['tag', 'remove', 'mp3', '--source=/some/library'])
+        config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock = (Mock(),)*4
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        self.assertEqual(iter_remove_tag_commands_mock.return_value, parser.stream_from_args(args))
+        iter_remove_tag_commands_mock.assert_called_once_with('/some/library')
+
+    @mock.patch('amu.parsing.ArtworkCommandParser.iter_add_artwork_commands')
+    def test__stream_from_args__when_an_add_artwork_command_is_specified__the_add_artwork_commands_should_be_streamed(self, iter_add_artwork_commands_mock):
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args([
+            'artwork', 'add', 'mp3', '--source=/some/source/cover.jpg', '--destination=/some/destination'
+        ])
+        config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock = (Mock(),)*4
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        self.assertEqual(iter_add_artwork_commands_mock.return_value, parser.stream_from_args(args))
+        iter_add_artwork_commands_mock.assert_called_once_with('/some/source/cover.jpg', '/some/destination', 'mp3')
+
+    def test__stream_from_args__when_a_command_with_dependencies_is_specified__none_should_be_returned(self):
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args(['rip'])
+        config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock = (Mock(),)*4
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        self.assertIsNone(parser.stream_from_args(args))
+
     def test__from_args__when_a_fetch_release_command_is_specified__it_should_return_a_fetch_release_command(self):
         driver = CliDriver()
         arg_parser = driver.get_argument_parser()
@@ -1838,6 +2056,113 @@ class CommandParserTest(unittest.TestCase):
         commands = parser.from_args(args)
         self.assertEqual(commands[0].discogs_id, 123456)
 
+    def test__from_args__when_a_fetch_release_command_has_several_ids__it_should_return_an_independent_command_for_each_id(self):
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args(['fetch', '123456', '654321', '--json'])
+        config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock = (Mock(),)*4
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        commands = parser.from_args(args)
+        self.assertEqual([123456, 654321], [x.discogs_id for x in commands])
+        self.assertEqual([[], []], [x.dependencies for x in commands])
+        self.assertTrue(all(x.output_json for x in commands))
+
+    @mock.patch('__builtin__.open')
+    def test__from_args__when_a_fetch_release_command_has_a_file_of_ids__it_should_return_a_command_for_each_id_in_the_file(self, open_mock):
+        open_mock.return_value.__enter__.return_value.readlines.return_value = ['# This week\n', '123456\n', '\n', '654321\n']
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args(['fetch', '111111', '--from-file', '/some/path/ids.txt'])
+        config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock = (Mock(),)*4
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        commands = parser.from_args(args)
+        open_mock.assert_called_once_with('/some/path/ids.txt', 'r')
+        self.assertEqual([111111, 123456, 654321], [x.discogs_id for x in commands])
+
+    @mock.patch('amu.parsing.sys.stdin')
+    def test__from_args__when_a_fetch_release_command_reads_ids_from_stdin__it_should_return_a_command_for_each_id(self, stdin_mock):
+        stdin_mock.readlines.return_value = ['123456\n', '654321\n']
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args(['fetch', '--from-file', '-'])
+        config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock = (Mock(),)*4
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        commands = parser.from_args(args)
+        self.assertEqual([123456, 654321], [x.discogs_id for x in commands])
+
+    def test__from_args__when_a_fetch_release_command_has_no_ids__it_should_raise_a_command_parsing_error(self):
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args(['fetch'])
+        config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock = (Mock(),)*4
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        with self.assertRaisesRegexp(CommandParsingError, 'At least one discogs ID must be specified for the fetch command.'):
+            parser.from_args(args)
+
+    def test__from_args__when_a_fetch_release_command_has_an_invalid_id__it_should_raise_a_command_parsing_error(self):
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args(['fetch', 'invalid'])
+        config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock = (Mock(),)*4
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        with self.assertRaisesRegexp(CommandParsingError, 'The discogs ID invalid is not a valid integer.'):
+            parser.from_args(args)
+
+    def test__from_args__when_an_import_dump_command_is_specified__it_should_return_an_import_dump_command_with_the_source(self):
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args(['discogs', 'import-dump', '/some/path/discogs_releases.xml.gz'])
+        config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock = (Mock(),)*4
+        config_mock.get_discogs_dump_path.return_value = '/home/user/.amu_discogs_dump'
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        commands = parser.from_args(args)
+        self.assertIsInstance(commands[0], ImportDiscogsDumpCommand)
+        self.assertEqual('/some/path/discogs_releases.xml.gz', commands[0].source)
+
+    def test__from_args__when_an_index_build_command_is_specified__it_should_return_a_build_library_index_command_with_the_release_directories(self):
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args(['index', 'build', '--workers', '2'])
+        config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock = (Mock(),)*4
+        config_mock.get_library_index_path.return_value = '/home/user/.amu_library_index'
+        config_mock.get_releases_base_directory.side_effect = ['/music/mp3', '/music/flac']
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        commands = parser.from_args(args)
+        self.assertIsInstance(commands[0], BuildLibraryIndexCommand)
+        self.assertEqual(['/music/mp3', '/music/flac'], commands[0].roots)
+        self.assertFalse(commands[0].full)
+        self.assertEqual(2, commands[0].workers)
+
+    def test__from_args__when_the_formats_share_a_release_directory__it_should_only_be_indexed_once(self):
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args(['index', 'build', '--full'])
+        config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock = (Mock(),)*4
+        config_mock.get_library_index_path.return_value = '/home/user/.amu_library_index'
+        config_mock.get_releases_base_directory.return_value = '/music'
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        commands = parser.from_args(args)
+        self.assertEqual(['/music'], commands[0].roots)
+        self.assertTrue(commands[0].full)
+
+    def test__from_args__when_a_query_command_is_specified__it_should_return_a_query_library_command_with_the_filters(self):
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args([
+            'query', '--label', 'Warp Records', '--format', 'mp3', '--without-format', 'flac', '--max-duration', '600', '--releases'])
+        config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock = (Mock(),)*4
+        config_mock.get_library_index_path.return_value = '/home/user/.amu_library_index'
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        commands = parser.from_args(args)
+        self.assertIsInstance(commands[0], QueryLibraryCommand)
+        self.assertEqual('Warp Records', commands[0].label)
+        self.assertEqual('mp3', commands[0].format)
+        self.assertEqual('flac', commands[0].without_format)
+        self.assertEqual(600.0, commands[0].max_duration)
+        self.assertIsNone(commands[0].artist)
+        self.assertTrue(commands[0].releases)
+        self.assertFalse(commands[0].output_json)
+
     def test__from_args__when_an_add_artwork_command_is_specified__it_should_return_an_add_artwork_command(self):
         driver = CliDriver()
         arg_parser = driver.get_argument_parser()
@@ -1994,7 +2319,7 @@ class CommandParserTest(unittest.TestCase):
         self.assertEqual(args_to_mix_parser.comment, 'blah')
 
     @mock.patch('amu.parsing.MoveAudioFileCommandParser.parse_from_encode_commands')
-    @mock.patch('amu.parsing.ArtworkCommandParser.parse_from_encode_commands')
+    @mock.patch('amu.parsing.ArtworkCommandParser.get_cover_from_encode_commands')
     @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
     def test__from_args__encode_wav_to_mp3_command_with_discogs_id_specified_and_collapse_index_tracks__the_release_should_only_be_fetched_once(self, encode_command_parser_mock, artwork_command_parser_mock, move_file_command_parser_mock):
         config_mock, cd_ripper_mock, encoder_mock, metadata_mock, tagger_mock, genre_selector_mock = (Mock(),)*6
@@ -2014,12 +2339,7 @@ class CommandParserTest(unittest.TestCase):
             EncodeWavCommand(config_mock, encoder_mock),
             EncodeWavCommand(config_mock, encoder_mock),
         ]
-        artwork_command_parser_mock.return_value = [
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock),
-            AddArtworkCommand(config_mock, tagger_mock)
-        ]
+        artwork_command_parser_mock.return_value = '/some/path/to/wavs/cover.jpg'
         move_file_command_parser_mock.return_value = [
             MoveAudioFileCommand(config_mock),
             MoveAudioFileCommand(config_mock),
@@ -2122,3 +2442,44 @@ class CommandParserTest(unittest.TestCase):
             config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock = (Mock(),)*4
             parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
             parser.get_tagger_based_on_format('ogg')
+
+    def test__from_args__incremental_encode_of_a_cd__raises_command_parsing_error(self):
+        config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock = (Mock(),)*4
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args(['encode', 'cd', 'flac', '--incremental'])
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        with self.assertRaisesRegexp(CommandParsingError, 'An incremental encode can only be used for encoding wavs to a single format.'):
+            parser.from_args(args)
+
+    def test__from_args__incremental_encode_with_a_discogs_id__raises_command_parsing_error(self):
+        config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock = (Mock(),)*4
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args(['encode', 'wav', 'flac', '--incremental', '--discogs-id=451034'])
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        with self.assertRaisesRegexp(CommandParsingError, 'An incremental encode cannot be used with a discogs ID.'):
+            parser.from_args(args)
+        self.assertFalse(metadata_mock.get_release_by_id.called)
+
+    @mock.patch('amu.parsing.EncodeCommandParser.parse_wav')
+    def test__from_args__incremental_encode_of_wavs_with_an_up_to_date_track__the_up_to_date_encode_is_left_out(self, encode_command_parser_mock):
+        config_mock, cd_ripper_mock, encoder_mock, metadata_mock, genre_selector_mock = (Mock(),)*5
+        driver = CliDriver()
+        arg_parser = driver.get_argument_parser()
+        args = arg_parser.parse_args([
+            'encode',
+            'wav',
+            'flac',
+            '--source=/some/path/to/wavs',
+            '--destination=/some/destination',
+            '--incremental'
+        ])
+        up_to_date_command, out_of_date_command = (Mock(), Mock())
+        up_to_date_command.is_up_to_date.return_value = True
+        out_of_date_command.is_up_to_date.return_value = False
+        encode_command_parser_mock.return_value = [up_to_date_command, out_of_date_command]
+        parser = CommandParser(config_mock, cd_ripper_mock, metadata_mock, genre_selector_mock)
+        with captured_output():
+            commands = parser.from_args(args)
+        self.assertEqual([out_of_date_command], commands)
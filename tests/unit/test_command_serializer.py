@@ -0,0 +1,106 @@
+import json
+import unittest
+from mock import Mock
+from amu.audio import FlacEncoder, FlacTagger, LameEncoder, Mp3Tagger
+from amu.commands import AddArtworkCommand, AddTagCommand, Command, EncodeWavCommand, MoveAudioFileCommand, MultiFormatEncodeWavCommand, RipCdCommand
+from amu.manifest import EncodeManifest
+from amu.serialization import CommandSerializer, SerializationError
+
+
+class CommandSerializerTest(unittest.TestCase):
+    def _round_trip(self, commands, cd_ripper=None, metadata_service=None):
+        serializer = CommandSerializer(Mock(), cd_ripper or Mock(), metadata_service or Mock())
+        return serializer.deserialize(serializer.serialize(commands))
+
+    def test__deserialize__encode_wav_command__the_properties_are_restored(self):
+        command = EncodeWavCommand(Mock(), Mock())
+        command.source = '/some/path/01 - Track 1.wav'
+        command.destination = '/some/destination/01 - Track 1.flac'
+        command.keep_source = True
+        result = self._round_trip([command])[0]
+        self.assertIsInstance(result, EncodeWavCommand)
+        self.assertEqual('/some/path/01 - Track 1.wav', result.source)
+        self.assertEqual('/some/destination/01 - Track 1.flac', result.destination)
+        self.assertTrue(result.keep_source)
+        self.assertIsNone(result.manifest)
+
+    def test__deserialize__paths_are_not_valid_utf8__the_same_bytes_are_restored_from_json(self):
+        command = MultiFormatEncodeWavCommand(Mock(), Mock())
+        command.source = '/some/path/01 - Caf\xe9.wav'
+        command.destinations = ['/some/mp3/01 - Caf\xe9.mp3', '/some/flac/01 - Caf\xc3\xa9.flac']
+        serializer = CommandSerializer(Mock(), Mock(), Mock())
+        result = serializer.deserialize(json.loads(json.dumps(serializer.serialize([command]))))[0]
+        self.assertEqual('/some/path/01 - Caf\xe9.wav', result.source)
+        self.assertEqual(['/some/mp3/01 - Caf\xe9.mp3', '/some/flac/01 - Caf\xc3\xa9.flac'], result.destinations)
+        self.assertIsInstance(result.source, str)
+
+    def test__deserialize__encode_wav_command_to_flac__a_flac_encoder_is_used(self):
+        command = EncodeWavCommand(Mock(), Mock())
+        command.source = '/some/path/01 - Track 1.wav'
+        command.destination = '/some/destination/01 - Track 1.flac'
+        result = self._round_trip([command])[0]
+        self.assertIsInstance(result._encoder, FlacEncoder)
+
+    def test__deserialize__encode_wav_command_to_mp3__a_lame_encoder_is_used(self):
+        command = EncodeWavCommand(Mock(), Mock())
+        command.source = '/some/path/01 - Track 1.wav'
+        command.destination = '/some/destination/01 - Track 1.mp3'
+        result = self._round_trip([command])[0]
+        self.assertIsInstance(result._encoder, LameEncoder)
+
+    def test__deserialize__incremental_encode_wav_command__the_manifest_is_restored(self):
+        command = EncodeWavCommand(Mock(), Mock())
+        command.source = '/some/path/01 - Track 1.wav'
+        command.destination = '/some/destination/01 - Track 1.flac'
+        command.manifest = EncodeManifest('/some/destination')
+        result = self._round_trip([command])[0]
+        self.assertEqual('/some/destination/.amu_manifest', result.manifest.path)
+
+    def test__deserialize__add_tag_command__the_tag_values_and_tagger_are_restored(self):
+        command = AddTagCommand(Mock(), Mock())
+        command.source = '/some/destination/01 - Track 1.mp3'
+        command.artist = u'Aphex Twin'
+        command.title = u'Jynweythek'
+        command.track_number = 1
+        command.track_total = 30
+        result = self._round_trip([command])[0]
+        self.assertEqual(u'Aphex Twin', result.artist)
+        self.assertEqual(u'Jynweythek', result.title)
+        self.assertEqual(1, result.track_number)
+        self.assertEqual(30, result.track_total)
+        self.assertIsInstance(result._tagger, Mp3Tagger)
+
+    def test__deserialize__add_artwork_command_for_a_flac__a_flac_tagger_is_used(self):
+        command = AddArtworkCommand(Mock(), Mock())
+        command.source = '/some/path/cover.jpg'
+        command.destination = '/some/destination/01 - Track 1.flac'
+        result = self._round_trip([command])[0]
+        self.assertIsInstance(result._tagger, FlacTagger)
+
+    def test__deserialize__rip_cd_command__the_cd_ripper_is_used(self):
+        cd_ripper_mock = Mock()
+        command = RipCdCommand(Mock(), Mock())
+        command.destination = '/tmp/rip'
+        result = self._round_trip([command], cd_ripper=cd_ripper_mock)[0]
+        self.assertIs(cd_ripper_mock, result._cd_ripper)
+
+    def test__deserialize__commands_with_dependencies__the_dependencies_are_restored(self):
+        encode = EncodeWavCommand(Mock(), Mock())
+        encode.source = '/some/path/01 - Track 1.wav'
+        encode.destination = '/some/destination/01 - Track 1.mp3'
+        encode.dependencies = []
+        tag = AddTagCommand(Mock(), Mock())
+        tag.source = '/some/destination/01 - Track 1.mp3'
+        tag.dependencies = [encode]
+        move = MoveAudioFileCommand(Mock())
+        move.source = '/some/path/cover.jpg'
+        move.destination = '/some/release/cover.jpg'
+        result = self._round_trip([encode, tag, move])
+        self.assertEqual([], result[0].dependencies)
+        self.assertEqual([result[0]], result[1].dependencies)
+        self.assertIsNone(result[2].dependencies)
+
+    def test__serialize__command_type_is_unknown__raises_serialization_error(self):
+        serializer = CommandSerializer(Mock(), Mock(), Mock())
+        with self.assertRaisesRegexp(SerializationError, 'The Command command cannot be serialized.'):
+            serializer.serialize([Command(Mock())])
@@ -1,4 +1,5 @@
 import mock
+import os
 import unittest
 import uuid
 from mock import MagicMock
@@ -1040,6 +1041,7 @@ class ConfigurationProviderTest(unittest.TestCase):
     @mock.patch('amu.config.os.path.expanduser')
     @mock.patch('amu.config.ConfigParser.ConfigParser.get')
     def test__use_genre__config_file_has_use_genre_setting__the_correct_config_value_is_read(self, config_get_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.return_value = '/home/user/'
         config_get_mock.return_value = 'True'
         directory_selector_mock = Mock()
         config_provider = ConfigurationProvider(MaskReplacer(), directory_selector_mock)
@@ -1133,3 +1135,254 @@ class ConfigurationProviderTest(unittest.TestCase):
             directory_selector_mock = Mock()
             config_provider = ConfigurationProvider(MaskReplacer(), directory_selector_mock)
             config_provider.use_genre()
+
+    @mock.patch('amu.config.os.path.getmtime')
+    @mock.patch('amu.config.subprocess.call')
+    def test__get_lame_path__called_twice_and_config_file_is_unchanged__which_is_only_run_once(self, subprocess_mock, getmtime_mock):
+        subprocess_mock.return_value = 0
+        getmtime_mock.return_value = 1000.0
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        config_provider.get_lame_path()
+        result = config_provider.get_lame_path()
+        self.assertEqual('lame', result)
+        self.assertEqual(1, subprocess_mock.call_count)
+
+    @mock.patch('amu.config.os.path.getmtime')
+    @mock.patch('amu.config.subprocess.call')
+    def test__get_lame_path__called_twice_and_config_file_does_not_exist__which_is_only_run_once(self, subprocess_mock, getmtime_mock):
+        subprocess_mock.return_value = 0
+        getmtime_mock.side_effect = OSError()
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        config_provider.get_lame_path()
+        config_provider.get_lame_path()
+        self.assertEqual(1, subprocess_mock.call_count)
+
+    @mock.patch('amu.config.os.path.getmtime')
+    @mock.patch('amu.config.subprocess.call')
+    def test__get_lame_path__config_file_is_modified_between_calls__the_path_is_resolved_again(self, subprocess_mock, getmtime_mock):
+        subprocess_mock.return_value = 0
+        getmtime_mock.side_effect = [1000.0, 2000.0]
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        config_provider.get_lame_path()
+        config_provider.get_lame_path()
+        self.assertEqual(2, subprocess_mock.call_count)
+
+    @mock.patch('amu.config.os.path.getmtime')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.get')
+    def test__get_lame_encoding_setting__called_with_other_getters_and_config_file_is_unchanged__config_file_is_only_read_once(self, config_get_mock, path_exists_mock, config_read_mock, getmtime_mock):
+        path_exists_mock.return_value = True
+        getmtime_mock.return_value = 1000.0
+        config_get_mock.return_value = '-V0'
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        config_provider.get_lame_encoding_setting()
+        config_provider.get_flac_encoding_setting()
+        config_provider.get_lame_encoding_setting()
+        config_read_mock.assert_called_once_with(os.path.join(os.path.expanduser('~'), '.amu_config'))
+
+    @mock.patch('amu.config.os.path.getmtime')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.get')
+    def test__get_lame_encoding_setting__config_file_is_modified_between_calls__config_file_is_read_again(self, config_get_mock, path_exists_mock, config_read_mock, getmtime_mock):
+        path_exists_mock.return_value = True
+        getmtime_mock.side_effect = [1000.0, 2000.0]
+        config_get_mock.return_value = '-V0'
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        config_provider.get_lame_encoding_setting()
+        config_provider.get_lame_encoding_setting()
+        self.assertEqual(2, config_read_mock.call_count)
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.os.path.expanduser')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.has_option')
+    def test__get_discogs_cache_ttl__config_file_has_no_ttl_setting__thirty_days_should_be_returned(self, has_option_mock, config_read_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.return_value = '/home/user/'
+        path_exists_mock.return_value = True
+        has_option_mock.return_value = False
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        self.assertEqual(30 * 24 * 60 * 60, config_provider.get_discogs_cache_ttl())
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.os.path.expanduser')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.has_option')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.get')
+    def test__get_discogs_cache_ttl__config_file_has_ttl_setting__ttl_should_be_returned_in_seconds(self, config_get_mock, has_option_mock, config_read_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.return_value = '/home/user/'
+        path_exists_mock.return_value = True
+        has_option_mock.return_value = True
+        config_get_mock.return_value = '2'
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        self.assertEqual(2 * 24 * 60 * 60, config_provider.get_discogs_cache_ttl())
+        config_get_mock.assert_called_with('discogs', 'cache_ttl_days')
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.os.path.expanduser')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.has_option')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.get')
+    def test__get_discogs_cache_ttl__config_file_has_invalid_ttl_setting__throws_configuration_error(self, config_get_mock, has_option_mock, config_read_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.return_value = '/home/user/'
+        path_exists_mock.return_value = True
+        has_option_mock.return_value = True
+        config_get_mock.return_value = 'a month'
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        with self.assertRaisesRegexp(ConfigurationError, 'A number of days must be used for the cache_ttl_days setting.'):
+            config_provider.get_discogs_cache_ttl()
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.os.path.expanduser')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.has_option')
+    def test__get_tag_padding__config_file_has_no_padding_setting__64_kilobytes_should_be_returned(self, has_option_mock, config_read_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.return_value = '/home/user/'
+        path_exists_mock.return_value = True
+        has_option_mock.return_value = False
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        self.assertEqual(64 * 1024, config_provider.get_tag_padding())
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.os.path.expanduser')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.has_option')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.get')
+    def test__get_tag_padding__config_file_has_padding_setting__padding_should_be_returned_in_bytes(self, config_get_mock, has_option_mock, config_read_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.return_value = '/home/user/'
+        path_exists_mock.return_value = True
+        has_option_mock.return_value = True
+        config_get_mock.return_value = '512'
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        self.assertEqual(512 * 1024, config_provider.get_tag_padding())
+        config_get_mock.assert_called_with('tagging', 'padding_kb')
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.os.path.expanduser')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.has_option')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.get')
+    def test__get_tag_padding__config_file_has_negative_padding_setting__throws_configuration_error(self, config_get_mock, has_option_mock, config_read_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.return_value = '/home/user/'
+        path_exists_mock.return_value = True
+        has_option_mock.return_value = True
+        config_get_mock.return_value = '-1'
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        with self.assertRaisesRegexp(ConfigurationError, 'A whole number of kilobytes must be used for the padding_kb setting.'):
+            config_provider.get_tag_padding()
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.os.path.expanduser')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.has_option')
+    def test__get_artwork_max_size__config_file_has_no_max_size_setting__0_should_be_returned(self, has_option_mock, config_read_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.return_value = '/home/user/'
+        path_exists_mock.return_value = True
+        has_option_mock.return_value = False
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        self.assertEqual(0, config_provider.get_artwork_max_size())
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.os.path.expanduser')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.has_option')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.get')
+    def test__get_artwork_max_size__config_file_has_invalid_max_size_setting__throws_configuration_error(self, config_get_mock, has_option_mock, config_read_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.return_value = '/home/user/'
+        path_exists_mock.return_value = True
+        has_option_mock.return_value = True
+        config_get_mock.return_value = 'large'
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        with self.assertRaisesRegexp(ConfigurationError, 'A whole number of pixels must be used for the artwork_max_size setting.'):
+            config_provider.get_artwork_max_size()
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.os.path.expanduser')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.has_option')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.get')
+    def test__get_artwork_quality__config_file_has_quality_setting__quality_should_be_returned(self, config_get_mock, has_option_mock, config_read_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.return_value = '/home/user/'
+        path_exists_mock.return_value = True
+        has_option_mock.return_value = True
+        config_get_mock.return_value = '90'
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        self.assertEqual(90, config_provider.get_artwork_quality())
+        config_get_mock.assert_called_with('tagging', 'artwork_quality')
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.os.path.expanduser')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.has_option')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.get')
+    def test__get_artwork_quality__config_file_has_quality_over_95__throws_configuration_error(self, config_get_mock, has_option_mock, config_read_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.return_value = '/home/user/'
+        path_exists_mock.return_value = True
+        has_option_mock.return_value = True
+        config_get_mock.return_value = '100'
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        with self.assertRaisesRegexp(ConfigurationError, 'A number from 1 to 95 must be used for the artwork_quality setting.'):
+            config_provider.get_artwork_quality()
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.os.path.expanduser')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.has_option')
+    def test__use_discogs_offline_mode__config_file_has_no_offline_setting__false_should_be_returned(self, has_option_mock, config_read_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.return_value = '/home/user/'
+        path_exists_mock.return_value = True
+        has_option_mock.return_value = False
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        self.assertFalse(config_provider.use_discogs_offline_mode())
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.os.path.expanduser')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.has_option')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.get')
+    def test__use_discogs_offline_mode__config_file_has_yes_offline_setting__true_should_be_returned(self, config_get_mock, has_option_mock, config_read_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.return_value = '/home/user/'
+        path_exists_mock.return_value = True
+        has_option_mock.return_value = True
+        config_get_mock.return_value = 'Yes'
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        self.assertTrue(config_provider.use_discogs_offline_mode())
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.os.path.expanduser')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.has_option')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.get')
+    def test__get_discogs_requests_per_minute__config_file_has_zero_requests_per_minute__throws_configuration_error(self, config_get_mock, has_option_mock, config_read_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.return_value = '/home/user/'
+        path_exists_mock.return_value = True
+        has_option_mock.return_value = True
+        config_get_mock.return_value = '0'
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        with self.assertRaisesRegexp(ConfigurationError, 'A positive whole number must be used for the requests_per_minute setting.'):
+            config_provider.get_discogs_requests_per_minute()
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.os.path.expanduser')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.has_option')
+    def test__get_library_index_path__config_file_has_no_index_path_setting__the_default_path_should_be_returned(self, has_option_mock, config_read_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.side_effect = lambda path: path.replace('~', '/home/user')
+        path_exists_mock.return_value = True
+        has_option_mock.return_value = False
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        self.assertEqual('/home/user/.amu_library_index', config_provider.get_library_index_path())
+
+    @mock.patch('amu.config.os.path.exists')
+    @mock.patch('amu.config.os.path.expanduser')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.read')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.has_option')
+    @mock.patch('amu.config.ConfigParser.ConfigParser.get')
+    def test__get_releases_base_directory__the_format_is_flac__the_flac_base_directory_should_be_returned(self, config_get_mock, has_option_mock, config_read_mock, expanduser_mock, path_exists_mock):
+        expanduser_mock.side_effect = lambda path: path.replace('~', '/home/user')
+        path_exists_mock.return_value = True
+        config_get_mock.return_value = '~/music/flac'
+        config_provider = ConfigurationProvider(MaskReplacer(), Mock())
+        self.assertEqual('/home/user/music/flac', config_provider.get_releases_base_directory('flac'))
+        config_get_mock.assert_called_with('directories', 'flac_releases_base_directory')
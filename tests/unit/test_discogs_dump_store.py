@@ -0,0 +1,121 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from amu.dump import DiscogsDumpStore
+from amu.dump import DumpError
+from amu.dump import DumpFetcher
+from amu.dump import iter_dump_releases
+
+DUMP = """<releases>
+<release id="792244" status="Accepted">
+    <artists><artist><id>1</id><name>Can</name><anv></anv><join></join><role></role><tracks></tracks></artist></artists>
+    <title>Monster Movie</title>
+    <labels><label name="Spoon Records" catno="SPOON 004" id="2"/></labels>
+    <formats><format name="Vinyl" qty="1" text=""><descriptions><description>LP</description><description>Reissue</description></descriptions></format></formats>
+    <genres><genre>Rock</genre></genres>
+    <styles><style>Krautrock</style></styles>
+    <country>Germany</country>
+    <released>1979-00-00</released>
+    <master_id is_main_release="false">5427</master_id>
+    <tracklist>
+        <track><position>A1</position><title>Father Cannot Yell</title><duration>7:03</duration></track>
+        <track><position></position><title>Side Two</title><duration></duration></track>
+        <track><position></position><title>Yoo Doo Right</title><duration></duration>
+            <sub_tracks><track><position>B1a</position><title>Part 1</title></track><track><position>B1b</position><title>Part 2</title></track></sub_tracks>
+        </track>
+    </tracklist>
+</release>
+<release id="1234" status="Accepted">
+    <artists><artist><id>1</id><name>Can</name><anv></anv><join></join><role></role><tracks></tracks></artist></artists>
+    <title>Monster Movie</title>
+    <labels><label name="Liberty" catno="LBS 83 279 I" id="3"/></labels>
+    <genres><genre>Rock</genre></genres>
+    <country>Germany</country>
+    <released>1969</released>
+    <master_id is_main_release="true">5427</master_id>
+    <tracklist><track><position>A1</position><title>Father Cannot Yell</title><duration>7:03</duration></track></tracklist>
+</release>
+</releases>
+"""
+
+class DiscogsDumpStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dump_path = os.path.join(self.directory, 'discogs_releases.xml')
+        with open(self.dump_path, 'w') as dump_file:
+            dump_file.write(DUMP)
+        self.store = DiscogsDumpStore(os.path.join(self.directory, 'dump.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test__iter_dump_releases__dump_has_two_releases__both_releases_are_returned(self):
+        releases = list(iter_dump_releases(self.dump_path))
+        self.assertEqual([792244, 1234], [x['id'] for x in releases])
+
+    def test__iter_dump_releases__dump_is_gzipped__releases_are_returned(self):
+        gzip_path = self.dump_path + '.gz'
+        gzip_file = gzip.open(gzip_path, 'wb')
+        gzip_file.write(DUMP)
+        gzip_file.close()
+        releases = list(iter_dump_releases(gzip_path))
+        self.assertEqual(2, len(releases))
+
+    def test__iter_dump_releases__dump_is_not_valid_xml__throws_dump_error(self):
+        with open(self.dump_path, 'w') as dump_file:
+            dump_file.write('<releases><release id="1">')
+        with self.assertRaisesRegexp(DumpError, 'could not be read'):
+            list(iter_dump_releases(self.dump_path))
+
+    def test__iter_dump_releases__release_has_details__release_is_in_the_form_of_the_api(self):
+        release = list(iter_dump_releases(self.dump_path))[0]
+        self.assertEqual('Monster Movie', release['title'])
+        self.assertEqual(1979, release['year'])
+        self.assertEqual('Can', release['artists'][0]['name'])
+        self.assertEqual('SPOON 004', release['labels'][0]['catno'])
+        self.assertEqual(['LP', 'Reissue'], release['formats'][0]['descriptions'])
+        self.assertEqual('1', release['formats'][0]['qty'])
+        self.assertEqual(['Krautrock'], release['styles'])
+        self.assertEqual(5427, release['master_id'])
+
+    def test__iter_dump_releases__release_has_headings_and_index_tracks__track_types_are_set(self):
+        release = list(iter_dump_releases(self.dump_path))[0]
+        self.assertEqual(['track', 'heading', 'index'], [x['type_'] for x in release['tracklist']])
+        self.assertEqual(['Part 1', 'Part 2'], [x['title'] for x in release['tracklist'][2]['sub_tracks']])
+
+    def test__import_dump__dump_has_two_releases__the_count_is_returned(self):
+        self.assertEqual(2, self.store.import_dump(self.dump_path))
+
+    def test__get_release__release_has_been_imported__release_is_returned(self):
+        self.store.import_dump(self.dump_path)
+        self.assertEqual('Liberty', self.store.get_release(1234)['labels'][0]['name'])
+
+    def test__get_release__release_has_not_been_imported__returns_none(self):
+        self.store.import_dump(self.dump_path)
+        self.assertIsNone(self.store.get_release(1))
+
+    def test__get_main_release_id__master_has_a_main_release__main_release_id_is_returned(self):
+        self.store.import_dump(self.dump_path)
+        self.assertEqual(1234, self.store.get_main_release_id(5427))
+
+    def test__fetch__release_has_been_imported__release_is_returned(self):
+        self.store.import_dump(self.dump_path)
+        fetcher = DumpFetcher(self.store)
+        content, status_code = fetcher.fetch(None, 'GET', 'https://api.discogs.com/releases/792244')
+        self.assertEqual(200, status_code)
+        self.assertEqual(792244, json.loads(content)['id'])
+
+    def test__fetch__master_has_been_imported__master_with_main_release_is_returned(self):
+        self.store.import_dump(self.dump_path)
+        fetcher = DumpFetcher(self.store)
+        content, status_code = fetcher.fetch(None, 'GET', 'https://api.discogs.com/masters/5427')
+        self.assertEqual(200, status_code)
+        self.assertEqual({'id': 5427, 'main_release': 1234}, json.loads(content))
+
+    def test__fetch__release_has_not_been_imported__404_is_returned(self):
+        self.store.import_dump(self.dump_path)
+        fetcher = DumpFetcher(self.store)
+        self.assertEqual(404, fetcher.fetch(None, 'GET', 'https://api.discogs.com/releases/invalid_id')[1])
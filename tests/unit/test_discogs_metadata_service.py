@@ -0,0 +1,92 @@
+import mock
+import unittest
+from mock import Mock
+from amu.metadata import DiscogsMetadataService
+from amu.models import ReleaseModel
+
+
+class DiscogsMetadataServiceTest(unittest.TestCase):
+    def _get_release_mock(self, id, main_release_id=None):
+        release_mock = Mock()
+        release_mock.id = id
+        if main_release_id:
+            release_mock.master.fetch.return_value = main_release_id
+        else:
+            release_mock.master = None
+        return release_mock
+
+    @mock.patch('amu.metadata.ReleaseModel.from_discogs_release')
+    @mock.patch('amu.metadata.discogs_client.Client')
+    def test__get_release_by_id__release_is_not_the_main_release__the_main_release_is_fetched(self, client_mock, from_discogs_release_mock):
+        release_mock = self._get_release_mock(792244, 1234)
+        main_release_mock = self._get_release_mock(1234, 1234)
+        client_mock.return_value.release.side_effect = [release_mock, main_release_mock]
+        service = DiscogsMetadataService()
+        release_model = service.get_release_by_id(792244)
+        client_mock.return_value.release.assert_called_with(1234)
+        self.assertTrue(main_release_mock.refresh.called)
+        from_discogs_release_mock.assert_called_with(main_release_mock, False)
+        self.assertEqual(from_discogs_release_mock.return_value, release_model.original_release)
+
+    @mock.patch('amu.metadata.ReleaseModel.from_discogs_release')
+    @mock.patch('amu.metadata.discogs_client.Client')
+    def test__get_release_by_id__release_is_the_main_release__the_release_is_not_fetched_again(self, client_mock, from_discogs_release_mock):
+        release_mock = self._get_release_mock(1234, 1234)
+        client_mock.return_value.release.return_value = release_mock
+        service = DiscogsMetadataService()
+        service.get_release_by_id(1234)
+        client_mock.return_value.release.assert_called_once_with(1234)
+        from_discogs_release_mock.assert_called_with(release_mock, False)
+
+    @mock.patch('amu.metadata.ReleaseModel.from_discogs_release')
+    @mock.patch('amu.metadata.discogs_client.Client')
+    def test__get_release_by_id__original_release_is_not_included__the_master_is_not_fetched(self, client_mock, from_discogs_release_mock):
+        release_mock = self._get_release_mock(792244, 1234)
+        client_mock.return_value.release.return_value = release_mock
+        service = DiscogsMetadataService()
+        service.get_release_by_id(792244, include_original_release=False)
+        client_mock.return_value.release.assert_called_once_with(792244)
+        self.assertFalse(release_mock.master.fetch.called)
+        from_discogs_release_mock.assert_called_once_with(release_mock, False)
+
+    @mock.patch('amu.metadata.ReleaseModel.from_discogs_release')
+    @mock.patch('amu.metadata.discogs_client.Client')
+    def test__get_release_by_id__fetching_the_master_fails__the_error_is_raised(self, client_mock, from_discogs_release_mock):
+        release_mock = self._get_release_mock(792244, 1234)
+        release_mock.master.fetch.side_effect = ValueError('master failed')
+        client_mock.return_value.release.return_value = release_mock
+        service = DiscogsMetadataService()
+        with self.assertRaisesRegexp(ValueError, 'master failed'):
+            service.get_release_by_id(792244)
+
+    @mock.patch('amu.metadata.DiscogsResponseCache')
+    @mock.patch('amu.metadata.discogs_client.Client')
+    def test__get_release_by_id__release_model_is_cached__release_is_not_fetched(self, client_mock, cache_mock):
+        release_model = ReleaseModel()
+        release_model.discogs_id = 792244
+        cache_mock.return_value.get_release_model.return_value = release_model.to_bytes()
+        config_mock = Mock()
+        config_mock.use_discogs_dump.return_value = False
+        config_mock.use_discogs_offline_mode.return_value = False
+        service = DiscogsMetadataService(config_mock)
+        self.assertEqual(792244, service.get_release_by_id(792244).discogs_id)
+        cache_mock.return_value.get_release_model.assert_called_once_with(
+            'releases/792244?collapse_index_tracks=0&include_original_release=1', allow_expired=False)
+        self.assertFalse(client_mock.return_value.release.called)
+
+    @mock.patch('amu.metadata.ReleaseModel.from_discogs_release')
+    @mock.patch('amu.metadata.DiscogsResponseCache')
+    @mock.patch('amu.metadata.discogs_client.Client')
+    def test__get_release_by_id__release_model_is_not_cached__release_model_is_cached(self, client_mock, cache_mock, from_discogs_release_mock):
+        release_model = ReleaseModel()
+        from_discogs_release_mock.return_value = release_model
+        client_mock.return_value.release.return_value = self._get_release_mock(792244)
+        cache_mock.return_value.get_release_model.return_value = None
+        config_mock = Mock()
+        config_mock.use_discogs_dump.return_value = False
+        config_mock.use_discogs_offline_mode.return_value = False
+        config_mock.get_discogs_requests_per_minute.return_value = 60
+        service = DiscogsMetadataService(config_mock)
+        service.get_release_by_id(792244, include_original_release=False)
+        cache_mock.return_value.put_release_model.assert_called_once_with(
+            'releases/792244?collapse_index_tracks=0&include_original_release=0', release_model.to_bytes())
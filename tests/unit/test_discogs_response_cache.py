@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from mock import Mock
+from amu.cache import CacheMissError
+from amu.cache import CachingFetcher
+from amu.cache import DiscogsResponseCache
+from amu.cache import get_cache_key
+from amu.cache import get_release_model_key
+
+
+class DiscogsResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test__get_cache_key__url_for_release__returns_path_of_release(self):
+        self.assertEqual('releases/32662', get_cache_key('https://api.discogs.com/releases/32662'))
+
+    def test__get_cache_key__url_has_parameters__the_parameters_are_sorted_into_the_key(self):
+        self.assertEqual(
+            'database/search?page=2&q=analord',
+            get_cache_key('https://api.discogs.com/database/search?q=analord&page=2'))
+
+    def test__get_cache_key__urls_for_different_pages__the_keys_are_different(self):
+        self.assertNotEqual(
+            get_cache_key('https://api.discogs.com/artists/1/releases?page=1'),
+            get_cache_key('https://api.discogs.com/artists/1/releases?page=2'))
+
+    def test__get__response_has_not_been_cached__returns_none(self):
+        cache = DiscogsResponseCache(self.path, 60)
+        self.assertIsNone(cache.get('releases/32662'))
+
+    def test__get__response_has_been_cached__returns_body(self):
+        cache = DiscogsResponseCache(self.path, 60)
+        cache.put('releases/32662', u'{"id": 32662}')
+        self.assertEqual(u'{"id": 32662}', cache.get('releases/32662'))
+
+    def test__get__response_is_older_than_ttl__returns_none(self):
+        cache = DiscogsResponseCache(self.path, -1)
+        cache.put('releases/32662', u'{"id": 32662}')
+        self.assertIsNone(cache.get('releases/32662'))
+
+    def test__get__response_is_older_than_ttl_and_expired_responses_are_allowed__returns_body(self):
+        cache = DiscogsResponseCache(self.path, -1)
+        cache.put('releases/32662', u'{"id": 32662}')
+        self.assertEqual(u'{"id": 32662}', cache.get('releases/32662', allow_expired=True))
+
+class CachingFetcherTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = DiscogsResponseCache(os.path.join(self.directory, 'cache.db'), 60)
+        self.url = 'https://api.discogs.com/releases/32662'
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test__fetch__response_is_not_cached__response_is_fetched_and_cached(self):
+        fetcher_mock = Mock()
+        fetcher_mock.fetch.return_value = ('{"id": 32662}', 200)
+        fetcher = CachingFetcher(fetcher_mock, self.cache)
+        self.assertEqual(('{"id": 32662}', 200), fetcher.fetch(None, 'GET', self.url))
+        self.assertEqual(u'{"id": 32662}', self.cache.get('releases/32662'))
+
+    def test__fetch__response_is_cached__response_is_not_fetched(self):
+        fetcher_mock = Mock()
+        self.cache.put('releases/32662', u'{"id": 32662}')
+        fetcher = CachingFetcher(fetcher_mock, self.cache)
+        self.assertEqual(('{"id": 32662}', 200), fetcher.fetch(None, 'GET', self.url))
+        self.assertFalse(fetcher_mock.fetch.called)
+
+    def test__fetch__fetch_is_not_successful__response_is_not_cached(self):
+        fetcher_mock = Mock()
+        fetcher_mock.fetch.return_value = ('{"message": "Release not found."}', 404)
+        fetcher = CachingFetcher(fetcher_mock, self.cache)
+        self.assertEqual(('{"message": "Release not found."}', 404), fetcher.fetch(None, 'GET', self.url))
+        self.assertIsNone(self.cache.get('releases/32662'))
+
+    def test__fetch__request_is_not_a_get__response_is_not_cached(self):
+        fetcher_mock = Mock()
+        fetcher_mock.fetch.return_value = ('{}', 200)
+        fetcher = CachingFetcher(fetcher_mock, self.cache)
+        fetcher.fetch(None, 'POST', self.url, data='{}')
+        self.assertIsNone(self.cache.get('releases/32662'))
+
+    def test__fetch__offline_and_response_has_expired__expired_response_is_returned(self):
+        fetcher_mock = Mock()
+        cache = DiscogsResponseCache(os.path.join(self.directory, 'cache.db'), -1)
+        cache.put('releases/32662', u'{"id": 32662}')
+        fetcher = CachingFetcher(fetcher_mock, cache, offline=True)
+        self.assertEqual(('{"id": 32662}', 200), fetcher.fetch(None, 'GET', self.url))
+        self.assertFalse(fetcher_mock.fetch.called)
+
+    def test__fetch__offline_and_response_is_not_cached__throws_cache_miss_error(self):
+        fetcher_mock = Mock()
+        fetcher = CachingFetcher(fetcher_mock, self.cache, offline=True)
+        with self.assertRaisesRegexp(CacheMissError, 'releases/32662 is not in the discogs cache'):
+            fetcher.fetch(None, 'GET', self.url)
+        self.assertFalse(fetcher_mock.fetch.called)
+
+class ReleaseModelCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = DiscogsResponseCache(os.path.join(self.directory, 'cache.db'), 60)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test__get_release_model__release_model_has_been_cached__binary_form_is_returned(self):
+        key = get_release_model_key(32662, False, True)
+        self.cache.put_release_model(key, '\x01\x00\xff')
+        self.assertEqual('\x01\x00\xff', self.cache.get_release_model(key))
+
+    def test__get_release_model__release_model_was_cached_with_different_options__returns_none(self):
+        self.cache.put_release_model(get_release_model_key(32662, False, True), '\x01\x00\xff')
+        self.assertIsNone(self.cache.get_release_model(get_release_model_key(32662, True, True)))
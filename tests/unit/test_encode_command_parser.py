@@ -3,6 +3,7 @@ import unittest
 from mock import Mock
 from amu.commands import EncodeWavCommand, RipCdCommand
 from amu.parsing import CommandParsingError, EncodeCommandParser
+from tests.helpers import captured_output
 
 class EncodeCommandParserTest(unittest.TestCase):
     @mock.patch('os.path.exists')
@@ -254,3 +255,66 @@ class EncodeCommandParserTest(unittest.TestCase):
             config_mock, cd_ripper_mock, encoder_mock = (Mock(),)*3
             parser = EncodeCommandParser(config_mock, cd_ripper_mock, encoder_mock, 'mp3')
             parser.parse_cd_rip('/tmp/rip/destination', '')
+
+    @mock.patch('os.walk')
+    @mock.patch('os.path.exists')
+    @mock.patch('os.path.isfile')
+    def test__parse_wav__source_is_directory_with_2_wav_files__the_commands_have_no_dependencies(self, isfile_mock, exists_mock, walk_mock):
+        exists_mock.return_value = True
+        isfile_mock.return_value = False
+        walk_mock.return_value = [
+            ('/some/path/to/wavs', (), ('01 - Track 1.wav', '02 - Track 2.wav'))
+        ]
+        config_mock, cd_ripper_mock, encoder_mock = (Mock(),)*3
+        parser = EncodeCommandParser(config_mock, cd_ripper_mock, encoder_mock, 'mp3')
+        commands = parser.parse_wav('/some/path/to/wavs', '/some/destination/')
+        self.assertEqual([], commands[0].dependencies)
+        self.assertEqual([], commands[1].dependencies)
+
+    @mock.patch('amu.utils.get_number_of_tracks_on_cd')
+    def test__parse_cd_rip__cd_has_2_tracks__the_encode_commands_depend_on_the_rip_cd_command(self, number_of_tracks_mock):
+        config_mock, cd_ripper_mock, encoder_mock = (Mock(),)*3
+        number_of_tracks_mock.return_value = 2
+        parser = EncodeCommandParser(config_mock, cd_ripper_mock, encoder_mock, 'mp3')
+        commands = parser.parse_cd_rip('/tmp/rip/destination', '/some/destination')
+        self.assertEqual([commands[0]], commands[1].dependencies)
+        self.assertEqual([commands[0]], commands[2].dependencies)
+
+    @mock.patch('os.walk')
+    @mock.patch('os.path.exists')
+    @mock.patch('os.path.isfile')
+    def test__parse_wav__incremental_encode__each_command_has_a_manifest_for_its_destination_directory(self, isfile_mock, exists_mock, walk_mock):
+        exists_mock.return_value = True
+        isfile_mock.return_value = False
+        walk_mock.return_value = [
+            ('/some/path/to/wavs', (), ('01 - Track 1.wav', '02 - Track 2.wav'))
+        ]
+        config_mock, cd_ripper_mock, encoder_mock = (Mock(),)*3
+        parser = EncodeCommandParser(config_mock, cd_ripper_mock, encoder_mock, 'flac', True)
+        commands = parser.parse_wav('/some/path/to/wavs', '/some/destination')
+        self.assertEqual('/some/destination/.amu_manifest', commands[0].manifest.path)
+        self.assertEqual('/some/destination/.amu_manifest', commands[1].manifest.path)
+
+    @mock.patch('os.walk')
+    @mock.patch('os.path.exists')
+    @mock.patch('os.path.isfile')
+    def test__parse_wav__not_an_incremental_encode__the_commands_have_no_manifest(self, isfile_mock, exists_mock, walk_mock):
+        exists_mock.return_value = True
+        isfile_mock.return_value = False
+        walk_mock.return_value = [
+            ('/some/path/to/wavs', (), ('01 - Track 1.wav',))
+        ]
+        config_mock, cd_ripper_mock, encoder_mock = (Mock(),)*3
+        parser = EncodeCommandParser(config_mock, cd_ripper_mock, encoder_mock, 'flac')
+        commands = parser.parse_wav('/some/path/to/wavs', '/some/destination')
+        self.assertIsNone(commands[0].manifest)
+
+    def test__get_out_of_date_commands__one_of_two_commands_is_up_to_date__only_the_other_command_is_returned(self):
+        config_mock, cd_ripper_mock, encoder_mock = (Mock(),)*3
+        up_to_date_command, out_of_date_command = (Mock(), Mock())
+        up_to_date_command.is_up_to_date.return_value = True
+        out_of_date_command.is_up_to_date.return_value = False
+        parser = EncodeCommandParser(config_mock, cd_ripper_mock, encoder_mock, 'flac', True)
+        with captured_output():
+            commands = parser.get_out_of_date_commands([up_to_date_command, out_of_date_command])
+        self.assertEqual([out_of_date_command], commands)
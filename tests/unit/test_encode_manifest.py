@@ -0,0 +1,76 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from amu.manifest import EncodeManifest
+
+
+class EncodeManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, '01 - Track 1.wav')
+        self.destination = os.path.join(self.directory, '01 - Track 1.flac')
+        self._write_file(self.source, 'wav data')
+        self._write_file(self.destination, 'flac data')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write_file(self, path, content):
+        with open(path, 'wb') as f:
+            f.write(content)
+
+    def test__is_up_to_date__there_is_no_manifest__returns_false(self):
+        manifest = EncodeManifest(self.directory)
+        self.assertFalse(manifest.is_up_to_date(self.source, self.destination, 'flac', '-8'))
+
+    def test__is_up_to_date__nothing_has_changed_since_the_encode_was_recorded__returns_true(self):
+        manifest = EncodeManifest(self.directory)
+        manifest.record(self.source, self.destination, 'flac', '-8')
+        self.assertTrue(manifest.is_up_to_date(self.source, self.destination, 'flac', '-8'))
+
+    def test__is_up_to_date__source_has_changed__returns_false(self):
+        manifest = EncodeManifest(self.directory)
+        manifest.record(self.source, self.destination, 'flac', '-8')
+        self._write_file(self.source, 'different wav data')
+        self.assertFalse(manifest.is_up_to_date(self.source, self.destination, 'flac', '-8'))
+
+    def test__is_up_to_date__output_has_changed__returns_false(self):
+        manifest = EncodeManifest(self.directory)
+        manifest.record(self.source, self.destination, 'flac', '-8')
+        self._write_file(self.destination, 'truncated')
+        self.assertFalse(manifest.is_up_to_date(self.source, self.destination, 'flac', '-8'))
+
+    def test__is_up_to_date__output_has_been_removed__returns_false(self):
+        manifest = EncodeManifest(self.directory)
+        manifest.record(self.source, self.destination, 'flac', '-8')
+        os.remove(self.destination)
+        self.assertFalse(manifest.is_up_to_date(self.source, self.destination, 'flac', '-8'))
+
+    def test__is_up_to_date__encoding_setting_has_changed__returns_false(self):
+        manifest = EncodeManifest(self.directory)
+        manifest.record(self.source, self.destination, 'flac', '-8')
+        self.assertFalse(manifest.is_up_to_date(self.source, self.destination, 'flac', '-5'))
+
+    def test__is_up_to_date__encoder_has_changed__returns_false(self):
+        manifest = EncodeManifest(self.directory)
+        manifest.record(self.source, self.destination, 'flac', '-8')
+        self.assertFalse(manifest.is_up_to_date(self.source, self.destination, '/opt/flac/flac', '-8'))
+
+    def test__is_up_to_date__manifest_is_corrupt__returns_false(self):
+        manifest = EncodeManifest(self.directory)
+        self._write_file(manifest.path, '{not json')
+        self.assertFalse(manifest.is_up_to_date(self.source, self.destination, 'flac', '-8'))
+
+    def test__record__two_encodes_are_recorded__both_are_kept_in_the_manifest(self):
+        other_source = os.path.join(self.directory, '02 - Track 2.wav')
+        other_destination = os.path.join(self.directory, '02 - Track 2.flac')
+        self._write_file(other_source, 'other wav data')
+        self._write_file(other_destination, 'other flac data')
+        manifest = EncodeManifest(self.directory)
+        manifest.record(self.source, self.destination, 'flac', '-8')
+        manifest.record(other_source, other_destination, 'flac', '-8')
+        with open(manifest.path, 'r') as manifest_file:
+            entries = json.load(manifest_file)
+        self.assertEqual(['01 - Track 1.flac', '02 - Track 2.flac'], sorted(entries.keys()))
@@ -0,0 +1,82 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import wave
+from amu.progress import EncodeProgressReporter, ProgressEvent, parse_flac_progress, parse_lame_progress
+from tests.helpers import captured_output
+
+
+class EncodeProgressTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test__parse_lame_progress__line_is_a_progress_line__returns_percent_and_speed(self):
+        event = parse_lame_progress('  1500/9327  (16%)|    0:00/    0:03|    0:00/    0:03|   42.617x|    0:02 ')
+        self.assertEqual(16, event.percent)
+        self.assertEqual(42.617, event.speed)
+
+    def test__parse_lame_progress__line_is_not_a_progress_line__returns_none(self):
+        self.assertIsNone(parse_lame_progress('Encoding as 44.1 kHz j-stereo MPEG-1 Layer III VBR(q=0)'))
+
+    def test__parse_flac_progress__line_is_a_progress_line__returns_percent(self):
+        event = parse_flac_progress('01 - Track 1.wav: 45% complete, ratio=0.612')
+        self.assertEqual(45, event.percent)
+
+    def test__parse_flac_progress__line_is_the_final_line__returns_bytes_written(self):
+        event = parse_flac_progress('01 - Track 1.wav: wrote 12345 bytes, ratio=0.612')
+        self.assertEqual(100, event.percent)
+        self.assertEqual(12345, event.bytes_written)
+
+    def test__parse_flac_progress__line_is_not_a_progress_line__returns_none(self):
+        self.assertIsNone(parse_flac_progress('flac 1.3.2'))
+
+    def test__update__progress_passes_the_milestones__a_line_is_displayed_for_each_milestone(self):
+        reporter = EncodeProgressReporter()
+        progress = reporter.start('/some/source.wav', '/some/destination.mp3')
+        with captured_output() as (out, _):
+            for percent in range(0, 100, 5):
+                progress.update(ProgressEvent(percent))
+        self.assertEqual(
+            [u'[encode] destination.mp3: 25%', u'[encode] destination.mp3: 50%', u'[encode] destination.mp3: 75%'],
+            out.getvalue().splitlines())
+
+    def test__finish__metrics_file_is_given__a_json_line_is_written_for_the_track(self):
+        metrics_path = os.path.join(self.directory, 'metrics.jsonl')
+        source = os.path.join(self.directory, 'source.wav')
+        destination = os.path.join(self.directory, 'destination.mp3')
+        with open(source, 'wb') as f:
+            f.write('a' * 1000)
+        with open(destination, 'wb') as f:
+            f.write('a' * 250)
+        reporter = EncodeProgressReporter(metrics_path)
+        with captured_output():
+            reporter.start(source, destination).finish()
+            reporter.start(source, destination).finish()
+        with open(metrics_path, 'r') as metrics_file:
+            lines = metrics_file.readlines()
+        self.assertEqual(2, len(lines))
+        metrics = json.loads(lines[0])
+        self.assertEqual(destination, metrics['destination'])
+        self.assertEqual(1000, metrics['source_bytes'])
+        self.assertEqual(250, metrics['output_bytes'])
+        self.assertEqual(0.25, metrics['compression_ratio'])
+        self.assertIn('wall_time', metrics)
+
+    def test__finish__source_is_a_wav__the_realtime_factor_is_calculated_from_its_duration(self):
+        source = os.path.join(self.directory, 'source.wav')
+        wav = wave.open(source, 'wb')
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(44100)
+        wav.writeframes('\0' * 4 * 44100)
+        wav.close()
+        reporter = EncodeProgressReporter()
+        with captured_output():
+            metrics = reporter.start(source, os.path.join(self.directory, 'destination.mp3')).finish()
+        self.assertEqual(1.0, metrics['audio_duration'])
+        self.assertGreater(metrics['realtime_factor'], 0)
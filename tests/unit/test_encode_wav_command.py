@@ -1,7 +1,14 @@
 import mock
+import os
+import shutil
+import tempfile
 import unittest
+from amu.audio import LameEncoder
 from amu.commands import CommandValidationError
 from amu.commands import EncodeWavCommand
+from amu.execution import CommandExecutionError, CommandExecutor
+from amu.manifest import EncodeManifest
+from tests.helpers import captured_output
 
 class EncodeWavCommandTest(unittest.TestCase):
     @mock.patch('os.remove')
@@ -97,3 +104,91 @@ class EncodeWavCommandTest(unittest.TestCase):
             command = EncodeWavCommand(config_mock, encoder_mock)
             command.source = '/some/source/'
             command.validate()
+
+    @mock.patch('os.remove')
+    @mock.patch('os.path.exists')
+    @mock.patch('os.makedirs')
+    def test__execute__command_has_a_manifest__the_encode_is_recorded_in_the_manifest(self, makedirs_mock, path_exists_mock, remove_mock):
+        path_exists_mock.return_value = True
+        config_mock, encoder_mock, manifest_mock = (mock.Mock(), mock.Mock(), mock.Mock())
+        encoder_mock.get_path.return_value = 'flac'
+        encoder_mock.get_encoding_setting.return_value = '-8'
+        command = EncodeWavCommand(config_mock, encoder_mock)
+        command.source = '/some/source.wav'
+        command.destination = '/some/destination.flac'
+        command.manifest = manifest_mock
+        command.execute()
+        manifest_mock.record.assert_called_once_with('/some/source.wav', '/some/destination.flac', 'flac', '-8')
+
+    @mock.patch('subprocess.Popen')
+    def test__execute__lame_exits_with_an_error__the_encode_is_not_completed_and_the_source_is_kept(self, subprocess_mock):
+        directory = tempfile.mkdtemp()
+        try:
+            source = os.path.join(directory, '01 - Track 1.wav')
+            with open(source, 'wb') as wav:
+                wav.write('RIFF')
+            process_mock = mock.Mock()
+            process_mock.stdout.readline = lambda: ''
+            process_mock.wait.return_value = 1
+            subprocess_mock.return_value = process_mock
+            command = EncodeWavCommand(mock.Mock(), LameEncoder(mock.Mock(), mock.Mock()))
+            command.source = source
+            command.destination = os.path.join(directory, 'mp3', '01 - Track 1.mp3')
+            command_completed_mock = mock.Mock()
+            with captured_output():
+                with self.assertRaises(CommandExecutionError):
+                    CommandExecutor(1).execute([command], command_completed_mock)
+            self.assertFalse(command_completed_mock.called)
+            self.assertTrue(os.path.exists(source))
+        finally:
+            shutil.rmtree(directory)
+
+    @mock.patch('subprocess.Popen')
+    def test__execute__lame_exits_with_an_error_after_writing_part_of_the_output__the_encode_is_not_recorded(self, subprocess_mock):
+        directory = tempfile.mkdtemp()
+        try:
+            source = os.path.join(directory, '01 - Track 1.wav')
+            destination = os.path.join(directory, '01 - Track 1.mp3')
+            with open(source, 'wb') as wav:
+                wav.write('RIFF')
+            def write_part_of_the_output(*args, **kwargs):
+                with open(destination, 'wb') as mp3:
+                    mp3.write('ID3')
+                return process_mock
+            process_mock = mock.Mock()
+            process_mock.stdout.readline = lambda: ''
+            process_mock.wait.return_value = 1
+            subprocess_mock.side_effect = write_part_of_the_output
+            manifest = EncodeManifest(directory)
+            config_mock = mock.Mock()
+            config_mock.get_lame_path.return_value = 'lame'
+            config_mock.get_lame_encoding_setting.return_value = '-V0'
+            command = EncodeWavCommand(config_mock, LameEncoder(config_mock, mock.Mock()))
+            command.source = source
+            command.destination = destination
+            command.manifest = manifest
+            with captured_output():
+                with self.assertRaises(CommandExecutionError):
+                    CommandExecutor(1).execute([command])
+            self.assertFalse(os.path.exists(manifest.path))
+            self.assertFalse(manifest.is_up_to_date(source, destination, 'lame', '-V0'))
+        finally:
+            shutil.rmtree(directory)
+
+    def test__is_up_to_date__command_has_no_manifest__returns_false(self):
+        command = EncodeWavCommand(mock.Mock(), mock.Mock())
+        command.source = '/some/source.wav'
+        command.destination = '/some/destination.flac'
+        self.assertFalse(command.is_up_to_date())
+
+    def test__is_up_to_date__command_has_a_manifest__the_manifest_is_checked_with_the_encoder_and_setting(self):
+        config_mock, encoder_mock, manifest_mock = (mock.Mock(), mock.Mock(), mock.Mock())
+        encoder_mock.get_path.return_value = 'flac'
+        encoder_mock.get_encoding_setting.return_value = '-8'
+        manifest_mock.is_up_to_date.return_value = True
+        command = EncodeWavCommand(config_mock, encoder_mock)
+        command.source = '/some/source.wav'
+        command.destination = '/some/destination.flac'
+        command.manifest = manifest_mock
+        self.assertTrue(command.is_up_to_date())
+        manifest_mock.is_up_to_date.assert_called_once_with('/some/source.wav', '/some/destination.flac', 'flac', '-8')
@@ -1,3 +1,4 @@
+import json
 import unittest
 from mock import Mock
 from amu.commands import CommandValidationError
@@ -70,3 +71,38 @@ class FetchReleaseCommandTest(unittest.TestCase):
             command.execute()
             output = out.getvalue().strip()
             self.assertIn('ID: 12345', output)
+
+    def test__execute__release_has_an_original_release__the_original_release_is_not_printed(self):
+        metadata_service_mock = Mock()
+        release_model = ReleaseModel()
+        release_model.discogs_id = 12345
+        release_model.title = 'Pimpshifter'
+        release_model.original_release = ReleaseModel()
+        release_model.original_release.discogs_id = 54321
+        metadata_service_mock.get_release_by_id.return_value = release_model
+        with captured_output() as (out, _):
+            command = FetchReleaseCommand(Mock(), metadata_service_mock)
+            command.discogs_id = 12345
+            command.execute()
+        self.assertIn('ID: 12345', out.getvalue())
+        self.assertNotIn('54321', out.getvalue())
+
+    def test__execute__json_output_is_used__the_release_model_should_be_printed_as_json(self):
+        config_service_mock = Mock()
+        metadata_service_mock = Mock()
+        release_model = ReleaseModel()
+        release_model.discogs_id = 12345
+        release_model.artist = 'Legowelt'
+        release_model.title = 'Pimpshifter'
+        release_model.add_track_directly(None, 'Sturmvogel', 1, 6, 1, 1)
+        metadata_service_mock.get_release_by_id.return_value = release_model
+
+        with captured_output() as (out, _):
+            command = FetchReleaseCommand(config_service_mock, metadata_service_mock)
+            command.discogs_id = 12345
+            command.output_json = True
+            command.execute()
+            release = json.loads(out.getvalue())
+        self.assertEqual(12345, release['discogs_id'])
+        self.assertEqual('Sturmvogel', release['tracks'][0]['title'])
+        metadata_service_mock.get_release_by_id.assert_called_once_with(12345)
@@ -0,0 +1,49 @@
+import mock
+import unittest
+from amu.snapshot import FileSystemSnapshot
+
+
+class FileSystemSnapshotTest(unittest.TestCase):
+    @mock.patch('amu.snapshot.os.listdir')
+    def test__listdir__directory_is_listed_twice__directory_is_only_read_once(self, listdir_mock):
+        listdir_mock.return_value = ['01 - Track 1.wav', 'cover.jpg']
+        snapshot = FileSystemSnapshot()
+        snapshot.listdir('/some/path')
+        self.assertEqual(['01 - Track 1.wav', 'cover.jpg'], snapshot.listdir('/some/path'))
+        listdir_mock.assert_called_once_with('/some/path')
+
+    @mock.patch('amu.snapshot.os.listdir')
+    def test__listdir__returned_list_is_changed__snapshot_is_not_changed(self, listdir_mock):
+        listdir_mock.return_value = ['01 - Track 1.wav']
+        snapshot = FileSystemSnapshot()
+        snapshot.listdir('/some/path').append('02 - Track 2.wav')
+        self.assertEqual(['01 - Track 1.wav'], snapshot.listdir('/some/path'))
+
+    @mock.patch('amu.snapshot.os.path.exists')
+    def test__exists__path_is_checked_twice__path_is_only_checked_once(self, exists_mock):
+        exists_mock.return_value = True
+        snapshot = FileSystemSnapshot()
+        snapshot.exists('/some/path')
+        self.assertTrue(snapshot.exists('/some/path'))
+        exists_mock.assert_called_once_with('/some/path')
+
+    @mock.patch('amu.snapshot.os.walk')
+    def test__scan__directory_has_disc_directories__only_the_top_level_is_returned(self, walk_mock):
+        walk_mock.return_value = [
+            ('/some/path', ['CD1', 'CD2'], ['cover.jpg']),
+            ('/some/path/CD1', [], ['01 - Track 1.wav'])
+        ]
+        snapshot = FileSystemSnapshot()
+        self.assertEqual([('/some/path', ['CD1', 'CD2'], ['cover.jpg'])], snapshot.scan('/some/path'))
+
+    @mock.patch('amu.snapshot.os.walk')
+    def test__scan__directory_does_not_exist__empty_list_is_returned(self, walk_mock):
+        walk_mock.return_value = []
+        snapshot = FileSystemSnapshot()
+        self.assertEqual([], snapshot.scan('/some/path'))
+
+    @mock.patch('amu.snapshot.os.listdir')
+    def test__get_covers__directory_has_images__only_the_cover_images_are_returned(self, listdir_mock):
+        listdir_mock.return_value = ['01 - Track 1.wav', 'back.jpg', 'cover.png', 'cover.jpg']
+        snapshot = FileSystemSnapshot()
+        self.assertEqual(['cover.png', 'cover.jpg'], snapshot.get_covers('/some/path'))
@@ -2,8 +2,9 @@ import mock
 import subprocess
 import unittest
 from mock import MagicMock, Mock
-from amu.audio import FlacEncoder
+from amu.audio import EncoderError, FlacEncoder
 from amu.config import ConfigurationError
+from tests.helpers import captured_output
 
 
 class FlacEncoderTest(unittest.TestCase):
@@ -20,6 +21,7 @@ class FlacEncoderTest(unittest.TestCase):
         config_mock.get_flac_encoding_setting.return_value = '-8'
         process_mock = mock.Mock()
         process_mock.stdout.readline = lambda: ""
+        process_mock.wait.return_value = 0
         subprocess_mock.return_value = process_mock
         encoder = FlacEncoder(config_mock)
         encoder.encode('/some/path/source', '/some/path/destination')
@@ -29,7 +31,7 @@ class FlacEncoderTest(unittest.TestCase):
             '/some/path/source',
             '--output-name=/some/path/destination'
         ]
-        subprocess_mock.assert_called_with(subprocess_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        subprocess_mock.assert_called_with(subprocess_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
 
     def test__encode__source_is_empty__raises_value_error(self):
         config_mock = Mock(autospec=True)
@@ -82,6 +84,7 @@ class FlacEncoderTest(unittest.TestCase):
         config_mock.get_flac_decode_setting.return_value = '-d'
         process_mock = mock.Mock()
         process_mock.stdout.readline = lambda: ""
+        process_mock.wait.return_value = 0
         subprocess_mock.return_value = process_mock
         encoder = FlacEncoder(config_mock)
         encoder.decode('/some/path/source', '/some/path/destination')
@@ -93,6 +96,36 @@ class FlacEncoderTest(unittest.TestCase):
         ]
         subprocess_mock.assert_called_with(subprocess_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
 
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.path.isdir')
+    @mock.patch('os.path.exists')
+    def test__encode__flac_exits_with_an_error__raises_encoder_error(self, exists_mock, isdir_mock, subprocess_mock):
+        exists_mock.return_value = True
+        isdir_mock.return_value = False
+        process_mock = mock.Mock()
+        process_mock.stdout.readline = lambda: ""
+        process_mock.wait.return_value = 1
+        subprocess_mock.return_value = process_mock
+        encoder = FlacEncoder(Mock(), Mock())
+        with captured_output():
+            with self.assertRaisesRegexp(EncoderError, 'Encoding /some/path/source.wav to /some/path/destination.flac failed.'):
+                encoder.encode('/some/path/source.wav', '/some/path/destination.flac')
+
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.path.isdir')
+    @mock.patch('os.path.exists')
+    def test__decode__flac_exits_with_an_error__raises_encoder_error(self, exists_mock, isdir_mock, subprocess_mock):
+        exists_mock.return_value = True
+        isdir_mock.return_value = False
+        process_mock = mock.Mock()
+        process_mock.stdout.readline = lambda: ""
+        process_mock.wait.return_value = 1
+        subprocess_mock.return_value = process_mock
+        encoder = FlacEncoder(Mock())
+        with captured_output():
+            with self.assertRaisesRegexp(EncoderError, 'Decoding /some/path/source.flac to /some/path/destination.wav failed.'):
+                encoder.decode('/some/path/source.flac', '/some/path/destination.wav')
+
     def test__decode__source_is_empty__raises_value_error(self):
         config_mock = Mock(autospec=True)
         with self.assertRaisesRegexp(ValueError, 'A value must be supplied for the source'):
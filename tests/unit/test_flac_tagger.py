@@ -0,0 +1,49 @@
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+from amu.audio import FlacTagger
+from mutagen.flac import FLAC
+from PIL import Image
+from tests.helpers import write_flac
+
+
+class FlacTaggerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, 'song.flac')
+        self.cover = os.path.join(self.directory, 'cover.jpg')
+        write_flac(self.source)
+        Image.new('RGB', (10, 10)).save(self.cover)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _add_tags(self, tagger, artist='Aphex Twin'):
+        return tagger.add_tags(
+            self.source, artist=artist, title='Flap Head', track_number=1, track_total=2,
+            disc_number=1, disc_total=1, artwork=self.cover)
+
+    def test__add_tags__flac_already_has_the_tags_and_cover__the_flac_is_not_saved(self):
+        tagger = FlacTagger()
+        self.assertTrue(self._add_tags(tagger))
+        with mock.patch.object(FLAC, 'save', autospec=True) as save_mock:
+            written = self._add_tags(tagger)
+        self.assertFalse(written)
+        self.assertFalse(save_mock.called)
+        self.assertEqual(1, len(FLAC(self.source).pictures))
+
+    def test__add_tags__flac_has_a_different_artist__the_flac_is_saved(self):
+        tagger = FlacTagger()
+        self._add_tags(tagger)
+        written = self._add_tags(tagger, artist='AFX')
+        self.assertTrue(written)
+        self.assertEqual([u'AFX'], FLAC(self.source)['ARTIST'])
+        self.assertEqual(1, len(FLAC(self.source).pictures))
+
+    def test__apply_artwork__flac_already_has_the_cover__the_flac_is_not_saved(self):
+        tagger = FlacTagger()
+        tagger.apply_artwork(self.cover, self.source)
+        self.assertFalse(tagger.apply_artwork(self.cover, self.source))
+        self.assertEqual(1, len(FLAC(self.source).pictures))
@@ -2,8 +2,9 @@ import mock
 import subprocess
 import unittest
 from mock import MagicMock, Mock
-from amu.audio import LameEncoder
+from amu.audio import EncoderError, LameEncoder
 from amu.config import ConfigurationError
+from tests.helpers import captured_output
 
 
 class LameEncoderTest(unittest.TestCase):
@@ -20,6 +21,7 @@ class LameEncoderTest(unittest.TestCase):
         config_mock.get_lame_encoding_setting.return_value = '-V0'
         process_mock = mock.Mock()
         process_mock.stdout.readline = lambda: ""
+        process_mock.wait.return_value = 0
         subprocess_mock.return_value = process_mock
         encoder = LameEncoder(config_mock)
         encoder.encode('/some/path/source', '/some/path/destination')
@@ -29,7 +31,7 @@ class LameEncoderTest(unittest.TestCase):
             '/some/path/source',
             '/some/path/destination'
         ]
-        subprocess_mock.assert_called_with(subprocess_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        subprocess_mock.assert_called_with(subprocess_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
 
     def test__encode__source_is_empty__raises_value_error(self):
         config_mock = Mock(autospec=True)
@@ -68,3 +70,47 @@ class LameEncoderTest(unittest.TestCase):
         with self.assertRaisesRegexp(ConfigurationError, 'The source should not be a directory'):
             encoder = LameEncoder(config_mock)
             encoder.encode('/some/path/source', '/some/path/destination')
+
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.path.isdir')
+    @mock.patch('os.path.exists')
+    def test__encode__lame_outputs_progress_lines__progress_is_reported_rather_than_printed(self, exists_mock, isdir_mock, subprocess_mock):
+        exists_mock.return_value = True
+        isdir_mock.return_value = False
+        config_mock = Mock(autospec=True)
+        config_mock.get_lame_path.return_value = 'lame'
+        config_mock.get_lame_encoding_setting.return_value = '-V0'
+        lines = iter([
+            'LAME 3.99.5 64bits (http://lame.sf.net)\n',
+            '  4663/9327  (50%)|    0:01/    0:03|    0:01/    0:03|   42.617x|    0:01 \n',
+            ''
+        ])
+        process_mock = mock.Mock()
+        process_mock.stdout.readline = lambda: next(lines)
+        process_mock.wait.return_value = 0
+        subprocess_mock.return_value = process_mock
+        reporter_mock = Mock()
+        progress_mock = reporter_mock.start.return_value
+        encoder = LameEncoder(config_mock, reporter_mock)
+        with captured_output() as (out, _):
+            encoder.encode('/some/path/source.wav', '/some/path/destination.mp3')
+        reporter_mock.start.assert_called_once_with('/some/path/source.wav', '/some/path/destination.mp3')
+        self.assertEqual(50, progress_mock.update.call_args[0][0].percent)
+        progress_mock.finish.assert_called_once_with()
+        self.assertIn('LAME 3.99.5', out.getvalue())
+        self.assertNotIn('42.617x', out.getvalue())
+
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.path.isdir')
+    @mock.patch('os.path.exists')
+    def test__encode__lame_exits_with_an_error__raises_encoder_error(self, exists_mock, isdir_mock, subprocess_mock):
+        exists_mock.return_value = True
+        isdir_mock.return_value = False
+        process_mock = mock.Mock()
+        process_mock.stdout.readline = lambda: ""
+        process_mock.wait.return_value = 1
+        subprocess_mock.return_value = process_mock
+        encoder = LameEncoder(Mock(), Mock())
+        with captured_output():
+            with self.assertRaisesRegexp(EncoderError, 'Encoding /some/path/source.wav to /some/path/destination.mp3 failed.'):
+                encoder.encode('/some/path/source.wav', '/some/path/destination.mp3')
@@ -0,0 +1,129 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from amu.library import LibraryError, LibraryIndex, LibraryQuery, TRACK_COLUMNS
+
+
+class LibraryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.index = LibraryIndex(os.path.join(self.directory, 'index'))
+        self._add_release(u'/music/mp3/Warp/Boards of Canada - Geogaddi', 'mp3', u'Boards of Canada', u'Geogaddi', u'Warp Records', u'WARPCD101', u'2002-02-18', [
+            (u'Music Is Math', 321.0), (u'Beware the Friendly Stranger', 37.0)])
+        self._add_release(u'/music/flac/Warp/Boards of Canada - Geogaddi', 'flac', u'Boards of Canada', u'Geogaddi', u'Warp Records', u'WARPCD101', u'2002', [
+            (u'Music Is Math', 321.0), (u'Beware the Friendly Stranger', 37.0)])
+        self._add_release(u'/music/mp3/Warp/Autechre - Confield', 'mp3', u'Autechre', u'Confield', u'Warp Records', u'WARPCD128', u'2001', [
+            (u'VI Scose Poise', 408.0)])
+        self._add_release(u'/music/mp3/Rephlex/AFX - Analord 08', 'mp3', u'AFX', u'Analord 08', u'Rephlex', u'ANALORD 08', u'2005', [
+            (u'PWSteal.Ldpinch.D', 363.0)])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _add_release(self, directory, format, artist, album, label, catno, year, titles):
+        tracks = []
+        for i, (title, duration) in enumerate(titles):
+            track = dict((x, None) for x in TRACK_COLUMNS)
+            track.update({
+                'path': '{0}/{1:02d} - {2}.{3}'.format(directory, i + 1, title.encode('utf-8'), format),
+                'directory': directory,
+                'format': format,
+                'artist': artist,
+                'album_artist': artist,
+                'album': album,
+                'title': title,
+                'year': year,
+                'label': label,
+                'catno': catno,
+                'duration': duration
+            })
+            tracks.append(track)
+        self.index.replace_directory(directory, 0, 0, tracks)
+
+    def _find_track_paths(self, **filters):
+        query = LibraryQuery()
+        for name, value in filters.iteritems():
+            setattr(query, name, value)
+        return self.index.find_track_paths(query)
+
+    def test__find_track_paths__label_is_in_a_different_case__the_tracks_on_the_label_are_found(self):
+        paths = self._find_track_paths(label=u'warp records', format='mp3')
+        self.assertEqual([
+            u'/music/mp3/Warp/Autechre - Confield/01 - VI Scose Poise.mp3',
+            u'/music/mp3/Warp/Boards of Canada - Geogaddi/01 - Music Is Math.mp3',
+            u'/music/mp3/Warp/Boards of Canada - Geogaddi/02 - Beware the Friendly Stranger.mp3'
+        ], paths)
+
+    def test__find_track_paths__without_format_is_used__only_releases_not_in_that_format_are_found(self):
+        paths = self._find_track_paths(label=u'Warp Records', format='mp3', without_format='flac')
+        self.assertEqual([u'/music/mp3/Warp/Autechre - Confield/01 - VI Scose Poise.mp3'], paths)
+
+    def test__find_track_paths__without_format_and_release_has_a_different_album_in_that_format__it_is_matched_on_the_catno(self):
+        self._add_release(u'/music/flac/Warp/Autechre - Confield', 'flac', u'Autechre', u'Confield (Remastered)', u'Warp Records', u'WARPCD128', u'2001', [
+            (u'VI Scose Poise', 408.0)])
+        self.assertEqual([], self._find_track_paths(label=u'Warp Records', format='mp3', without_format='flac'))
+
+    def test__find_track_paths__without_format_and_releases_have_no_album_or_catno__they_are_not_matched(self):
+        self._add_release(u'/music/mp3/Unknown/Demo', 'mp3', u'Unknown Artist', u'', u'', u'', u'', [
+            (u'Track 1', 200.0)])
+        self._add_release(u'/music/flac/Unknown/Live', 'flac', u'Unknown Artist', u'', u'', u'', u'', [
+            (u'Track 1', 300.0)])
+        paths = self._find_track_paths(artist=u'Unknown Artist', format='mp3', without_format='flac')
+        self.assertEqual([u'/music/mp3/Unknown/Demo/01 - Track 1.mp3'], paths)
+
+    def test__find_track_paths__year_is_used__tracks_with_a_full_date_in_that_year_are_found(self):
+        paths = self._find_track_paths(year='2002', format='mp3')
+        self.assertEqual(2, len(paths))
+
+    def test__find_track_paths__duration_range_is_used__only_tracks_in_the_range_are_found(self):
+        paths = self._find_track_paths(format='flac', min_duration=60, max_duration=400)
+        self.assertEqual([u'/music/flac/Warp/Boards of Canada - Geogaddi/01 - Music Is Math.flac'], paths)
+
+    def test__find_track_paths__title_is_used__the_titles_are_searched_for_the_words(self):
+        paths = self._find_track_paths(title=u'math', format='flac')
+        self.assertEqual([u'/music/flac/Warp/Boards of Canada - Geogaddi/01 - Music Is Math.flac'], paths)
+
+    def test__find_track_paths__title_search_is_not_valid__raises_library_error(self):
+        with self.assertRaisesRegexp(LibraryError, 'The title search "math is not valid.'):
+            self._find_track_paths(title=u'"math')
+
+    def test__find_track_paths__directory_has_been_scanned_again__the_old_titles_are_not_found(self):
+        self._add_release(u'/music/mp3/Rephlex/AFX - Analord 08', 'mp3', u'AFX', u'Analord 08', u'Rephlex', u'ANALORD 08', u'2005', [
+            (u'Backdoor.Berbew.Q', 285.0)])
+        self.assertEqual([], self._find_track_paths(title=u'Ldpinch'))
+        self.assertEqual(1, len(self._find_track_paths(title=u'Berbew')))
+
+    def test__find_track_paths__path_is_not_utf8__the_same_bytes_are_returned(self):
+        self._add_release('/music/flac/Rephlex/Caf\xe9', 'flac', u'AFX', u'Analord 09', u'Rephlex', u'ANALORD 09', u'2005', [
+            (u'Backdoor.Berbew.Q', 285.0)])
+        self.assertEqual(['/music/flac/Rephlex/Caf\xe9/01 - Backdoor.Berbew.Q.flac'], self._find_track_paths(catno=u'ANALORD 09'))
+
+    def test__find_tracks__catno_is_used__every_column_of_the_track_is_returned(self):
+        query = LibraryQuery()
+        query.catno = u'analord 08'
+        tracks = self.index.find_tracks(query)
+        self.assertEqual(1, len(tracks))
+        self.assertEqual(sorted(TRACK_COLUMNS), sorted(tracks[0].keys()))
+        self.assertEqual(u'PWSteal.Ldpinch.D', tracks[0]['title'])
+
+    def test__find_releases__label_is_used__each_release_directory_is_found_once(self):
+        query = LibraryQuery()
+        query.label = u'Warp Records'
+        releases = self.index.find_releases(query)
+        self.assertEqual([
+            u'/music/flac/Warp/Boards of Canada - Geogaddi',
+            u'/music/mp3/Warp/Autechre - Confield',
+            u'/music/mp3/Warp/Boards of Canada - Geogaddi'
+        ], [x['directory'] for x in releases])
+        self.assertEqual(u'WARPCD128', releases[1]['catno'])
+
+    def test__get_track_count__index_is_from_an_older_version__the_index_is_emptied(self):
+        path = os.path.join(self.directory, 'old_index')
+        connection = sqlite3.connect(path)
+        connection.execute('CREATE TABLE tracks (path TEXT PRIMARY KEY, directory TEXT NOT NULL)')
+        connection.execute("INSERT INTO tracks VALUES ('/music/flac/01.flac', '/music/flac')")
+        connection.commit()
+        connection.close()
+        self.assertEqual(0, LibraryIndex(path).get_track_count())
@@ -0,0 +1,122 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from amu.audio import FlacTagger
+from amu.library import LibraryError, LibraryIndex, LibraryScanner, read_track
+from tests.helpers import write_flac
+
+
+class LibraryScannerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.root = os.path.join(self.directory, 'flac')
+        self.release = os.path.join(self.root, 'Rephlex', 'AFX - Analord 08')
+        os.makedirs(self.release)
+        self.track = os.path.join(self.release, '01 - PWSteal.Ldpinch.D.flac')
+        write_flac(self.track)
+        FlacTagger().add_tags(self.track, artist='AFX', album='Analord 08', title='PWSteal.Ldpinch.D', track_number=1, track_total=4)
+        self.index = LibraryIndex(os.path.join(self.directory, 'index'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _get_tracks(self):
+        connection = sqlite3.connect(self.index.path)
+        try:
+            rows = connection.execute('SELECT path, artist, album, title, track_number, track_total, sample_rate FROM tracks ORDER BY path').fetchall()
+            return [(str(row[0]),) + row[1:] for row in rows]
+        finally:
+            connection.close()
+
+    def test__scan__release_has_a_flac__the_flac_is_indexed(self):
+        result = LibraryScanner(self.index).scan([self.root], workers=1)
+        self.assertEqual(1, result.tracks_indexed)
+        self.assertEqual([(self.track, u'AFX', u'Analord 08', u'PWSteal.Ldpinch.D', 1, 4, 44100)], self._get_tracks())
+
+    def test__scan__directories_have_not_changed__the_directories_are_skipped(self):
+        scanner = LibraryScanner(self.index)
+        scanner.scan([self.root], workers=1)
+        result = scanner.scan([self.root], workers=1)
+        self.assertEqual(0, result.directories_scanned)
+        self.assertEqual(3, result.directories_skipped)
+        self.assertEqual(1, self.index.get_track_count())
+
+    def test__scan__full_scan_of_unchanged_directories__every_directory_is_scanned(self):
+        scanner = LibraryScanner(self.index)
+        scanner.scan([self.root], workers=1)
+        result = scanner.scan([self.root], full=True, workers=1)
+        self.assertEqual(3, result.directories_scanned)
+        self.assertEqual(1, result.tracks_indexed)
+
+    def test__scan__track_added_to_a_directory__only_that_directory_is_scanned(self):
+        scanner = LibraryScanner(self.index)
+        scanner.scan([self.root], workers=1)
+        write_flac(os.path.join(self.release, '02 - Backdoor.Berbew.Q.flac'))
+        os.utime(self.release, (0, os.path.getmtime(self.release) + 10))
+        result = scanner.scan([self.root], workers=1)
+        self.assertEqual(1, result.directories_scanned)
+        self.assertEqual(2, self.index.get_track_count())
+
+    def test__scan__track_retagged_without_changing_its_directory__the_new_tags_are_indexed(self):
+        scanner = LibraryScanner(self.index)
+        os.utime(self.release, (0, 1000000000))
+        scanner.scan([self.root], workers=1)
+        FlacTagger().add_tags(self.track, artist='Aphex Twin')
+        os.utime(self.track, (0, os.path.getmtime(self.track) + 10))
+        os.utime(self.release, (0, 1000000000))
+        result = scanner.scan([self.root], workers=1)
+        self.assertEqual(1, result.directories_scanned)
+        self.assertEqual(2, result.directories_skipped)
+        self.assertEqual(u'Aphex Twin', self._get_tracks()[0][1])
+
+    def test__scan__directory_was_removed__its_tracks_are_removed_from_the_index(self):
+        scanner = LibraryScanner(self.index)
+        scanner.scan([self.root], workers=1)
+        shutil.rmtree(self.release)
+        result = scanner.scan([self.root], workers=1)
+        self.assertEqual(1, result.directories_removed)
+        self.assertEqual(0, self.index.get_track_count())
+
+    def test__scan__track_cannot_be_read__it_is_counted_and_left_out(self):
+        with open(os.path.join(self.release, '02 - Backdoor.Berbew.Q.flac'), 'w') as corrupt_file:
+            corrupt_file.write('not a flac')
+        result = LibraryScanner(self.index).scan([self.root], workers=1)
+        self.assertEqual(1, result.tracks_indexed)
+        self.assertEqual(1, result.unreadable_tracks)
+
+    def test__scan__directory_name_is_not_utf8__its_tracks_are_indexed_with_the_same_path(self):
+        release = os.path.join(self.root, 'Rephlex', 'Analord 09 \xe9')
+        os.makedirs(release)
+        track = os.path.join(release, '01 - Backdoor.Berbew.Q.flac')
+        write_flac(track)
+        result = LibraryScanner(self.index).scan([self.root], workers=1)
+        self.assertEqual(2, result.tracks_indexed)
+        self.assertEqual(0, result.unreadable_tracks)
+        self.assertIn(track, [x[0] for x in self._get_tracks()])
+
+    def test__scan__names_only_differ_in_bytes_that_are_not_utf8__both_tracks_are_indexed(self):
+        write_flac(os.path.join(self.release, '02 - Caf\xe9.flac'))
+        write_flac(os.path.join(self.release, '02 - Caf\xe8.flac'))
+        result = LibraryScanner(self.index).scan([self.root], workers=1)
+        self.assertEqual(3, result.tracks_indexed)
+        self.assertEqual(3, self.index.get_track_count())
+
+    def test__scan__root_does_not_exist__raises_library_error(self):
+        with self.assertRaisesRegexp(LibraryError, 'The release directory .* does not exist.'):
+            LibraryScanner(self.index).scan([os.path.join(self.directory, 'mp3')], workers=1)
+
+    def test__read_track__flac_has_stream_info__the_stream_info_is_read(self):
+        track = read_track(self.track)
+        self.assertEqual('flac', track['format'])
+        self.assertEqual(44100, track['sample_rate'])
+        self.assertEqual('0' * 32, track['md5'])
+        self.assertEqual(os.path.getsize(self.track), track['size'])
+
+    def test__read_track__comment_has_the_label_and_catno__the_label_and_catno_are_read_from_it(self):
+        FlacTagger().add_tags(self.track, comment=u'Rephlex (ANALORD 08)')
+        track = read_track(self.track)
+        self.assertEqual(u'Rephlex', track['label'])
+        self.assertEqual(u'ANALORD 08', track['catno'])
+        self.assertIsNone(track['discogs_id'])
@@ -78,3 +78,17 @@ class MoveAudioFileCommandTest(unittest.TestCase):
         command.destination = '/some/other/mp3/destination/01 - Track 1.mp3'
         with self.assertRaisesRegexp(CommandValidationError, 'The source for the move audio file command cannot be a directory.'):
             command.validate()
+
+    @mock.patch('os.path.exists')
+    @mock.patch('shutil.move')
+    @mock.patch('shutil.copy2')
+    @mock.patch('amu.config.ConfigurationProvider')
+    def test__execute__copy_is_set__file_is_copied_rather_than_moved(self, config_mock, copy_mock, move_mock, exists_mock):
+        exists_mock.return_value = True
+        command = MoveAudioFileCommand(config_mock)
+        command.source = '/some/wav/source/cover.jpg'
+        command.destination = '/some/mp3/destination/cover.jpg'
+        command.copy = True
+        command.execute()
+        copy_mock.assert_called_once_with('/some/wav/source/cover.jpg', '/some/mp3/destination/cover.jpg')
+        self.assertFalse(move_mock.called)
@@ -0,0 +1,47 @@
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+from amu.audio import Mp3Tagger
+from mutagen.id3 import ID3
+
+# A single silent mpeg frame, which is enough for mutagen to treat the file as an mp3.
+MP3_FRAME = '\xff\xfb\x90\x00' + '\x00' * 413
+
+
+class Mp3TaggerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, 'song.mp3')
+        with open(self.source, 'wb') as mp3_file:
+            mp3_file.write(MP3_FRAME * 3)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _add_tags(self, tagger, artist='Aphex Twin'):
+        return tagger.add_tags(
+            self.source, artist=artist, title='Flap Head', track_number=1, track_total=2, disc_number=1, disc_total=1)
+
+    def test__add_tags__mp3_has_no_tag__a_new_tag_is_saved_once(self):
+        with mock.patch.object(ID3, 'save', autospec=True, side_effect=ID3.save) as save_mock:
+            written = self._add_tags(Mp3Tagger())
+        self.assertTrue(written)
+        self.assertEqual(1, save_mock.call_count)
+        self.assertEqual([u'Aphex Twin'], ID3(self.source)['TPE1'].text)
+
+    def test__add_tags__mp3_already_has_the_tags__the_mp3_is_not_saved(self):
+        tagger = Mp3Tagger()
+        self._add_tags(tagger)
+        with mock.patch.object(ID3, 'save', autospec=True) as save_mock:
+            written = self._add_tags(tagger)
+        self.assertFalse(written)
+        self.assertFalse(save_mock.called)
+
+    def test__add_tags__mp3_has_a_different_artist__the_mp3_is_saved(self):
+        tagger = Mp3Tagger()
+        self._add_tags(tagger)
+        written = self._add_tags(tagger, artist='AFX')
+        self.assertTrue(written)
+        self.assertEqual([u'AFX'], ID3(self.source)['TPE1'].text)
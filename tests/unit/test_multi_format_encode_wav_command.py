@@ -0,0 +1,65 @@
+import mock
+import unittest
+from mock import Mock
+from amu.commands import CommandValidationError
+from amu.commands import MultiFormatEncodeWavCommand
+
+
+class MultiFormatEncodeWavCommandTest(unittest.TestCase):
+    @mock.patch('os.remove')
+    @mock.patch('os.path.exists')
+    def test__execute__two_destinations__encoder_is_called_with_all_the_destinations(self, exists_mock, remove_mock):
+        exists_mock.return_value = True
+        config_mock, encoder_mock = (Mock(),)*2
+        command = MultiFormatEncodeWavCommand(config_mock, encoder_mock)
+        command.source = '/some/source.wav'
+        command.destinations = ['/some/mp3/source.mp3', '/some/flac/source.flac']
+        command.execute()
+        encoder_mock.encode.assert_called_once_with('/some/source.wav', ['/some/mp3/source.mp3', '/some/flac/source.flac'])
+
+    @mock.patch('os.remove')
+    @mock.patch('os.path.exists')
+    @mock.patch('os.makedirs')
+    def test__execute__destination_directories_do_not_exist__each_directory_is_created(self, makedirs_mock, exists_mock, remove_mock):
+        exists_mock.return_value = False
+        config_mock, encoder_mock = (Mock(),)*2
+        command = MultiFormatEncodeWavCommand(config_mock, encoder_mock)
+        command.source = '/some/source.wav'
+        command.destinations = ['/some/mp3/source.mp3', '/some/flac/source.flac']
+        command.execute()
+        makedirs_mock.assert_any_call('/some/mp3')
+        makedirs_mock.assert_any_call('/some/flac')
+
+    @mock.patch('os.remove')
+    @mock.patch('os.path.exists')
+    def test__execute__keep_source_is_false__the_source_is_removed_once(self, exists_mock, remove_mock):
+        exists_mock.return_value = True
+        config_mock, encoder_mock = (Mock(),)*2
+        command = MultiFormatEncodeWavCommand(config_mock, encoder_mock)
+        command.source = '/some/source.wav'
+        command.destinations = ['/some/mp3/source.mp3', '/some/flac/source.flac']
+        command.execute()
+        remove_mock.assert_called_once_with('/some/source.wav')
+
+    @mock.patch('os.remove')
+    @mock.patch('os.path.exists')
+    def test__execute__keep_source_is_true__the_source_is_not_removed(self, exists_mock, remove_mock):
+        exists_mock.return_value = True
+        config_mock, encoder_mock = (Mock(),)*2
+        command = MultiFormatEncodeWavCommand(config_mock, encoder_mock)
+        command.source = '/some/source.wav'
+        command.destinations = ['/some/mp3/source.mp3', '/some/flac/source.flac']
+        command.keep_source = True
+        command.execute()
+        self.assertFalse(remove_mock.called)
+
+    @mock.patch('os.path.isdir')
+    @mock.patch('os.path.exists')
+    def test__validate__no_destinations__raises_command_validation_error(self, exists_mock, isdir_mock):
+        exists_mock.return_value = True
+        isdir_mock.return_value = False
+        config_mock, encoder_mock = (Mock(),)*2
+        command = MultiFormatEncodeWavCommand(config_mock, encoder_mock)
+        command.source = '/some/source.wav'
+        with self.assertRaisesRegexp(CommandValidationError, 'At least one destination must be specified for encoding a wav'):
+            command.validate()
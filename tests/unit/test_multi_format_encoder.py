@@ -0,0 +1,117 @@
+import mock
+import subprocess
+import unittest
+from StringIO import StringIO
+from mock import Mock
+from amu.audio import EncoderError, FlacEncoder, LameEncoder, MultiFormatEncoder
+from amu.config import ConfigurationError
+
+
+class MultiFormatEncoderTest(unittest.TestCase):
+    def _get_config_mock(self):
+        config_mock = Mock(autospec=True)
+        config_mock.get_lame_path.return_value = 'lame'
+        config_mock.get_lame_encoding_setting.return_value = '-V0'
+        config_mock.get_flac_path.return_value = 'flac'
+        config_mock.get_flac_encoding_setting.return_value = '-8'
+        return config_mock
+
+    def _get_process_mock(self, return_code=0):
+        process_mock = Mock()
+        process_mock.stdin = Mock()
+        process_mock.stdout.readline = lambda: ''
+        process_mock.wait.return_value = return_code
+        return process_mock
+
+    @mock.patch('amu.audio.open', create=True)
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.path.isdir')
+    @mock.patch('os.path.exists')
+    def test__encode__mp3_and_flac__each_encoder_reads_from_stdin(self, exists_mock, isdir_mock, popen_mock, open_mock):
+        exists_mock.return_value = True
+        isdir_mock.return_value = False
+        open_mock.return_value = mock.MagicMock()
+        open_mock.return_value.__enter__.return_value = StringIO('')
+        popen_mock.side_effect = [self._get_process_mock(), self._get_process_mock()]
+        config_mock = self._get_config_mock()
+        encoder = MultiFormatEncoder([LameEncoder(config_mock), FlacEncoder(config_mock)])
+        encoder.encode('/some/path/source.wav', ['/some/mp3/source.mp3', '/some/flac/source.flac'])
+        self.assertEqual(['lame', '-V0', '-', '/some/mp3/source.mp3'], popen_mock.call_args_list[0][0][0])
+        self.assertEqual(['flac', '-8', '-', '--output-name=/some/flac/source.flac'], popen_mock.call_args_list[1][0][0])
+        self.assertEqual(subprocess.PIPE, popen_mock.call_args_list[0][1]['stdin'])
+
+    @mock.patch('amu.audio.open', create=True)
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.path.isdir')
+    @mock.patch('os.path.exists')
+    def test__encode__mp3_and_flac__the_wav_data_is_written_to_every_encoder(self, exists_mock, isdir_mock, popen_mock, open_mock):
+        exists_mock.return_value = True
+        isdir_mock.return_value = False
+        open_mock.return_value = mock.MagicMock()
+        open_mock.return_value.__enter__.return_value = StringIO('RIFF wav data')
+        lame_process = self._get_process_mock()
+        flac_process = self._get_process_mock()
+        popen_mock.side_effect = [lame_process, flac_process]
+        config_mock = self._get_config_mock()
+        encoder = MultiFormatEncoder([LameEncoder(config_mock), FlacEncoder(config_mock)])
+        encoder.encode('/some/path/source.wav', ['/some/mp3/source.mp3', '/some/flac/source.flac'])
+        lame_process.stdin.write.assert_called_once_with('RIFF wav data')
+        flac_process.stdin.write.assert_called_once_with('RIFF wav data')
+        lame_process.stdin.close.assert_called_once_with()
+        flac_process.stdin.close.assert_called_once_with()
+
+    @mock.patch('amu.audio.open', create=True)
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.path.isdir')
+    @mock.patch('os.path.exists')
+    def test__encode__one_encoder_fails__raises_encoder_error(self, exists_mock, isdir_mock, popen_mock, open_mock):
+        exists_mock.return_value = True
+        isdir_mock.return_value = False
+        open_mock.return_value = mock.MagicMock()
+        open_mock.return_value.__enter__.return_value = StringIO('RIFF wav data')
+        popen_mock.side_effect = [self._get_process_mock(), self._get_process_mock(1)]
+        config_mock = self._get_config_mock()
+        encoder = MultiFormatEncoder([LameEncoder(config_mock), FlacEncoder(config_mock)])
+        with self.assertRaisesRegexp(EncoderError, 'Encoding /some/path/source.wav failed for /some/flac/source.flac.'):
+            encoder.encode('/some/path/source.wav', ['/some/mp3/source.mp3', '/some/flac/source.flac'])
+
+    @mock.patch('amu.audio.open', create=True)
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.path.isdir')
+    @mock.patch('os.path.exists')
+    def test__encode__encoders_report_progress__the_progress_of_each_encoder_is_reported(self, exists_mock, isdir_mock, popen_mock, open_mock):
+        exists_mock.return_value = True
+        isdir_mock.return_value = False
+        open_mock.return_value = mock.MagicMock()
+        open_mock.return_value.__enter__.return_value = StringIO('RIFF wav data')
+        lame_process = self._get_process_mock()
+        lame_process.stdout = StringIO('  1500/9327  (16%)|    0:00/    0:03|    0:00/    0:03|   42.617x|    0:02\n')
+        flac_process = self._get_process_mock()
+        flac_process.stdout = StringIO('-: 45% complete, ratio=0.612\n')
+        popen_mock.side_effect = [lame_process, flac_process]
+        config_mock = self._get_config_mock()
+        # The encoders report from their own threads, so each one gets its own reporter.
+        lame_reporter_mock, flac_reporter_mock = (Mock(), Mock())
+        encoder = MultiFormatEncoder([LameEncoder(config_mock, lame_reporter_mock), FlacEncoder(config_mock, flac_reporter_mock)])
+        encoder.encode('/some/path/source.wav', ['/some/mp3/source.mp3', '/some/flac/source.flac'])
+        lame_reporter_mock.start.assert_called_once_with('/some/path/source.wav', '/some/mp3/source.mp3')
+        flac_reporter_mock.start.assert_called_once_with('/some/path/source.wav', '/some/flac/source.flac')
+        self.assertEqual(16, lame_reporter_mock.start.return_value.update.call_args[0][0].percent)
+        self.assertEqual(45, flac_reporter_mock.start.return_value.update.call_args[0][0].percent)
+        lame_reporter_mock.start.return_value.finish.assert_called_once_with()
+        flac_reporter_mock.start.return_value.finish.assert_called_once_with()
+        self.assertTrue(popen_mock.call_args_list[0][1]['universal_newlines'])
+
+    def test__encode__number_of_destinations_is_different_to_the_number_of_encoders__raises_value_error(self):
+        config_mock = self._get_config_mock()
+        encoder = MultiFormatEncoder([LameEncoder(config_mock), FlacEncoder(config_mock)])
+        with self.assertRaisesRegexp(ValueError, 'A destination must be supplied for each encoder'):
+            encoder.encode('/some/path/source.wav', ['/some/mp3/source.mp3'])
+
+    @mock.patch('os.path.exists')
+    def test__encode__source_is_non_existent__raises_configuration_error(self, exists_mock):
+        exists_mock.return_value = False
+        config_mock = self._get_config_mock()
+        encoder = MultiFormatEncoder([LameEncoder(config_mock), FlacEncoder(config_mock)])
+        with self.assertRaisesRegexp(ConfigurationError, 'The source to encode does not exist'):
+            encoder.encode('/some/path/source.wav', ['/some/mp3/source.mp3', '/some/flac/source.flac'])
@@ -0,0 +1,95 @@
+import mock
+import subprocess
+import unittest
+from StringIO import StringIO
+from mock import Mock
+from amu.audio import EncoderError, FlacEncoder, LameEncoder, PipeTranscoder
+from amu.config import ConfigurationError
+
+
+class PipeTranscoderTest(unittest.TestCase):
+    def _get_config_mock(self):
+        config_mock = Mock(autospec=True)
+        config_mock.get_lame_path.return_value = 'lame'
+        config_mock.get_lame_encoding_setting.return_value = '-V0'
+        config_mock.get_flac_path.return_value = 'flac'
+        config_mock.get_flac_decode_setting.return_value = '-d'
+        return config_mock
+
+    def _get_process_mock(self, return_code=0):
+        process_mock = Mock()
+        process_mock.stdout.readline = lambda: ''
+        process_mock.wait.return_value = return_code
+        return process_mock
+
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.path.isdir')
+    @mock.patch('os.path.exists')
+    def test__transcode__flac_to_mp3__flac_output_is_piped_into_lame(self, exists_mock, isdir_mock, popen_mock):
+        exists_mock.return_value = True
+        isdir_mock.return_value = False
+        flac_process = self._get_process_mock()
+        lame_process = self._get_process_mock()
+        popen_mock.side_effect = [flac_process, lame_process]
+        config_mock = self._get_config_mock()
+        transcoder = PipeTranscoder(FlacEncoder(config_mock), LameEncoder(config_mock))
+        transcoder.transcode('/some/path/source.flac', '/some/path/destination.mp3')
+        popen_mock.assert_any_call(
+            ['flac', '-d', '--stdout', '--silent', '/some/path/source.flac'], stdout=subprocess.PIPE)
+        popen_mock.assert_any_call(
+            ['lame', '-V0', '-', '/some/path/destination.mp3'],
+            stdin=flac_process.stdout, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        flac_process.stdout.close.assert_called_once_with()
+
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.path.isdir')
+    @mock.patch('os.path.exists')
+    def test__transcode__lame_reports_progress__the_progress_is_reported(self, exists_mock, isdir_mock, popen_mock):
+        exists_mock.return_value = True
+        isdir_mock.return_value = False
+        lame_process = self._get_process_mock()
+        lame_process.stdout = StringIO('  1500/9327  (16%)|    0:00/    0:03|    0:00/    0:03|   42.617x|    0:02\n')
+        popen_mock.side_effect = [self._get_process_mock(), lame_process]
+        config_mock = self._get_config_mock()
+        reporter_mock = Mock()
+        transcoder = PipeTranscoder(FlacEncoder(config_mock), LameEncoder(config_mock, reporter_mock))
+        transcoder.transcode('/some/path/source.flac', '/some/path/destination.mp3')
+        reporter_mock.start.assert_called_once_with('/some/path/source.flac', '/some/path/destination.mp3')
+        self.assertEqual(16, reporter_mock.start.return_value.update.call_args[0][0].percent)
+        reporter_mock.start.return_value.finish.assert_called_once_with()
+
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.path.isdir')
+    @mock.patch('os.path.exists')
+    def test__transcode__decoder_fails__raises_encoder_error(self, exists_mock, isdir_mock, popen_mock):
+        exists_mock.return_value = True
+        isdir_mock.return_value = False
+        popen_mock.side_effect = [self._get_process_mock(1), self._get_process_mock()]
+        config_mock = self._get_config_mock()
+        transcoder = PipeTranscoder(FlacEncoder(config_mock), LameEncoder(config_mock))
+        with self.assertRaisesRegexp(EncoderError, 'Transcoding /some/path/source.flac to /some/path/destination.mp3 failed.'):
+            transcoder.transcode('/some/path/source.flac', '/some/path/destination.mp3')
+
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.path.isdir')
+    @mock.patch('os.path.exists')
+    def test__transcode__encoder_fails__raises_encoder_error(self, exists_mock, isdir_mock, popen_mock):
+        exists_mock.return_value = True
+        isdir_mock.return_value = False
+        popen_mock.side_effect = [self._get_process_mock(), self._get_process_mock(1)]
+        config_mock = self._get_config_mock()
+        transcoder = PipeTranscoder(FlacEncoder(config_mock), LameEncoder(config_mock))
+        with self.assertRaisesRegexp(EncoderError, 'Transcoding /some/path/source.flac to /some/path/destination.mp3 failed.'):
+            transcoder.transcode('/some/path/source.flac', '/some/path/destination.mp3')
+
+    def test__transcode__source_is_empty__raises_value_error(self):
+        transcoder = PipeTranscoder(Mock(), Mock())
+        with self.assertRaisesRegexp(ValueError, 'A value must be supplied for the source'):
+            transcoder.transcode('', '/some/path/destination.mp3')
+
+    @mock.patch('os.path.exists')
+    def test__transcode__source_is_non_existent__raises_configuration_error(self, exists_mock):
+        exists_mock.return_value = False
+        transcoder = PipeTranscoder(Mock(), Mock())
+        with self.assertRaisesRegexp(ConfigurationError, 'The source to transcode does not exist'):
+            transcoder.transcode('/some/path/source.flac', '/some/path/destination.mp3')
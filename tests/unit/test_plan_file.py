@@ -0,0 +1,71 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from mock import Mock
+from amu.commands import EncodeWavCommand
+from amu.plan import PlanError
+from amu.plan import PlanFile
+from amu.serialization import CommandSerializer
+
+
+class PlanFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'encode.plan')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test__write__commands_are_planned__serialized_commands_are_written_with_the_arguments(self):
+        serializer_mock = Mock()
+        serializer_mock.serialize.return_value = [{'type': 'EncodeWavCommand', 'properties': {}, 'dependencies': []}]
+        commands = [Mock()]
+        plan = PlanFile(self.path, serializer_mock)
+        plan.write(['encode', 'wav', 'mp3'], commands)
+        serializer_mock.serialize.assert_called_once_with(commands, absolute_paths=True)
+        with open(self.path, 'r') as plan_file:
+            written_plan = json.load(plan_file)
+        self.assertEqual(['encode', 'wav', 'mp3'], written_plan['argv'])
+        self.assertEqual('EncodeWavCommand', written_plan['commands'][0]['type'])
+
+    def test__read__plan_was_written_with_relative_paths__the_paths_are_absolute(self):
+        command = EncodeWavCommand(Mock(), Mock())
+        command.source = '01 - Caf\xe9.wav'
+        command.destination = os.path.join('mp3', '01 - Caf\xe9.mp3')
+        serializer = CommandSerializer(Mock(), Mock(), Mock())
+        plan = PlanFile(self.path, serializer)
+        plan.write(['encode', 'wav', 'mp3', '--source=01 - Caf\xe9.wav'], [command])
+        result = plan.read()[0]
+        self.assertEqual(os.path.join(os.getcwd(), '01 - Caf\xe9.wav'), result.source)
+        self.assertEqual(os.path.join(os.getcwd(), 'mp3', '01 - Caf\xe9.mp3'), result.destination)
+
+    def test__read__plan_was_written__commands_are_deserialized(self):
+        serializer_mock = Mock()
+        states = [{'type': 'EncodeWavCommand', 'properties': {}, 'dependencies': []}]
+        serializer_mock.serialize.return_value = states
+        plan = PlanFile(self.path, serializer_mock)
+        plan.write(['encode', 'wav', 'mp3'], [Mock()])
+        commands = plan.read()
+        serializer_mock.deserialize.assert_called_once_with(states)
+        self.assertEqual(serializer_mock.deserialize.return_value, commands)
+
+    def test__read__plan_does_not_exist__raises_plan_error(self):
+        plan = PlanFile(self.path, Mock())
+        with self.assertRaisesRegexp(PlanError, 'could not be read'):
+            plan.read()
+
+    def test__read__plan_is_not_json__raises_plan_error(self):
+        with open(self.path, 'w') as plan_file:
+            plan_file.write('{"commands": ')
+        plan = PlanFile(self.path, Mock())
+        with self.assertRaisesRegexp(PlanError, 'is not valid JSON'):
+            plan.read()
+
+    def test__read__plan_is_from_a_different_version__raises_plan_error(self):
+        with open(self.path, 'w') as plan_file:
+            json.dump({'version': 0, 'argv': [], 'commands': []}, plan_file)
+        plan = PlanFile(self.path, Mock())
+        with self.assertRaisesRegexp(PlanError, 'is not a version 1 plan'):
+            plan.read()
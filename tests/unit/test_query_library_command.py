@@ -0,0 +1,105 @@
+import base64
+import json
+import mock
+import unittest
+from mock import Mock
+from amu.commands import CommandValidationError
+from amu.commands import QueryLibraryCommand
+from tests.helpers import captured_output
+
+
+class QueryLibraryCommandTest(unittest.TestCase):
+    @mock.patch('os.path.exists')
+    def test__validate__index_does_not_exist__raises_command_validation_error(self, exists_mock):
+        exists_mock.return_value = False
+        index_mock = Mock()
+        index_mock.path = '/home/user/.amu_library_index'
+        command = QueryLibraryCommand(Mock(), index_mock)
+        with self.assertRaisesRegexp(CommandValidationError, 'The library index /home/user/.amu_library_index does not exist.'):
+            command.validate()
+
+    @mock.patch('os.path.exists')
+    def test__validate__year_is_not_an_integer__raises_command_validation_error(self, exists_mock):
+        exists_mock.return_value = True
+        command = QueryLibraryCommand(Mock(), Mock())
+        command.year = 'nineties'
+        with self.assertRaisesRegexp(CommandValidationError, 'The query must use a valid integer for the year.'):
+            command.validate()
+
+    @mock.patch('os.path.exists')
+    def test__validate__format_is_the_same_as_without_format__raises_command_validation_error(self, exists_mock):
+        exists_mock.return_value = True
+        command = QueryLibraryCommand(Mock(), Mock())
+        command.format = 'mp3'
+        command.without_format = 'mp3'
+        with self.assertRaisesRegexp(CommandValidationError, 'The query cannot be for tracks in mp3 without mp3.'):
+            command.validate()
+
+    @mock.patch('os.path.exists')
+    def test__validate__min_duration_is_longer_than_max_duration__raises_command_validation_error(self, exists_mock):
+        exists_mock.return_value = True
+        command = QueryLibraryCommand(Mock(), Mock())
+        command.min_duration = 300.0
+        command.max_duration = 60.0
+        with self.assertRaisesRegexp(CommandValidationError, 'The minimum duration cannot be longer than the maximum duration.'):
+            command.validate()
+
+    def test__execute__filters_are_set__the_query_has_the_filters(self):
+        index_mock = Mock()
+        index_mock.find_track_paths.return_value = []
+        command = QueryLibraryCommand(Mock(), index_mock)
+        command.artist = 'Autechre'
+        command.format = 'flac'
+        command.min_duration = 60.0
+        with captured_output():
+            command.execute()
+        query = index_mock.find_track_paths.call_args[0][0]
+        self.assertEqual('Autechre', query.artist)
+        self.assertEqual('flac', query.format)
+        self.assertEqual(60.0, query.min_duration)
+        self.assertIsNone(query.label)
+
+    def test__execute__paths_are_found__each_path_is_printed_on_a_line(self):
+        index_mock = Mock()
+        index_mock.find_track_paths.return_value = ['/music/flac/01 - Bine.flac', '/music/flac/02 - Sim Gishel.flac']
+        command = QueryLibraryCommand(Mock(), index_mock)
+        with captured_output() as (out, _):
+            command.execute()
+        self.assertEqual('/music/flac/01 - Bine.flac\n/music/flac/02 - Sim Gishel.flac\n', out.getvalue())
+
+    def test__execute__json_output_is_used__each_track_is_printed_as_a_line_of_json(self):
+        index_mock = Mock()
+        index_mock.find_tracks.return_value = [{'path': '/music/flac/01 - Bine.flac', 'artist': u'Autechre'}]
+        command = QueryLibraryCommand(Mock(), index_mock)
+        command.output_json = True
+        with captured_output() as (out, _):
+            command.execute()
+        self.assertEqual({'path': u'/music/flac/01 - Bine.flac', 'artist': u'Autechre'}, json.loads(out.getvalue()))
+
+    def test__execute__releases_are_used__the_directory_of_each_release_is_printed(self):
+        index_mock = Mock()
+        index_mock.find_releases.return_value = [{'directory': '/music/mp3/Warp/Autechre - Confield', 'format': 'mp3'}]
+        command = QueryLibraryCommand(Mock(), index_mock)
+        command.releases = True
+        with captured_output() as (out, _):
+            command.execute()
+        self.assertEqual('/music/mp3/Warp/Autechre - Confield\n', out.getvalue())
+
+    def test__execute__path_is_not_utf8__the_path_is_printed_as_it_is_on_disk(self):
+        index_mock = Mock()
+        index_mock.find_track_paths.return_value = ['/music/flac/01 - Caf\xe9.flac']
+        command = QueryLibraryCommand(Mock(), index_mock)
+        with captured_output() as (out, _):
+            command.execute()
+        self.assertEqual('/music/flac/01 - Caf\xe9.flac\n', out.getvalue())
+
+    def test__execute__json_output_and_path_is_not_utf8__the_path_is_written_as_base64(self):
+        index_mock = Mock()
+        index_mock.find_tracks.return_value = [{'path': '/music/flac/01 - Caf\xe9.flac', 'directory': '/music/flac'}]
+        command = QueryLibraryCommand(Mock(), index_mock)
+        command.output_json = True
+        with captured_output() as (out, _):
+            command.execute()
+        track = json.loads(out.getvalue())
+        self.assertEqual('/music/flac/01 - Caf\xe9.flac', base64.b64decode(track['path']['bytes']))
+        self.assertEqual(u'/music/flac', track['directory'])
@@ -0,0 +1,47 @@
+import mock
+import unittest
+from mock import Mock
+from amu.ratelimit import RateLimitedFetcher
+
+
+class RateLimitedFetcherTest(unittest.TestCase):
+    def _get_response(self, status_code, headers=None):
+        response = Mock()
+        response.status_code = status_code
+        response.content = '{}'
+        response.headers = headers if headers else {}
+        return response
+
+    @mock.patch('amu.ratelimit.requests.request')
+    def test__fetch__request_is_made__a_token_is_acquired_first(self, request_mock):
+        request_mock.return_value = self._get_response(200)
+        bucket_mock = Mock()
+        fetcher = RateLimitedFetcher(bucket_mock)
+        self.assertEqual(('{}', 200), fetcher.fetch(None, 'GET', 'https://api.discogs.com/releases/1'))
+        bucket_mock.acquire.assert_called_once_with()
+
+    @mock.patch('amu.ratelimit.requests.request')
+    def test__fetch__response_has_remaining_header__bucket_tokens_are_limited(self, request_mock):
+        request_mock.return_value = self._get_response(200, {'X-Discogs-Ratelimit-Remaining': '3'})
+        bucket_mock = Mock()
+        fetcher = RateLimitedFetcher(bucket_mock)
+        fetcher.fetch(None, 'GET', 'https://api.discogs.com/releases/1')
+        bucket_mock.limit_tokens.assert_called_once_with(3)
+
+    @mock.patch('amu.ratelimit.requests.request')
+    def test__fetch__server_responds_with_429__backs_off_and_retries(self, request_mock):
+        request_mock.side_effect = [self._get_response(429, {'Retry-After': '10'}), self._get_response(200)]
+        bucket_mock = Mock()
+        fetcher = RateLimitedFetcher(bucket_mock)
+        self.assertEqual(('{}', 200), fetcher.fetch(None, 'GET', 'https://api.discogs.com/releases/1'))
+        bucket_mock.back_off.assert_called_once_with(10.0)
+        self.assertEqual(2, bucket_mock.acquire.call_count)
+
+    @mock.patch('amu.ratelimit.requests.request')
+    def test__fetch__server_keeps_responding_with_429__response_is_returned_after_retries(self, request_mock):
+        request_mock.return_value = self._get_response(429)
+        bucket_mock = Mock()
+        fetcher = RateLimitedFetcher(bucket_mock, max_retries=2)
+        self.assertEqual(('{}', 429), fetcher.fetch(None, 'GET', 'https://api.discogs.com/releases/1'))
+        self.assertEqual(3, request_mock.call_count)
+        bucket_mock.back_off.assert_called_with(60)
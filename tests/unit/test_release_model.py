@@ -331,3 +331,45 @@ class ReleaseModelTest(unittest.TestCase):
             tracklist_start_pos = output.find('Tracklist:')
             count = output.count('\n', tracklist_start_pos)
             self.assertEqual(6, count)
+
+    def test__to_dict__release_has_original_release__original_release_is_included(self):
+        original_release = ReleaseModel()
+        original_release.discogs_id = 1234
+        original_release.year = '1969'
+        release = ReleaseModel()
+        release.discogs_id = 792244
+        release.artist = 'Can'
+        release.year = '1979'
+        release.original_release = original_release
+        release.add_track_directly('Can', 'Father Cannot Yell', 1, 4, 1, 1)
+        release_dict = release.to_dict()
+        self.assertEqual(792244, release_dict['discogs_id'])
+        self.assertEqual('1969', release_dict['original_release']['year'])
+        self.assertIsNone(release_dict['original_release']['original_release'])
+        self.assertEqual(
+            {'artist': 'Can', 'title': 'Father Cannot Yell', 'track_number': 1, 'track_total': 4, 'disc_number': 1, 'disc_total': 1},
+            release_dict['tracks'][0])
+
+    def test__from_bytes__release_was_converted_with_to_bytes__release_is_the_same(self):
+        original_release = ReleaseModel()
+        original_release.discogs_id = 1234
+        original_release.label = 'Liberty'
+        release = ReleaseModel()
+        release.discogs_id = 792244
+        release.artist = u'Can'
+        release.title = u'Monster Movie'
+        release.format_quantity = 1
+        release.original_release = original_release
+        release.add_track_directly(None, u'Yoo Doo Right: Part 1', 1, 4, 1, 1)
+        loaded_release = ReleaseModel.from_bytes(release.to_bytes())
+        self.assertEqual(release.to_dict(), loaded_release.to_dict())
+
+    def test__from_bytes__data_is_from_a_different_version__value_error_is_thrown(self):
+        data = ReleaseModel().to_bytes()
+        with self.assertRaisesRegexp(ValueError, 'The release model is not in version'):
+            ReleaseModel.from_bytes(chr(ord(data[0]) + 1) + data[1:])
+
+    def test__from_bytes__data_is_corrupt__value_error_is_thrown(self):
+        data = ReleaseModel().to_bytes()
+        with self.assertRaisesRegexp(ValueError, 'The release model could not be loaded'):
+            ReleaseModel.from_bytes(data[:5])
@@ -0,0 +1,77 @@
+import json
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+from amu.ratelimit import SharedTokenBucket
+
+
+class SharedTokenBucketTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'rate_limit')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _read_state(self):
+        with open(self.path, 'r') as state_file:
+            return json.load(state_file)
+
+    @mock.patch('amu.ratelimit.time.sleep')
+    @mock.patch('amu.ratelimit.time.time')
+    def test__acquire__bucket_has_tokens__does_not_wait(self, time_mock, sleep_mock):
+        time_mock.return_value = 1000.0
+        bucket = SharedTokenBucket(self.path, 1.0, 5)
+        bucket.acquire()
+        self.assertFalse(sleep_mock.called)
+        self.assertEqual(4, self._read_state()['tokens'])
+
+    @mock.patch('amu.ratelimit.time.sleep')
+    @mock.patch('amu.ratelimit.time.time')
+    def test__acquire__bucket_is_empty__waits_for_a_token(self, time_mock, sleep_mock):
+        clock = [1000.0]
+        time_mock.side_effect = lambda: clock[0]
+        sleep_mock.side_effect = lambda seconds: clock.__setitem__(0, clock[0] + seconds)
+        bucket = SharedTokenBucket(self.path, 0.5, 1)
+        bucket.acquire()
+        bucket.acquire()
+        sleep_mock.assert_called_once_with(2.0)
+
+    @mock.patch('amu.ratelimit.time.sleep')
+    @mock.patch('amu.ratelimit.time.time')
+    def test__acquire__another_bucket_uses_the_same_file__tokens_are_shared(self, time_mock, sleep_mock):
+        time_mock.return_value = 1000.0
+        SharedTokenBucket(self.path, 1.0, 2).acquire()
+        SharedTokenBucket(self.path, 1.0, 2).acquire()
+        self.assertEqual(0, self._read_state()['tokens'])
+
+    @mock.patch('amu.ratelimit.time.sleep')
+    @mock.patch('amu.ratelimit.time.time')
+    def test__acquire__bucket_has_backed_off__waits_until_the_back_off_ends(self, time_mock, sleep_mock):
+        clock = [1000.0]
+        time_mock.side_effect = lambda: clock[0]
+        sleep_mock.side_effect = lambda seconds: clock.__setitem__(0, clock[0] + seconds)
+        bucket = SharedTokenBucket(self.path, 1.0, 5)
+        bucket.back_off(30)
+        bucket.acquire()
+        sleep_mock.assert_any_call(30.0)
+
+    @mock.patch('amu.ratelimit.time.time')
+    def test__limit_tokens__server_has_fewer_requests_remaining__tokens_are_reduced(self, time_mock):
+        time_mock.return_value = 1000.0
+        bucket = SharedTokenBucket(self.path, 1.0, 5)
+        bucket.limit_tokens(2)
+        self.assertEqual(2, self._read_state()['tokens'])
+
+    @mock.patch('amu.ratelimit.time.sleep')
+    @mock.patch('amu.ratelimit.time.time')
+    def test__acquire__state_file_is_corrupt__bucket_starts_full(self, time_mock, sleep_mock):
+        time_mock.return_value = 1000.0
+        with open(self.path, 'w') as state_file:
+            state_file.write('{"tokens": ')
+        bucket = SharedTokenBucket(self.path, 1.0, 5)
+        bucket.acquire()
+        self.assertFalse(sleep_mock.called)
+        self.assertEqual(4, self._read_state()['tokens'])
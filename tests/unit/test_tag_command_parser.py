@@ -2836,3 +2836,19 @@ class TagCommandParserTest(unittest.TestCase):
         self.assertEqual('/some/path/to/mp3s/cd2/02 - Track 2.mp3', commands[5].source)
         self.assertEqual('/some/path/to/mp3s/cd2/03 - Track 3.mp3', commands[6].source)
         self.assertEqual('/some/path/to/mp3s/cd2/04 - Track 4.mp3', commands[7].source)
+
+    @mock.patch('os.path.isfile')
+    @mock.patch('os.walk')
+    def test__iter_remove_tag_commands__source_is_directory__the_directory_is_walked_as_commands_are_taken(self, walk_mock, isfile_mock):
+        isfile_mock.return_value = False
+        walked = []
+        def walk(source):
+            for root in ['/some/path/CD1', '/some/path/CD2']:
+                walked.append(root)
+                yield (root, [], ['01 - Track 1.mp3', '02 - Track 2.mp3'])
+        walk_mock.side_effect = walk
+        parser = TagCommandParser(Mock(), Mock(), 'mp3')
+        commands = parser.iter_remove_tag_commands('/some/path')
+        self.assertEqual('/some/path/CD1/01 - Track 1.mp3', next(commands).source)
+        self.assertEqual(['/some/path/CD1'], walked)
+        self.assertEqual(3, len(list(commands)))
@@ -0,0 +1,29 @@
+import unittest
+from amu.audio import get_padding_function
+from mock import Mock
+
+
+class TagPaddingTest(unittest.TestCase):
+    def test__get_padding__tag_fits_in_the_existing_padding__the_existing_padding_is_kept(self):
+        get_padding = get_padding_function(64 * 1024, 300000)
+        info = Mock()
+        info.padding = 1024
+        self.assertEqual(1024, get_padding(info))
+
+    def test__get_padding__tag_exactly_fills_the_existing_padding__no_padding_is_added(self):
+        get_padding = get_padding_function(64 * 1024)
+        info = Mock()
+        info.padding = 0
+        self.assertEqual(0, get_padding(info))
+
+    def test__get_padding__tag_has_outgrown_the_padding__the_headroom_is_reserved(self):
+        get_padding = get_padding_function(64 * 1024)
+        info = Mock()
+        info.padding = -10
+        self.assertEqual(64 * 1024, get_padding(info))
+
+    def test__get_padding__tag_with_artwork_has_outgrown_the_padding__the_headroom_and_artwork_size_are_reserved(self):
+        get_padding = get_padding_function(64 * 1024, 300000)
+        info = Mock()
+        info.padding = -300000
+        self.assertEqual(64 * 1024 + 300000, get_padding(info))
@@ -0,0 +1,53 @@
+import mock
+import unittest
+from amu.commands import CommandValidationError
+from amu.commands import TranscodeAudioCommand
+from mock import Mock
+
+
+class TranscodeAudioCommandTest(unittest.TestCase):
+    def test__validate__source_is_empty__raises_value_error(self):
+        with self.assertRaisesRegexp(ValueError, 'A source must be specified for transcoding an audio file'):
+            config_mock, transcoder_mock = (Mock(),)*2
+            command = TranscodeAudioCommand(config_mock, transcoder_mock)
+            command.destination = '/some/destination'
+            command.validate()
+
+    def test__validate__destination_is_empty__raises_value_error(self):
+        with self.assertRaisesRegexp(ValueError, 'A destination must be specified for transcoding an audio file'):
+            config_mock, transcoder_mock = (Mock(),)*2
+            command = TranscodeAudioCommand(config_mock, transcoder_mock)
+            command.source = '/some/source'
+            command.validate()
+
+    @mock.patch('os.path.exists')
+    def test__validate__source_is_non_existent__raises_command_validation_error(self, path_exists_mock):
+        path_exists_mock.return_value = False
+        with self.assertRaisesRegexp(CommandValidationError, 'The specified source does not exist.'):
+            config_mock, transcoder_mock = (Mock(),)*2
+            command = TranscodeAudioCommand(config_mock, transcoder_mock)
+            command.source = '/some/source'
+            command.destination = '/some/destination'
+            command.validate()
+
+    @mock.patch('os.path.exists')
+    @mock.patch('os.makedirs')
+    def test__execute__transcoder_called_correctly__is_called_with_correct_arguments(self, makedirs_mock, path_exists_mock):
+        path_exists_mock.return_value = True
+        config_mock, transcoder_mock = (Mock(),)*2
+        command = TranscodeAudioCommand(config_mock, transcoder_mock)
+        command.source = '/some/source.flac'
+        command.destination = '/some/destination.mp3'
+        command.execute()
+        transcoder_mock.transcode.assert_called_once_with('/some/source.flac', '/some/destination.mp3')
+
+    @mock.patch('os.path.exists')
+    @mock.patch('os.makedirs')
+    def test__execute__destination_directory_does_not_exist__destination_directory_is_created(self, makedirs_mock, path_exists_mock):
+        path_exists_mock.return_value = False
+        config_mock, transcoder_mock = (Mock(),)*2
+        command = TranscodeAudioCommand(config_mock, transcoder_mock)
+        command.source = '/some/source.flac'
+        command.destination = '/some/destination/with/sub/directories/track.mp3'
+        command.execute()
+        makedirs_mock.assert_called_once_with('/some/destination/with/sub/directories')
@@ -0,0 +1,125 @@
+import mock
+import unittest
+from mock import Mock
+from amu.commands import AddTagCommand
+from amu.commands import TranscodeAudioCommand
+from amu.parsing import CommandParsingError
+from amu.parsing import TranscodeCommandParser
+
+
+class TranscodeCommandParserTest(unittest.TestCase):
+    def _get_tags(self, track_number=1, track_total=2, disc_number=0, disc_total=0):
+        return {
+            'artist': 'Aphex Twin',
+            'album_artist': 'Aphex Twin',
+            'album': 'Drukqs',
+            'title': 'Jynweythek',
+            'year': '2001',
+            'genre': 'Electronic',
+            'comment': 'Warp Records (WARPCD92)',
+            'track_number': track_number,
+            'track_total': track_total,
+            'disc_number': disc_number,
+            'disc_total': disc_total
+        }
+
+    @mock.patch('os.path.exists')
+    @mock.patch('os.path.isfile')
+    def test__parse_transcode_command__source_is_file__returns_transcode_and_tag_commands(self, isfile_mock, exists_mock):
+        isfile_mock.return_value = True
+        exists_mock.return_value = True
+        config_mock, transcoder_mock, source_tagger_mock, destination_tagger_mock = (Mock(),)*4
+        source_tagger_mock.get_tags.return_value = self._get_tags()
+        parser = TranscodeCommandParser(config_mock, transcoder_mock, source_tagger_mock, destination_tagger_mock)
+        commands = parser.parse_transcode_command('/some/source.flac', '/some/destination.mp3')
+        self.assertEqual(2, len(commands))
+        self.assertIsInstance(commands[0], TranscodeAudioCommand)
+        self.assertEqual('/some/source.flac', commands[0].source)
+        self.assertEqual('/some/destination.mp3', commands[0].destination)
+        self.assertEqual([], commands[0].dependencies)
+        self.assertIsInstance(commands[1], AddTagCommand)
+        self.assertEqual([commands[0]], commands[1].dependencies)
+
+    @mock.patch('os.path.exists')
+    @mock.patch('os.path.isfile')
+    def test__parse_transcode_command__source_is_file__tags_are_copied_from_the_flac(self, isfile_mock, exists_mock):
+        isfile_mock.return_value = True
+        exists_mock.return_value = True
+        config_mock, transcoder_mock, source_tagger_mock, destination_tagger_mock = (Mock(),)*4
+        source_tagger_mock.get_tags.return_value = self._get_tags()
+        parser = TranscodeCommandParser(config_mock, transcoder_mock, source_tagger_mock, destination_tagger_mock)
+        command = parser.parse_transcode_command('/some/source.flac', '/some/destination.mp3')[1]
+        source_tagger_mock.get_tags.assert_called_once_with('/some/source.flac')
+        self.assertEqual('/some/destination.mp3', command.source)
+        self.assertEqual('Aphex Twin', command.artist)
+        self.assertEqual('Aphex Twin', command.album_artist)
+        self.assertEqual('Drukqs', command.album)
+        self.assertEqual('Jynweythek', command.title)
+        self.assertEqual('2001', command.year)
+        self.assertEqual('Electronic', command.genre)
+        self.assertEqual('Warp Records (WARPCD92)', command.comment)
+        self.assertEqual(1, command.track_number)
+        self.assertEqual(2, command.track_total)
+        self.assertEqual(1, command.disc_number)
+        self.assertEqual(1, command.disc_total)
+
+    @mock.patch('os.path.exists')
+    @mock.patch('os.path.isfile')
+    def test__parse_transcode_command__flac_has_a_track_number_but_no_total__track_total_is_the_track_number(self, isfile_mock, exists_mock):
+        isfile_mock.return_value = True
+        exists_mock.return_value = True
+        config_mock, transcoder_mock, source_tagger_mock, destination_tagger_mock = (Mock(),)*4
+        source_tagger_mock.get_tags.return_value = self._get_tags(3, 0)
+        parser = TranscodeCommandParser(config_mock, transcoder_mock, source_tagger_mock, destination_tagger_mock)
+        command = parser.parse_transcode_command('/some/source.flac', '/some/destination.mp3')[1]
+        self.assertEqual(3, command.track_number)
+        self.assertEqual(3, command.track_total)
+
+    @mock.patch('os.path.exists')
+    def test__parse_transcode_command__source_does_not_exist__raises_command_parsing_error(self, exists_mock):
+        exists_mock.return_value = False
+        config_mock, transcoder_mock, source_tagger_mock, destination_tagger_mock = (Mock(),)*4
+        with self.assertRaisesRegexp(CommandParsingError, 'The source directory or file must exist'):
+            parser = TranscodeCommandParser(config_mock, transcoder_mock, source_tagger_mock, destination_tagger_mock)
+            parser.parse_transcode_command('/some/source.flac', '/some/destination.mp3')
+
+    @mock.patch('os.walk')
+    @mock.patch('os.path.exists')
+    @mock.patch('os.path.isfile')
+    def test__parse_transcode_command__source_is_directory_with_2_flac_files__returns_commands_for_each_flac(self, isfile_mock, exists_mock, walk_mock):
+        exists_mock.return_value = True
+        isfile_mock.return_value = False
+        walk_mock.return_value = [
+            ('/some/path/to/flacs', (), ('02 - Track 2.flac', 'cover.jpg', '01 - Track 1.flac'))
+        ]
+        config_mock, transcoder_mock, source_tagger_mock, destination_tagger_mock = (Mock(),)*4
+        source_tagger_mock.get_tags.return_value = self._get_tags()
+        parser = TranscodeCommandParser(config_mock, transcoder_mock, source_tagger_mock, destination_tagger_mock)
+        commands = parser.parse_transcode_command('/some/path/to/flacs', '/some/destination')
+        self.assertEqual(4, len(commands))
+        self.assertEqual('/some/path/to/flacs/01 - Track 1.flac', commands[0].source)
+        self.assertEqual('/some/destination/01 - Track 1.mp3', commands[0].destination)
+        self.assertEqual('/some/destination/01 - Track 1.mp3', commands[1].source)
+        self.assertEqual('/some/path/to/flacs/02 - Track 2.flac', commands[2].source)
+        self.assertEqual('/some/destination/02 - Track 2.mp3', commands[2].destination)
+        self.assertEqual('/some/destination/02 - Track 2.mp3', commands[3].source)
+
+    @mock.patch('os.listdir')
+    @mock.patch('os.walk')
+    @mock.patch('os.path.exists')
+    @mock.patch('os.path.isfile')
+    def test__parse_transcode_command__source_has_a_directory_per_disc__destination_keeps_the_disc_directories(self, isfile_mock, exists_mock, walk_mock, listdir_mock):
+        exists_mock.return_value = True
+        isfile_mock.return_value = False
+        walk_mock.return_value = [
+            ('/some/path/to/flacs', ('CD2', 'CD1'), ())
+        ]
+        listdir_mock.side_effect = [['01 - Track 1.flac'], ['01 - Track 1.flac']]
+        config_mock, transcoder_mock, source_tagger_mock, destination_tagger_mock = (Mock(),)*4
+        source_tagger_mock.get_tags.return_value = self._get_tags()
+        parser = TranscodeCommandParser(config_mock, transcoder_mock, source_tagger_mock, destination_tagger_mock)
+        commands = parser.parse_transcode_command('/some/path/to/flacs', '/some/destination')
+        self.assertEqual('/some/path/to/flacs/CD1/01 - Track 1.flac', commands[0].source)
+        self.assertEqual('/some/destination/CD1/01 - Track 1.mp3', commands[0].destination)
+        self.assertEqual('/some/path/to/flacs/CD2/01 - Track 1.flac', commands[2].source)
+        self.assertEqual('/some/destination/CD2/01 - Track 1.mp3', commands[2].destination)